@@ -46,6 +46,8 @@ from collections import defaultdict
 
 import pandas as pd
 
+from .schema import _parse_numeric, table_schema
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
@@ -87,13 +89,8 @@ def _maybe_numeric(series):
     factors such as frequency.  Treat textual NA/NaN markers as missing for
     this check, but preserve the original Series if any other text is present.
     """
-    text = series.astype("string").str.strip().str.casefold()
-    cleaned = series.mask(text.isin(("na", "nan")))
-    numeric = pd.to_numeric(cleaned, errors="coerce")
-    present = cleaned.notna()
-    if numeric[present].notna().all():
-        return numeric
-    return series
+    numeric = _parse_numeric(series)
+    return series if numeric is None else numeric
 
 
 # ---------------------------------------------------------------------------
@@ -641,10 +638,10 @@ class destrat:
 
         final_cols = [col for col in index_cols if col in wide_df.columns] + var_cols
         result = wide_df[final_cols].reset_index(drop=True)
-        for col in result.columns:
-            if col != 'ID':
-                result[col] = _maybe_numeric(result[col])
-        return result
+        names = {col: col.split('.')[0] for col in var_cols} if col_factor_names else None
+        return table_schema().cast(
+            result, cmd_name, row_factor_names + col_factor_names, names=names,
+        )
 
     # ------------------------------------------------------------------
     # Repr
@@ -665,4 +662,192 @@ class destrat:
         return list(self._files)
 
 
-__all__ = ['destrat']
+# ---------------------------------------------------------------------------
+# Merging databases
+# ---------------------------------------------------------------------------
+
+# Lookup tables whose integer IDs are local to each database, in the order
+# they are merged (levels refer to factors).  Rows are unified across
+# databases by their remaining (natural-key) columns.
+_MERGE_LOOKUPS = [
+    ('factors', 'factor_id'),
+    ('individuals', 'indiv_id'),
+    ('commands', 'cmd_id'),
+    ('variables', 'variable_id'),
+    ('timepoints', 'timepoint_id'),
+    ('levels', 'level_id'),
+]
+
+_MERGE_INDEXES = [
+    # covers destrat.get()/tables(): strata, variable and individual filters
+    # plus the returned columns, so queries never touch the table itself
+    "CREATE INDEX IF NOT EXISTS datapoints_covering ON datapoints"
+    "(strata_id, variable_id, indiv_id, timepoint_id, value)",
+    "CREATE INDEX IF NOT EXISTS strata_by_id ON strata(strata_id, level_id)",
+    "CREATE INDEX IF NOT EXISTS levels_by_factor ON levels(factor_id, level_id)",
+]
+
+
+def _table_columns(cur, schema, table):
+    return [row[1] for row in cur.execute(f'PRAGMA {schema}.table_info("{table}")')]
+
+
+def _expand_db_paths(sources):
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+    files = []
+    for p in sources:
+        matches = sorted(glob.glob(os.path.expanduser(str(p))))
+        files.extend(matches if matches else [str(p)])
+    return [f for f in dict.fromkeys(files) if os.path.isfile(f)]
+
+
+def merge_db(sources, target, overwrite=False, index=True):
+    """Merge Luna output databases into one consolidated, indexed database.
+
+    Factor, level, strata, variable, individual, command and timepoint IDs
+    are local to each ``.db`` file; they are unified across *sources* by
+    name (for strata, by their set of factor levels) and ``datapoints`` are
+    rewritten with the merged IDs.  The result is a regular destrat
+    database, so ``lp.destrat(target)`` and ``proj.import_db(target)``
+    read it directly.
+
+    Parameters
+    ----------
+    sources : str or list of str
+        Paths or glob patterns of the databases to merge, e.g. the
+        ``{out_db}-{slice}.db`` files of a parallel run.  *target* itself may
+        be listed to fold new results into an existing merged database.
+    target : str
+        Output database path.
+    overwrite : bool, optional
+        Replace *target* if it exists and is not among *sources*.
+    index : bool, optional
+        Build covering indexes on ``datapoints`` (and lookup indexes on
+        ``strata``/``levels``) once all data are loaded.  Default ``True``.
+
+    Returns
+    -------
+    str
+        *target*.
+    """
+    files = _expand_db_paths(sources)
+    if not files:
+        raise FileNotFoundError(f"No .db files found matching: {sources!r}")
+    target = str(target)
+    target_abs = os.path.abspath(target)
+    if (os.path.exists(target) and not overwrite
+            and target_abs not in {os.path.abspath(f) for f in files}):
+        raise FileExistsError(f"{target} exists; pass overwrite=True to replace it")
+
+    tmp = f"{target}.merging"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    con = sqlite3.connect(tmp)
+    try:
+        cur = con.cursor()
+        cur.execute("PRAGMA journal_mode=OFF")
+        cur.execute("PRAGMA synchronous=OFF")
+        keys = {table: {} for table, _ in _MERGE_LOOKUPS}
+        strata_keys = {}
+        created = set()
+        for f in files:
+            cur.execute("ATTACH DATABASE ? AS src", (f,))
+            try:
+                _merge_one(cur, created, keys, strata_keys)
+                con.commit()
+            finally:
+                cur.execute("DETACH DATABASE src")
+        if index and 'datapoints' in created:
+            for sql in _MERGE_INDEXES:
+                table = sql.split(" ON ", 1)[1].split("(", 1)[0]
+                if table in created:
+                    cur.execute(sql)
+            cur.execute("ANALYZE")
+        con.commit()
+    except BaseException:
+        con.close()
+        os.remove(tmp)
+        raise
+    con.close()
+    os.replace(tmp, target)
+    return target
+
+
+def _merge_one(cur, created, keys, strata_keys):
+    """Append the attached ``src`` database to ``main``, remapping local IDs."""
+    for name, sql in cur.execute(
+        "SELECT name, sql FROM src.sqlite_master "
+        "WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall():
+        if name not in created:
+            cur.execute(sql)
+            created.add(name)
+
+    maps = {}
+    for table, id_col in _MERGE_LOOKUPS:
+        if table not in created:
+            continue
+        cols = [c for c in _table_columns(cur, 'src', table) if c != id_col]
+        col_list = ', '.join(f'"{c}"' for c in cols)
+        mapping = {}
+        new_rows = []
+        known = keys[table]
+        for row in cur.execute(f'SELECT "{id_col}", {col_list} FROM src."{table}"').fetchall():
+            values = list(row[1:])
+            for j, col in enumerate(cols):
+                if col in maps and values[j] is not None:
+                    values[j] = maps[col].get(values[j], values[j])
+            key = tuple(values)
+            if key not in known:
+                known[key] = len(known) + 1
+                new_rows.append((known[key], *values))
+            mapping[row[0]] = known[key]
+        if new_rows:
+            cur.executemany(
+                f'INSERT INTO main."{table}" ("{id_col}", {col_list}) '
+                f'VALUES ({_placeholders(len(cols) + 1)})',
+                new_rows,
+            )
+        maps[id_col] = mapping
+
+    if 'strata' in created:
+        members = defaultdict(set)
+        for sid, lid in cur.execute("SELECT strata_id, level_id FROM src.strata").fetchall():
+            members[sid].add(maps.get('level_id', {}).get(lid, lid))
+        mapping = {}
+        new_rows = []
+        for sid, level_ids in members.items():
+            key = frozenset(level_ids)
+            if key not in strata_keys:
+                strata_keys[key] = len(strata_keys) + 1
+                new_rows.extend((strata_keys[key], lid) for lid in sorted(level_ids))
+            mapping[sid] = strata_keys[key]
+        cur.executemany("INSERT INTO main.strata (strata_id, level_id) VALUES (?, ?)", new_rows)
+        maps['strata_id'] = mapping
+
+    if 'datapoints' not in created:
+        return
+    src_cols = set(_table_columns(cur, 'src', 'datapoints'))
+    select = []
+    joins = []
+    for col in _table_columns(cur, 'main', 'datapoints'):
+        if col not in src_cols:
+            select.append('NULL')
+        elif col in maps:
+            alias = f'm_{col}'
+            cur.execute(f'CREATE TEMP TABLE "{alias}" (old INTEGER PRIMARY KEY, new INTEGER)')
+            cur.executemany(f'INSERT INTO temp."{alias}" VALUES (?, ?)', maps[col].items())
+            joins.append(f'LEFT JOIN temp."{alias}" ON temp."{alias}".old = d."{col}"')
+            select.append(f'temp."{alias}".new')
+        else:
+            select.append(f'd."{col}"')
+    cur.execute(
+        f"INSERT INTO main.datapoints SELECT {', '.join(select)} "
+        f"FROM src.datapoints d {' '.join(joins)}"
+    )
+    for col in maps:
+        cur.execute(f'DROP TABLE IF EXISTS temp."m_{col}"')
+
+
+__all__ = ['destrat', 'merge_db']
@@ -23,7 +23,8 @@
 
 Wraps ``luna`` command-line tools for operations not directly exposed through
 the Python bindings: EDF merging/binding and multi-sample annotation overlap
-analysis.
+analysis.  Also provides a lightweight EDF header reader that needs neither
+the ``luna`` binary nor the compiled engine.
 """
 
 from __future__ import annotations
@@ -128,6 +129,75 @@ def _parse_files_arg(files):
     return result
 
 
+# ---------------------------------------------------------------------------
+# EDF headers
+# ---------------------------------------------------------------------------
+
+def read_edf_header(path):
+    """Read the fixed and per-signal EDF header fields of a file.
+
+    Only the header block is read, so this is cheap even for multi-day
+    recordings.  Compressed (``.edf.gz`` / ``.edfz``) files are not parsed.
+
+    Parameters
+    ----------
+    path : str or path-like
+        EDF or EDF+ file.
+
+    Returns
+    -------
+    dict
+        Keys ``records``, ``record_duration``, ``duration`` (seconds),
+        ``signals``, ``labels``, ``samples_per_record``, ``sample_rates``,
+        ``total_samples`` and ``file_size`` (bytes).
+
+    Raises
+    ------
+    ValueError
+        If the file does not have a readable EDF header.
+    """
+    path = os.fspath(path)
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as fh:
+        head = fh.read(256)
+        if len(head) < 256:
+            raise ValueError(f"not an EDF file (short header): {path}")
+        try:
+            header_bytes = int(head[184:192].decode('ascii').strip())
+            n_records = int(head[236:244].decode('ascii').strip())
+            rec_dur = float(head[244:252].decode('ascii').strip())
+            n_signals = int(head[252:256].decode('ascii').strip())
+        except ValueError as exc:
+            raise ValueError(f"not an EDF file ({exc}): {path}") from None
+        sig = fh.read(n_signals * 256)
+    if len(sig) < n_signals * 256:
+        raise ValueError(f"not an EDF file (truncated signal header): {path}")
+
+    labels = [sig[i * 16:(i + 1) * 16].decode('latin-1').strip() for i in range(n_signals)]
+    offset = n_signals * 216
+    samples = []
+    for i in range(n_signals):
+        field = sig[offset + i * 8:offset + (i + 1) * 8].decode('ascii').strip()
+        samples.append(int(field) if field else 0)
+
+    per_record = sum(samples)
+    if n_records < 0 and per_record > 0:
+        # EDF allows -1 while recording; infer the count from the file size
+        n_records = max(0, (file_size - header_bytes) // (2 * per_record))
+
+    return {
+        'records': n_records,
+        'record_duration': rec_dur,
+        'duration': n_records * rec_dur,
+        'signals': n_signals,
+        'labels': labels,
+        'samples_per_record': samples,
+        'sample_rates': [n / rec_dur if rec_dur > 0 else 0.0 for n in samples],
+        'total_samples': n_records * per_record,
+        'file_size': file_size,
+    }
+
+
 # ---------------------------------------------------------------------------
 # EDF merging / binding
 # ---------------------------------------------------------------------------
@@ -390,4 +460,4 @@ def overlap(
     return destrat(out)
 
 
-__all__ = ['merge_edfs', 'bind_edfs', 'overlap']
+__all__ = ['merge_edfs', 'bind_edfs', 'overlap', 'read_edf_header']
@@ -39,6 +39,8 @@ import pandas as pd
 
 import lunapi.lunapi0 as _l0
 
+from .results import _table2df
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
@@ -61,10 +63,7 @@ def _rtables_to_dfs(raw: dict) -> Dict[str, pd.DataFrame]:
     out: Dict[str, pd.DataFrame] = {}
     for cmd, strata_map in raw.items():
         for stratum, (cols, data) in strata_map.items():
-            key = f"{cmd}: {stratum}"
-            df = pd.DataFrame(data).T
-            df.columns = cols
-            out[key] = df
+            out[f"{cmd}: {stratum}"] = _table2df((cols, data))
     return out
 
 
@@ -28,7 +28,7 @@ annotation access, evaluation, and in-memory signal editing operations.
 from __future__ import annotations
 
 import lunapi.lunapi0 as _luna
-from lunapi.parallel import coerce_strata as _coerce_strata
+from lunapi.parallel import coerce_strata as _coerce_strata, _results_changed, _ENGINE_LOCK
 
 import pandas as pd
 import numpy as np
@@ -47,7 +47,7 @@ import os
 
 from .project import proj, _coerce_var_value
 from .resources import resources
-from .results import tables, cmdfile
+from .results import tables, cmdfile, _columns2df, _table_query
 
 
 def hypno(*args, **kwargs):
@@ -128,6 +128,7 @@ class inst:
         object
           Status value returned by the C++ backend.
         """
+        _results_changed()
         return self.edf.attach_edf( f )
 
     #------------------------------------------------------------------------
@@ -172,6 +173,7 @@ class inst:
         -------
         None
         """
+        _results_changed()
         self.edf.refresh()
         # reset the project-wide problem flag (problem flag is currently shared across instances)
 
@@ -547,6 +549,7 @@ class inst:
           DataFrame of command/strata pairs from the result store after
           evaluation (i.e. the result of :meth:`strata`).
         """
+        _results_changed()
         self.edf.eval( cmdstr )
         return self.strata()
 
@@ -566,6 +569,7 @@ class inst:
           Console/log text produced by the backend during dry-run
           evaluation.
         """
+        _results_changed()
         return self.edf.eval_dummy( cmdstr )
 
     #------------------------------------------------------------------------
@@ -583,6 +587,7 @@ class inst:
         object
           Console log text returned by the LunaScope backend.
         """
+        _results_changed()
         return self.edf.eval_lunascope( cmdstr )
 
     #------------------------------------------------------------------------
@@ -603,6 +608,7 @@ class inst:
         ProcResult
         """
         from lunapi.parallel import ProcResult, _errors_frame, _stdout_frame, _records_frame
+        _results_changed()
         self.edf.proc( cmdstr )
         return ProcResult(
             _owner=self,
@@ -633,6 +639,7 @@ class inst:
         _proj = proj(False)
         silence_mode = _proj.is_silenced()
         _proj.silence(True,False)
+        _results_changed()
         self.edf.proc( cmdstr )
         _proj.silence( silence_mode , False )
         return ProcResult(
@@ -645,6 +652,30 @@ class inst:
 
     #------------------------------------------------------------------------
 
+    async def proc_async( self, cmdstr ) -> ProcResult:
+        """Awaitable version of :meth:`proc` for use in an event loop.
+
+        Evaluation runs in an executor thread with the GIL released, so
+        the event loop keeps serving other requests.  The Luna engine is
+        shared by the process: evaluations from concurrent calls run one
+        at a time, and each returns a result detached from the instance's
+        cache.  Cancelling a call that is still waiting for the engine
+        skips its evaluation.
+
+        Parameters
+        ----------
+        cmdstr : str
+          One or more Luna commands, optionally separated by newlines.
+
+        Returns
+        -------
+        ProcResult
+        """
+        from lunapi.parallel import run_instance_async
+        return await run_instance_async( self, cmdstr )
+
+    #------------------------------------------------------------------------
+
     def silent_proc_lunascope( self, cmdstr ):
         """Evaluate Luna commands silently via LunaScope and return results.
 
@@ -662,6 +693,7 @@ class inst:
         _proj = proj(False)
         silence_mode = _proj.is_silenced()
         _proj.silence(True,False)
+        _results_changed()
         self.edf.proc_lunascope( cmdstr )
         _proj.silence( silence_mode , False )
         return ProcResult(
@@ -674,6 +706,92 @@ class inst:
 
     #------------------------------------------------------------------------
 
+    def proc_parallel( self, cmdstr, split = 'sig', sig = None, workers = None,
+                       chunks = None, params = None, param_file = None,
+                       strict = False, progress = False, pool = None,
+                       backend = None, record_timeout = None, max_rss = None ):
+        """Evaluate Luna commands on this recording split across workers.
+
+        Intended for a single large recording: high-density EEG, split by
+        channel, or a multi-day ambulatory recording, split by time.  Each
+        worker attaches this instance's EDF and annotation files and
+        evaluates *cmdstr* on one part:
+
+        - ``split='sig'``: a contiguous group of channels (``sig`` is set to
+          the group).  For commands that work channel by channel (``PSD``,
+          ``SIGSTATS``, ``SPINDLES``, ...); commands that relate channels
+          to each other (``COH``, ``CORREL``, ``PSI``, ...) raise
+          ``ValueError``.
+        - ``split='epoch'``: a contiguous range of epochs; all other epochs
+          are masked with ``MASK epoch=a-b`` (after any ``EPOCH`` command in
+          *cmdstr*).  Only epoch-local commands are accepted (``PSD`` with
+          ``epoch``/``epoch-spectrum``, ``MTM`` with ``epoch`` or
+          ``segment-output``, ``SIGSTATS``/``HJORTH``/``STATS`` with
+          ``epoch``, plus set-up commands such as ``EPOCH``, ``SIGNALS``,
+          ``FILTER`` and ``REFERENCE``); others raise ``ValueError``.
+
+        Tables stratified by ``CH`` (channel split) or ``E`` (epoch split)
+        are concatenated in order and stored in this instance, so
+        :meth:`table` and the returned :class:`ProcResult` read them as
+        after :meth:`proc`.  Epoch numbers are those of the whole
+        recording.  Of the other tables, a channel split keeps the columns
+        all groups agree on (warning about the rest) and an epoch split
+        keeps none.
+
+        Parameters
+        ----------
+        cmdstr : str
+          One or more Luna commands.
+        split : {'sig', 'epoch'}, optional
+          Partition channels (default) or epochs across workers.
+        sig : str or list of str, optional
+          Channels to analyse.  Defaults to all channels of the EDF.
+        workers : int, optional
+          Number of worker processes, as for :meth:`proj.proc_parallel`.
+        chunks : int, optional
+          Number of channel groups or epoch ranges.  Defaults to one per
+          worker; more parts balance better when their cost differs.
+        params, param_file : optional
+          Project-level variables applied in each worker, as for
+          :meth:`proj.proc_parallel`.  Variables set on this instance are
+          not passed on.
+        strict : bool, optional
+          Raise ``ParallelProcError`` if any part fails.
+        progress : bool or callable, optional
+          Progress reporting, one event per part.
+        pool, backend, record_timeout, max_rss : optional
+          As for :meth:`proj.proc_parallel`.
+
+        Returns
+        -------
+        ProcResult
+          One ``records`` row per channel group or epoch range.
+
+        Notes
+        -----
+        The recording must be a file on disk (not an in-memory EDF), and
+        every worker reads its header and its share of the data.  With
+        ``split='sig'``, tables without a ``CH`` factor keep only the
+        columns all channel groups agree on, and commands pairing channels
+        (``CH1`` x ``CH2``) are rejected.  With ``split='epoch'``, tables
+        without an ``E`` factor would summarise one range only and are
+        dropped.
+
+        The speed-up comes from worker processes.  With
+        ``backend='thread'`` the parts share this process's engine, which
+        evaluates one part at a time, so only the conversion of their
+        tables overlaps; the split then saves no evaluation time.
+        """
+        from lunapi.parallel import run_parallel_instance
+        return run_parallel_instance(
+            self, cmdstr, split=split, sig=sig, workers=workers, chunks=chunks,
+            params=params, param_file=param_file, strict=strict,
+            progress=progress, pool=pool, backend=backend,
+            record_timeout=record_timeout, max_rss=max_rss,
+        )
+
+    #------------------------------------------------------------------------
+
     def empty_result_set( self ) -> bool:
         """Return ``True`` if the instance result store contains no tables.
 
@@ -702,7 +820,7 @@ class inst:
 
     #------------------------------------------------------------------------
 
-    def table( self, cmd , strata = 'BL' ):
+    def table( self, cmd , strata = 'BL' , columns = None , where = None , ids = None ):
         """Return a specific output table as a DataFrame.
 
         Parameters
@@ -711,6 +829,13 @@ class inst:
           Luna command name (e.g. ``'PSD'``, ``'STAGE'``).
         strata : str, optional
           Stratum label (e.g. ``'CH_F'``, ``'E'``).  Default ``'BL'``.
+        columns : list of str, optional
+          Return only these columns, in this order.
+        where : dict, optional
+          Keep rows whose column values match, e.g. ``{'CH': ['C3', 'C4']}``
+          or ``{'F': slice(0.5, 4)}``; see :meth:`lunapi.project.proj.table`.
+        ids : str or list of str, optional
+          Keep rows for these individual IDs.
 
         Returns
         -------
@@ -718,11 +843,10 @@ class inst:
           Result table, or ``None`` if the result store is empty.
         """
         if ( self.empty_result_set() ): return None
-        strata = _coerce_strata( self.edf.strata(), cmd, strata )
-        r = self.edf.table( cmd , strata )
-        t = pd.DataFrame( r[1] ).T
-        t.columns = r[0]
-        return t
+        # the store is read in place with the GIL released: hold off writers
+        with _ENGINE_LOCK:
+            strata = _coerce_strata( self.edf.strata(), cmd, strata )
+            return _columns2df( *self.edf.table_columns( cmd , strata , *_table_query( columns , where , ids ) ) )
 
     #------------------------------------------------------------------------
 
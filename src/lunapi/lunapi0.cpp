@@ -21,15 +21,396 @@
 //    --------------------------------------------------------------------
 
 #include <pybind11/eigen.h>
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
 #include "luna.h"
 
+#include <charconv>
+#include <limits>
+#include <unordered_map>
+#include <unordered_set>
+
 namespace py = pybind11;
 
 using namespace pybind11::literals;
 
+namespace {
+
+  // Bulk construction of an rtable_t from typed column buffers, for
+  // inject_columns().  Each column is a float64 or int64 numpy array, or a
+  // (codes, values) tuple holding a dictionary-encoded string column (int32
+  // codes, -1 for missing).  Each optional mask is a bool array flagging
+  // missing values.  Result cells hold int, so int64 values that do not
+  // fit in one are stored as doubles rather than truncated.  Buffers are
+  // validated with the GIL held; the table is then filled with the GIL
+  // released.
+
+  using f64_array = py::array_t<double, py::array::c_style | py::array::forcecast>;
+  using i64_array = py::array_t<int64_t, py::array::c_style | py::array::forcecast>;
+  using i32_array = py::array_t<int32_t, py::array::c_style | py::array::forcecast>;
+  using bool_array = py::array_t<bool, py::array::c_style | py::array::forcecast>;
+
+  struct staged_column_t {
+    char kind = 'f';
+    f64_array f;
+    i64_array i;
+    i32_array codes;
+    std::vector<std::string> values;
+    bool_array mask;
+    bool has_mask = false;
+  };
+
+  rtable_t rtable_from_columns(const std::vector<std::string> & col_names,
+                               py::list data_cols,
+                               py::object masks_obj)
+  {
+    const bool has_masks = !masks_obj.is_none();
+    py::list masks = has_masks ? masks_obj.cast<py::list>() : py::list();
+    const int ncols = (int)col_names.size();
+    if ((int)py::len(data_cols) != ncols)
+      throw std::invalid_argument("inject_columns: one column buffer expected per column name");
+    if (has_masks && (int)py::len(masks) != ncols)
+      throw std::invalid_argument("inject_columns: one mask (or None) expected per column name");
+
+    std::vector<staged_column_t> staged(ncols);
+    py::ssize_t nrows = -1;
+    for (int j = 0; j < ncols; j++) {
+      staged_column_t & c = staged[j];
+      py::handle col = data_cols[j];
+      py::ssize_t n = 0;
+      if (py::isinstance<py::tuple>(col)) {
+        py::tuple pair = col.cast<py::tuple>();
+        if (pair.size() != 2)
+          throw std::invalid_argument("inject_columns: string columns must be (codes, values) pairs");
+        c.kind = 's';
+        c.codes = i32_array::ensure(pair[0]);
+        if (!c.codes)
+          throw py::type_error("inject_columns: string codes must be an integer array");
+        c.values = pair[1].cast<std::vector<std::string>>();
+        n = c.codes.size();
+        const int32_t * codes = c.codes.data();
+        const int32_t nvalues = (int32_t)c.values.size();
+        for (py::ssize_t i = 0; i < n; i++)
+          if (codes[i] < -1 || codes[i] >= nvalues)
+            throw std::out_of_range("inject_columns: string code out of range in column " + col_names[j]);
+      } else {
+        py::array arr = py::array::ensure(col);
+        if (!arr)
+          throw py::type_error("inject_columns: column " + col_names[j] + " is not an array");
+        const char k = arr.dtype().kind();
+        if (k == 'i' || k == 'u' || k == 'b') {
+          c.kind = 'i';
+          c.i = i64_array::ensure(arr);
+          n = c.i.size();
+        } else if (k == 'f') {
+          c.kind = 'f';
+          c.f = f64_array::ensure(arr);
+          n = c.f.size();
+        } else {
+          throw py::type_error("inject_columns: column " + col_names[j]
+                               + " must be numeric or a (codes, values) pair");
+        }
+      }
+      if (has_masks && !py::handle(masks[j]).is_none()) {
+        c.mask = bool_array::ensure(masks[j]);
+        if (!c.mask || c.mask.size() != n)
+          throw std::invalid_argument("inject_columns: mask length mismatch in column " + col_names[j]);
+        c.has_mask = true;
+      }
+      if (nrows == -1)
+        nrows = n;
+      else if (n != nrows)
+        throw std::invalid_argument("inject_columns: columns differ in length");
+    }
+
+    rtable_t t;
+    t.cols = col_names;
+    t.nrows = nrows < 0 ? 0 : (int)nrows;
+    t.data.resize(ncols);
+
+    py::gil_scoped_release release;
+    for (int j = 0; j < ncols; j++) {
+      const staged_column_t & c = staged[j];
+      auto & out = t.data[j];
+      out.resize(t.nrows);
+      const bool * mask = c.has_mask ? c.mask.data() : nullptr;
+      if (c.kind == 'f') {
+        const double * v = c.f.data();
+        for (int i = 0; i < t.nrows; i++)
+          if (mask && mask[i]) out[i] = std::monostate{};
+          else out[i] = v[i];
+      } else if (c.kind == 'i') {
+        const int64_t * v = c.i.data();
+        const int64_t lo = std::numeric_limits<int>::min();
+        const int64_t hi = std::numeric_limits<int>::max();
+        for (int i = 0; i < t.nrows; i++)
+          if (mask && mask[i]) out[i] = std::monostate{};
+          else if (v[i] < lo || v[i] > hi) out[i] = (double)v[i];
+          else out[i] = (int)v[i];
+      } else {
+        const int32_t * codes = c.codes.data();
+        for (int i = 0; i < t.nrows; i++)
+          if (codes[i] < 0 || (mask && mask[i])) out[i] = std::monostate{};
+          else out[i] = c.values[codes[i]];
+      }
+    }
+    return t;
+  }
+
+  // Typed, column-wise export of a result table, for table_columns(); the
+  // mirror image of rtable_from_columns().  A column of ints is returned as
+  // an int64 array, one holding any doubles as float64, and one holding any
+  // strings as a (codes, values) pair (numbers in it are formatted as
+  // strings).  Each column has a bool mask of missing values, or None if
+  // the stored column has none; missing floats are also NaN.  Column kinds are
+  // resolved and buffers filled with the GIL released, straight into the
+  // numpy arrays that are returned.
+
+  struct export_column_t {
+    char kind = 'i';
+    bool missing = false;
+    py::array array;
+    py::array_t<bool> mask;
+    void * out = nullptr;
+    bool * mask_out = nullptr;
+    std::vector<std::string> values;
+  };
+
+  std::string rtable_elem_str(const double x)
+  {
+    char buf[64];
+    auto res = std::to_chars(buf, buf + sizeof(buf), x);
+    return std::string(buf, res.ptr);
+  }
+
+  // Approximate heap footprint of a stored result table, for
+  // table_usage(): the cell variants, the characters of strings too long
+  // for the small-string buffer, and the column names.
+
+  template <typename C, typename D>
+  size_t rtable_bytes(const C & cols, const D & data)
+  {
+    size_t bytes = 0;
+    for (const auto & name : cols)
+      bytes += sizeof(name) + name.capacity();
+    for (const auto & col : data) {
+      bytes += sizeof(col) + col.capacity() * sizeof(typename std::decay_t<decltype(col)>::value_type);
+      for (const auto & v : col)
+        if (std::holds_alternative<std::string>(v)) {
+          const std::string & s = std::get<std::string>(v);
+          if (s.capacity() > std::string().capacity()) bytes += s.capacity() + 1;
+        }
+    }
+    return bytes;
+  }
+
+  // Row filter and column projection applied by table_columns() before
+  // export, so that only the selected part of a table is converted.  The
+  // query arrives from lunapi.results._table_query(): a list of column
+  // names (or None for all) and a list of (column, strings, numbers, lo,
+  // hi) filters.  A filter with strings == None keeps numbers within
+  // [lo, hi] (either bound may be None); otherwise it keeps string values
+  // in *strings* and numeric values in *numbers*.  String values are
+  // parsed as numbers for range filters; missing values never match.
+
+  struct rtable_filter_t {
+    int col = 0;
+    bool range = false;
+    double lo = -std::numeric_limits<double>::infinity();
+    double hi = std::numeric_limits<double>::infinity();
+    std::unordered_set<std::string> strings;
+    std::unordered_set<double> numbers;
+  };
+
+  struct rtable_query_t {
+    bool all_cols = true;
+    std::vector<int> cols;
+    std::vector<rtable_filter_t> filters;
+  };
+
+  int rtable_col_index(const std::vector<std::string> & cols, const std::string & name)
+  {
+    for (int j = 0; j < (int)cols.size(); j++)
+      if (cols[j] == name) return j;
+    throw py::key_error("table has no column " + name);
+  }
+
+  rtable_query_t rtable_query(const std::vector<std::string> & cols,
+                              py::object columns,
+                              py::object filters)
+  {
+    rtable_query_t q;
+    if (!columns.is_none()) {
+      q.all_cols = false;
+      for (py::handle name : columns)
+        q.cols.push_back(rtable_col_index(cols, name.cast<std::string>()));
+    }
+    if (!filters.is_none()) {
+      for (py::handle item : filters) {
+        py::tuple spec = item.cast<py::tuple>();
+        if (spec.size() != 5)
+          throw std::invalid_argument("table_columns: filters are (column, strings, numbers, lo, hi) tuples");
+        rtable_filter_t f;
+        f.col = rtable_col_index(cols, spec[0].cast<std::string>());
+        if (spec[1].is_none()) {
+          f.range = true;
+          if (!spec[3].is_none()) f.lo = spec[3].cast<double>();
+          if (!spec[4].is_none()) f.hi = spec[4].cast<double>();
+        } else {
+          for (py::handle v : spec[1]) f.strings.insert(v.cast<std::string>());
+          for (py::handle v : spec[2]) f.numbers.insert(v.cast<double>());
+        }
+        q.filters.push_back(std::move(f));
+      }
+    }
+    return q;
+  }
+
+  bool rtable_parse_double(const std::string & s, double & x)
+  {
+    const char * end = s.data() + s.size();
+    auto res = std::from_chars(s.data(), end, x);
+    return res.ec == std::errc() && res.ptr == end;
+  }
+
+  template <typename V>
+  bool rtable_filter_match(const rtable_filter_t & f, const V & v)
+  {
+    if (std::holds_alternative<std::monostate>(v)) return false;
+    if (std::holds_alternative<std::string>(v)) {
+      const std::string & s = std::get<std::string>(v);
+      if (!f.range) return f.strings.count(s) > 0;
+      double x;
+      return rtable_parse_double(s, x) && x >= f.lo && x <= f.hi;
+    }
+    const double x = std::holds_alternative<double>(v) ? std::get<double>(v)
+      : (double)std::get<int>(v);
+    if (f.range) return x >= f.lo && x <= f.hi;
+    return f.numbers.count(x) > 0;
+  }
+
+  template <typename D>
+  std::vector<size_t> rtable_select_rows(const D & data, const rtable_query_t & q)
+  {
+    std::vector<size_t> rows;
+    const size_t nrows = data.empty() ? 0 : data[0].size();
+    rows.reserve(q.filters.empty() ? nrows : 0);
+    for (size_t i = 0; i < nrows; i++) {
+      bool keep = true;
+      for (const auto & f : q.filters)
+        if (!rtable_filter_match(f, data[f.col][i])) { keep = false; break; }
+      if (keep) rows.push_back(i);
+    }
+    return rows;
+  }
+
+  template <typename C, typename D>
+  py::tuple rtable_to_columns(const C & all_cols, const D & data,
+                              const rtable_query_t & q = rtable_query_t())
+  {
+    std::vector<int> sel = q.cols;
+    if (q.all_cols)
+      for (int j = 0; j < (int)data.size(); j++) sel.push_back(j);
+    std::vector<std::string> cols;
+    for (int j : sel) cols.push_back(all_cols[j]);
+    const int ncols = (int)sel.size();
+    std::vector<export_column_t> out(ncols);
+    std::vector<size_t> rows;
+
+    {
+      py::gil_scoped_release release;
+      rows = rtable_select_rows(data, q);
+      for (int j = 0; j < ncols; j++) {
+        // kinds (and whether a mask is returned) are taken from the whole
+        // column, so that a column has the same type however it is filtered
+        bool has_int = false, has_double = false, has_string = false;
+        for (const auto & v : data[sel[j]]) {
+          if (std::holds_alternative<std::monostate>(v)) out[j].missing = true;
+          else if (std::holds_alternative<int>(v)) has_int = true;
+          else if (std::holds_alternative<double>(v)) has_double = true;
+          else has_string = true;
+        }
+        // an empty or all-missing column is returned as float64 NaN
+        out[j].kind = has_string ? 's' : (has_double || !has_int) ? 'f' : 'i';
+      }
+    }
+
+    for (int j = 0; j < ncols; j++) {
+      export_column_t & c = out[j];
+      const py::ssize_t n = (py::ssize_t)rows.size();
+      if (c.kind == 'f') c.array = py::array_t<double>(n);
+      else if (c.kind == 'i') c.array = py::array_t<int64_t>(n);
+      else c.array = py::array_t<int32_t>(n);
+      c.out = c.array.mutable_data();
+      if (c.missing) {
+        c.mask = py::array_t<bool>(n);
+        c.mask_out = c.mask.mutable_data();
+      }
+    }
+
+    {
+      py::gil_scoped_release release;
+      const double nan = std::numeric_limits<double>::quiet_NaN();
+      for (int j = 0; j < ncols; j++) {
+        export_column_t & c = out[j];
+        const auto & col = data[sel[j]];
+        const size_t n = rows.size();
+        if (c.kind == 'f') {
+          double * o = static_cast<double *>(c.out);
+          for (size_t i = 0; i < n; i++) {
+            const auto & v = col[rows[i]];
+            const bool miss = std::holds_alternative<std::monostate>(v);
+            if (c.mask_out) c.mask_out[i] = miss;
+            o[i] = miss ? nan
+              : std::holds_alternative<double>(v) ? std::get<double>(v)
+              : (double)std::get<int>(v);
+          }
+        } else if (c.kind == 'i') {
+          int64_t * o = static_cast<int64_t *>(c.out);
+          for (size_t i = 0; i < n; i++) {
+            const auto & v = col[rows[i]];
+            const bool miss = std::holds_alternative<std::monostate>(v);
+            if (c.mask_out) c.mask_out[i] = miss;
+            o[i] = miss ? 0 : (int64_t)std::get<int>(v);
+          }
+        } else {
+          int32_t * o = static_cast<int32_t *>(c.out);
+          std::unordered_map<std::string, int32_t> lookup;
+          for (size_t i = 0; i < n; i++) {
+            const auto & v = col[rows[i]];
+            const bool miss = std::holds_alternative<std::monostate>(v);
+            if (c.mask_out) c.mask_out[i] = miss;
+            if (miss) { o[i] = -1; continue; }
+            std::string key = std::holds_alternative<std::string>(v) ? std::get<std::string>(v)
+              : std::holds_alternative<double>(v) ? rtable_elem_str(std::get<double>(v))
+              : std::to_string(std::get<int>(v));
+            auto it = lookup.find(key);
+            if (it == lookup.end()) {
+              it = lookup.emplace(key, (int32_t)c.values.size()).first;
+              c.values.push_back(std::move(key));
+            }
+            o[i] = it->second;
+          }
+        }
+      }
+    }
+
+    py::list columns, masks;
+    for (int j = 0; j < ncols; j++) {
+      export_column_t & c = out[j];
+      if (c.kind == 's')
+        columns.append(py::make_tuple(c.array, py::cast(c.values)));
+      else
+        columns.append(c.array);
+      masks.append(c.missing ? py::object(c.mask) : py::object(py::none()));
+    }
+    return py::make_tuple(py::cast(cols), columns, masks);
+  }
+
+}
+
 PYBIND11_MODULE(lunapi0, m) {
 
   m.doc() = "LunaAPI: Python bindings for the Luna C/C++ library";
@@ -248,6 +629,43 @@ PYBIND11_MODULE(lunapi0, m) {
            "Return a result table (defined by a command/strata pair) from a "
            "prior eval()")
 
+      .def("table_columns",
+           [](const lunapi_t & self, const std::string & cmd, const std::string & strata,
+              py::object columns, py::object filters) {
+             // read the stored table in place rather than through a copy
+             const auto c = self.rtables.tables.find(cmd);
+             if (c != self.rtables.tables.end()) {
+               const auto t = c->second.find(strata);
+               if (t != c->second.end())
+                 return rtable_to_columns(t->second.cols, t->second.data,
+                                          rtable_query(t->second.cols, columns, filters));
+             }
+             const auto r = self.results(cmd, strata);
+             const auto & cols = std::get<0>(r);
+             return rtable_to_columns(cols, std::get<1>(r), rtable_query(cols, columns, filters));
+           },
+           "cmd"_a, "strata"_a, "columns"_a = py::none(), "filters"_a = py::none(),
+           "Return a result table as (columns, typed column buffers, null masks): "
+           "int64/float64 arrays or (codes, values) string pairs; optionally "
+           "only the given columns of rows matching the filters")
+
+      .def("table_usage",
+           [](const lunapi_t & self) {
+             // measure the stored tables in place rather than through copies
+             py::list usage;
+             for (const auto & c : self.rtables.tables)
+               for (const auto & t : c.second) {
+                 const auto & data = t.second.data;
+                 usage.append(py::make_tuple(c.first, t.first,
+                                             data.empty() ? (size_t)0 : data[0].size(),
+                                             data.size(),
+                                             rtable_bytes(t.second.cols, data)));
+               }
+             return usage;
+           },
+           "List (command, strata, rows, columns, bytes) for each table in "
+           "the result store")
+
       .def("inject_table",
            [](lunapi_t & self,
               const std::string & cmd,
@@ -279,6 +697,20 @@ PYBIND11_MODULE(lunapi0, m) {
            },
            "Inject a result table directly into the result store")
 
+      .def("inject_columns",
+           [](lunapi_t & self,
+              const std::string & cmd,
+              const std::string & strata,
+              const std::vector<std::string> & col_names,
+              py::list data_cols,
+              py::object masks) {
+             rtable_t t = rtable_from_columns(col_names, data_cols, masks);
+             self.inject_table(cmd, strata, t);
+           },
+           "cmd"_a, "strata"_a, "col_names"_a, "data_cols"_a, "masks"_a = py::none(),
+           "Inject a result table from typed column buffers (float64/int64 "
+           "arrays or (codes, values) string pairs, plus optional null masks)")
+
       .def("output_attach",    &lunapi_t::output_attach,
            "Attach a destrat SQLite output database (overwrites if exists)")
 
@@ -510,6 +942,42 @@ PYBIND11_MODULE(lunapi0, m) {
            "Return a result table (defined by a command/strata pair) from a "
            "prior eval()")
 
+      .def("table_columns",
+           [](const lunapi_inst_t & self, const std::string & cmd, const std::string & strata,
+              py::object columns, py::object filters) {
+             // read the stored table in place rather than through a copy
+             const auto c = self.rtables.tables.find(cmd);
+             if (c != self.rtables.tables.end()) {
+               const auto t = c->second.find(strata);
+               if (t != c->second.end())
+                 return rtable_to_columns(t->second.cols, t->second.data,
+                                          rtable_query(t->second.cols, columns, filters));
+             }
+             const auto r = self.results(cmd, strata);
+             const auto & cols = std::get<0>(r);
+             return rtable_to_columns(cols, std::get<1>(r), rtable_query(cols, columns, filters));
+           },
+           "cmd"_a, "strata"_a, "columns"_a = py::none(), "filters"_a = py::none(),
+           "Return a result table as (columns, typed column buffers, null masks): "
+           "int64/float64 arrays or (codes, values) string pairs; optionally "
+           "only the given columns of rows matching the filters")
+
+      .def("table_usage",
+           [](const lunapi_inst_t & self) {
+             py::list usage;
+             for (const auto & c : self.rtables.tables)
+               for (const auto & t : c.second) {
+                 const auto & data = t.second.data;
+                 usage.append(py::make_tuple(c.first, t.first,
+                                             data.empty() ? (size_t)0 : data[0].size(),
+                                             data.size(),
+                                             rtable_bytes(t.second.cols, data)));
+               }
+             return usage;
+           },
+           "List (command, strata, rows, columns, bytes) for each table in "
+           "the result store")
+
       .def("inject_table",
            [](lunapi_inst_t & self,
               const std::string & cmd,
@@ -541,6 +1009,20 @@ PYBIND11_MODULE(lunapi0, m) {
            },
            "Inject a result table directly into the result store")
 
+      .def("inject_columns",
+           [](lunapi_inst_t & self,
+              const std::string & cmd,
+              const std::string & strata,
+              const std::vector<std::string> & col_names,
+              py::list data_cols,
+              py::object masks) {
+             rtable_t t = rtable_from_columns(col_names, data_cols, masks);
+             self.rtables.tables[cmd][strata] = t;
+           },
+           "cmd"_a, "strata"_a, "col_names"_a, "data_cols"_a, "masks"_a = py::none(),
+           "Inject a result table from typed column buffers (float64/int64 "
+           "arrays or (codes, values) string pairs, plus optional null masks)")
+
       .def(
           "eval_file",
           [](lunapi_inst_t &self, const std::string &cmd) {
@@ -553,6 +1035,14 @@ PYBIND11_MODULE(lunapi0, m) {
 
       .def("get_id", [](const lunapi_inst_t &a) { return a.get_id(); })
 
+      .def("get_edf_file",
+           [](const lunapi_inst_t &a) { return a.get_edf_file(); },
+           "Return the path of the attached EDF (empty if none)")
+
+      .def("get_annot_files",
+           [](const lunapi_inst_t &a) { return a.get_annot_files(); },
+           "Return the attached annotation file(s)")
+
       .def("__repr__", [](const lunapi_inst_t &a) {
         std::string s = "<lunapi-instance id:" + a.get_id();
         const std::string f1 = a.get_edf_file();
@@ -39,3 +39,4 @@ from .resources import *
 from .gpa import gpa_prep, gpa_manifest, gpa_run, gpa_dump, gpa_get_xy, gpa_get_xy_partial, gpa_clear_cache
 from .destrat import *
 from .edf_utils import *
+from .schema import *
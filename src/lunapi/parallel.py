@@ -23,19 +23,56 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import itertools
+import json
+import multiprocessing
 import os
+import pickle
+import queue
+import sqlite3
+import sys
+import threading
+import time
 import traceback
 import warnings
-from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError
 from dataclasses import dataclass, field
+from multiprocessing.connection import Client as _Client
+from multiprocessing.connection import wait as _wait_connections
 from pathlib import Path
 from typing import Mapping
 
+import numpy as np
 import pandas as pd
 
+from .destrat import merge_db
+from .edf_utils import read_edf_header
+from .results import _columns2df, _filter_frame, _table_query
+from .schema import table_schema
+
 
 _CHILD_PROJ = None
+_EVENT_CONN = None
+
+# Per-thread event sink of ThreadBackend workers (see _worker_event), and the
+# lock serialising their use of the process-wide Luna engine state.
+_THREAD_STATE = threading.local()
+_ENGINE_LOCK = threading.RLock()
+
+# Generation counter of the engine/instance result stores.  Every lunapi call
+# that replaces or clears stored results bumps it, which drops the tables
+# memoised by live ProcResult objects (at most _TABLE_CACHE_SIZE each).
+_RESULT_GENERATION = 0
+_TABLE_CACHE_SIZE = 32
+
+
+def _results_changed():
+    """Invalidate tables memoised from the current result stores."""
+    global _RESULT_GENERATION
+    _RESULT_GENERATION += 1
 
 
 class FileOutputModeError(RuntimeError):
@@ -53,6 +90,11 @@ class ProcResult:
     In file-output mode (out_db / out_text): *_owner* is None and table data was
     written directly to disk.  Metadata (errors, records, out_paths) is still
     available; table queries raise FileOutputModeError.
+
+    Tables are converted on first access and memoised (least recently used
+    first out, up to ``_TABLE_CACHE_SIZE`` tables); the memo is dropped when
+    the owner's result store changes, e.g. on the next ``proc()``.  Repeated
+    lookups return the same DataFrame, so copy it before modifying in place.
     """
 
     _owner: object = field(repr=False)
@@ -60,6 +102,8 @@ class ProcResult:
     stdout: pd.DataFrame = field(repr=False)
     records: pd.DataFrame = field(repr=False)
     workers: int = 1
+    elapsed: float = None
+    cache_stats: dict = None
     _out_paths: list = field(default_factory=list, repr=False)
     _data: dict = field(default=None, repr=False)
 
@@ -73,6 +117,8 @@ class ProcResult:
         _out_paths=None,
         _data=None,
         tables=None,
+        elapsed=None,
+        cache_stats=None,
     ):
         if tables is not None and _data is not None:
             raise TypeError("pass either tables or _data, not both")
@@ -81,13 +127,69 @@ class ProcResult:
         self.stdout = pd.DataFrame() if stdout is None else stdout
         self.records = pd.DataFrame() if records is None else records
         self.workers = workers
+        self.elapsed = elapsed
+        self.cache_stats = cache_stats
         self._out_paths = [] if _out_paths is None else _out_paths
         self._data = dict(tables) if tables is not None else _data
+        self._memo = OrderedDict()
+        self._memo_generation = _RESULT_GENERATION
 
     @property
     def ok(self) -> bool:
         return self.errors.empty
 
+    def summary(self, slowest=5):
+        """Summarise the per-record telemetry of a parallel run.
+
+        Parameters
+        ----------
+        slowest : int, optional
+            Number of slowest records (by wall time) to list.
+
+        Returns
+        -------
+        dict
+            ``records``, ``errors``, ``workers``, ``elapsed`` (run wall time
+            in seconds), ``records_per_second``, ``bytes_read`` and
+            ``read_throughput`` (bytes/s), ``cpu_time``, ``eval_time`` and
+            ``convert_time`` (summed over records), ``utilisation`` (busy
+            fraction of the workers over the run) and ``slowest`` (a
+            DataFrame of the slowest records).
+        """
+        records = self.records
+        wall = records["WallTime"] if "WallTime" in records else pd.Series(dtype=float)
+        elapsed = self.elapsed
+        if elapsed is None and wall.notna().any():
+            elapsed = float(wall.sum()) / max(1, self.workers)  # best case with no idle time
+        n_records = len(records)
+
+        def total(column):
+            return float(records[column].sum()) if column in records else 0.0
+
+        bytes_read = int(records["BytesRead"].sum()) if "BytesRead" in records else 0
+        rate = (lambda value: value / elapsed) if elapsed else (lambda value: None)
+        columns = ["Ordinal", "ID", "OK", "Worker", "WallTime", "CPUTime", "PeakRSS"]
+        slow = (
+            records.dropna(subset=["WallTime"]).nlargest(slowest, "WallTime")[columns]
+            if "WallTime" in records else pd.DataFrame(columns=columns)
+        )
+        return {
+            "records": n_records,
+            "errors": len(self.errors),
+            "workers": self.workers,
+            "elapsed": elapsed,
+            "records_per_second": rate(n_records),
+            "bytes_read": bytes_read,
+            "read_throughput": rate(bytes_read),
+            "cpu_time": total("CPUTime"),
+            "eval_time": total("EvalTime"),
+            "convert_time": total("ConvertTime"),
+            "utilisation": (
+                float(wall.sum()) / (elapsed * max(1, self.workers)) if elapsed else None
+            ),
+            "slowest": slow.reset_index(drop=True),
+        }
+
     @property
     def tables(self):
         """Provide mapping-style table access and a callable table index."""
@@ -100,6 +202,27 @@ class ProcResult:
             "Load with lp.import_db() or read text tables directly."
         )
 
+    def _owner_memo(self):
+        """Return the table memo, emptied if the owner's results have changed."""
+        if self._memo_generation != _RESULT_GENERATION:
+            self._memo.clear()
+            self._memo_generation = _RESULT_GENERATION
+        return self._memo
+
+    def _owner_table(self, cmd, strata):
+        """Return ``self._owner.table(cmd, strata)``, converting each table once."""
+        memo = self._owner_memo()
+        key = (cmd, strata if isinstance(strata, str) else tuple(strata))
+        if key in memo:
+            memo.move_to_end(key)
+            return memo[key]
+        t = self._owner.table(cmd, strata)
+        if t is not None:
+            memo[key] = t
+            while len(memo) > _TABLE_CACHE_SIZE:
+                memo.popitem(last=False)
+        return t
+
     def _owner_keys(self):
         if self._data is not None:
             return list(self._data.keys())
@@ -125,7 +248,7 @@ class ProcResult:
         if isinstance(key, tuple) and len(key) == 2:
             return self.table(key[0], key[1])
         cmd, strata = _split_table_key(key)
-        t = self._owner.table(cmd, strata)
+        t = self._owner_table(cmd, strata)
         if t is None:
             available = ", ".join(self._owner_keys()) or "<none>"
             raise KeyError(f"{key!r} not found in results. Available: {available}")
@@ -149,7 +272,7 @@ class ProcResult:
             return
         for key in self._owner_keys():
             cmd, strata = _split_table_key(key)
-            yield key, self._owner.table(cmd, strata)
+            yield key, self._owner_table(cmd, strata)
 
     def values(self):
         if self._data is not None:
@@ -157,7 +280,7 @@ class ProcResult:
             return
         for key in self._owner_keys():
             cmd, strata = _split_table_key(key)
-            yield self._owner.table(cmd, strata)
+            yield self._owner_table(cmd, strata)
 
     def get(self, key, default=None):
         try:
@@ -165,14 +288,24 @@ class ProcResult:
         except (KeyError, FileOutputModeError):
             return default
 
-    def table(self, cmd, strata="BL"):
-        """Return one result table by Luna command and strata."""
+    def table(self, cmd, strata="BL", columns=None, where=None, ids=None):
+        """Return one result table by Luna command and strata.
+
+        *columns*, *where* and *ids* select columns and rows as in
+        :meth:`lunapi.project.proj.table`; for live results the selection
+        is made in the result store, before conversion.
+        """
+        selected = columns is not None or where is not None or ids is not None
         if self._data is not None:
             key = _resolve_table_key(self._data, cmd, strata)
+            if selected:
+                return _filter_frame(self._data[key], columns, where, ids)
             return self._data[key]
         if self._owner is None:
             self._file_mode_error()
-        return self._owner.table(cmd, strata)
+        if selected:
+            return self._owner.table(cmd, strata, columns=columns, where=where, ids=ids)
+        return self._owner_table(cmd, strata)
 
     def strata(self):
         """Return available command/strata pairs as a DataFrame."""
@@ -206,7 +339,7 @@ class ProcResult:
         if self._owner is None:
             return False
         try:
-            return self._owner.table(cmd, strata) is not None
+            return self._owner_table(cmd, strata) is not None
         except Exception:
             return False
 
@@ -215,6 +348,9 @@ class ProcResult:
 
         The returned ``ProcResult`` owns its data independently of the
         project cache, so subsequent ``proc()`` calls do not affect it.
+        Memoised tables are reused rather than converted again; with pandas
+        copy-on-write enabled the copies share column buffers until either
+        side is modified.
         Useful when calling ``proc()`` in a loop::
 
           res = {}
@@ -230,8 +366,10 @@ class ProcResult:
             stdout=self.stdout.copy(),
             records=self.records.copy(),
             workers=self.workers,
+            elapsed=self.elapsed,
+            cache_stats=None if self.cache_stats is None else dict(self.cache_stats),
             _out_paths=list(self._out_paths),
-            _data={k: df.copy() for k, df in self.items()},
+            _data={k: _cow_copy(df) for k, df in self.items()},
         )
 
     def table_index(self):
@@ -303,6 +441,11 @@ class ProcResult:
         ) + self.errors._repr_html_()
 
 
+def _cow_copy(df):
+    """Copy *df*: lazily under pandas copy-on-write, deeply otherwise."""
+    return df.copy(deep=pd.options.mode.copy_on_write is not True)
+
+
 class _ResultTables:
     """Mapping view that retains the historical ``result.tables()`` API."""
 
@@ -556,7 +699,8 @@ def normalize_result_table(df, record_id):
 def project_eval_slices(tasks, workers, batch_size=None):
     if not tasks:
         return []
-    workers = clamp_workers(workers, len(tasks))
+    # callers have already bounded *workers* (possibly by a remote backend's capacity)
+    workers = clamp_workers(workers, len(tasks), cpu_count=workers)
     if batch_size is None:
         chunk_size = max(1, (len(tasks) + workers - 1) // workers)
     else:
@@ -580,6 +724,142 @@ def project_eval_slices(tasks, workers, batch_size=None):
     return chunks
 
 
+def estimate_record_cost(sample_row) -> float:
+    """Estimate the relative processing cost of one sample-list record.
+
+    The estimate is the total number of samples in the EDF (records x
+    samples per record, summed over channels), read from the EDF header.
+    Files whose header cannot be parsed, such as compressed EDFs, fall
+    back to half their size in bytes (EDF stores 2-byte samples), and
+    missing files cost 0.
+    """
+    edf = str(sample_row[1]) if len(sample_row) > 1 and sample_row[1] else ""
+    if not edf or not os.path.isfile(edf):
+        return 0.0
+    try:
+        return float(read_edf_header(edf)["total_samples"])
+    except (OSError, ValueError):
+        try:
+            return os.path.getsize(edf) / 2.0
+        except OSError:
+            return 0.0
+
+
+def project_cost_slices(tasks, workers, batch_size=None):
+    """Group tasks into slices ordered longest-first by estimated cost.
+
+    Tasks are sorted by descending ``cost`` (estimated with
+    :func:`estimate_record_cost` when not already present) and cut into
+    slices of *batch_size* records, one record per slice by default.
+    Submitting these slices in order to idle workers is a longest-processing-
+    time-first schedule, so one long recording does not leave the other
+    workers idle at the end of the run.  Ordinals within a slice need not
+    be contiguous; ``start_ordinal``/``end_ordinal`` are their minimum and
+    maximum.
+    """
+    if not tasks:
+        return []
+    try:
+        chunk_size = max(1, int(batch_size)) if batch_size is not None else 1
+    except (TypeError, ValueError):
+        chunk_size = 1
+    costed = _cost_ordered(tasks)
+    chunks = []
+    for chunk_index, start in enumerate(range(0, len(costed), chunk_size), start=1):
+        records = costed[start:start + chunk_size]
+        ordinals = [record["ordinal"] for record in records]
+        chunks.append({
+            "slice_index": chunk_index,
+            "start_ordinal": min(ordinals),
+            "end_ordinal": max(ordinals),
+            "rows": [list(record["sample_row"]) for record in records],
+            "records": records,
+            "cost": sum(record["cost"] for record in records),
+        })
+    return chunks
+
+
+def _cost_ordered(tasks):
+    """Return *tasks* with a ``cost`` estimate, sorted longest-first."""
+    costed = []
+    for task in tasks:
+        if task.get("cost") is None:
+            task = dict(task, cost=estimate_record_cost(task["sample_row"]))
+        costed.append(task)
+    costed.sort(key=lambda task: (-task["cost"], task["ordinal"]))
+    return costed
+
+
+# Target wall time of one adaptively sized slice, and its largest size.
+_AUTO_BATCH_SECONDS = 2.0
+_AUTO_BATCH_MAX = 256
+
+
+class _AdaptiveSlices:
+    """Cut tasks into slices on demand, sized from observed record latency.
+
+    Used for ``batch_size='auto'``.  The first slices hold one record each;
+    once records complete, each new slice holds about
+    ``_AUTO_BATCH_SECONDS`` worth of records at the running mean latency,
+    at most double the previous slice and never more than an even share of
+    the remaining records per worker, so slices shrink again towards the
+    end of the run.  Behaves like the ``deque`` :meth:`WorkerPool._dispatch`
+    otherwise uses: slices requeued after a failure are handed out first.
+    """
+
+    def __init__(self, tasks, workers, first_index=1, extra=None):
+        self._tasks = deque(tasks)
+        self._requeued = deque()
+        self.workers = max(1, int(workers or 1))
+        self.indices = itertools.count(first_index)
+        self.extra = dict(extra or {})
+        self.size = 1
+        self.latency = None
+        self.observed = 0
+
+    def __bool__(self):
+        return bool(self._requeued or self._tasks)
+
+    def __len__(self):
+        return len(self._requeued) + len(self._tasks)
+
+    def observe(self, seconds):
+        """Fold one record's run time into the running mean latency."""
+        self.observed += 1
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += (seconds - self.latency) / min(self.observed, 20)
+
+    def batch_size(self):
+        if self.latency is None:
+            return 1
+        wanted = int(_AUTO_BATCH_SECONDS / max(self.latency, 1e-6))
+        share = -(-len(self._tasks) // self.workers)
+        return max(1, min(wanted, 2 * self.size, share, _AUTO_BATCH_MAX))
+
+    def popleft(self):
+        if self._requeued:
+            return self._requeued.popleft()
+        if not self._tasks:
+            raise IndexError("pop from empty slice queue")
+        self.size = self.batch_size()
+        records = [self._tasks.popleft() for _ in range(min(self.size, len(self._tasks)))]
+        ordinals = [record["ordinal"] for record in records]
+        task_slice = {
+            "slice_index": next(self.indices),
+            "start_ordinal": min(ordinals),
+            "end_ordinal": max(ordinals),
+            "rows": [list(record["sample_row"]) for record in records],
+            "records": records,
+        }
+        task_slice.update(self.extra)
+        return task_slice
+
+    def extendleft(self, slices):
+        self._requeued.extendleft(slices)
+
+
 def normalize_sample_row(row) -> list[str]:
     out = []
     for value in row:
@@ -594,6 +874,246 @@ def normalize_sample_row(row) -> list[str]:
     return out
 
 
+# --- columnar worker -> parent transport --------------------------------------
+#
+# Worker result tables travel as typed numpy column buffers rather than pickled
+# object-dtype DataFrames: int64 and float64 columns as contiguous arrays, and
+# string columns dictionary-encoded as int32 codes plus one list of distinct
+# values.  Tables are decoded once in the parent, after concatenating the
+# buffers of all records for a table key.
+
+def _encode_column(values):
+    """Encode one column of Luna table values as ``(kind, payload)``."""
+    kinds = {type(value) for value in values}
+    if kinds <= {int}:
+        return "i", np.fromiter(values, dtype=np.int64, count=len(values))
+    if kinds <= {int, float, type(None)}:
+        return "f", np.array([np.nan if value is None else value for value in values],
+                             dtype=np.float64)
+    codes = np.empty(len(values), dtype=np.int32)
+    lookup = {}
+    for i, value in enumerate(values):
+        codes[i] = -1 if value is None else lookup.setdefault(str(value), len(lookup))
+    return "s", (codes, list(lookup))
+
+
+def encode_result_table(cols, data, record_id):
+    """Encode a raw ``(columns, data)`` Luna table for transfer to the parent.
+
+    *data* is the column-major list returned by ``edf.table()``.  As with
+    :func:`normalize_result_table`, an ``ID`` column is placed first and
+    blank IDs are filled with *record_id*.
+    """
+    record_id = "" if record_id is None else str(record_id)
+    cols = list(cols)
+    data = [list(column) for column in data]
+    nrows = len(data[0]) if data else 0
+    if "ID" in cols:
+        j = cols.index("ID")
+        ids = [record_id if value is None or str(value).strip() == "" else value
+               for value in data.pop(j)]
+        cols.pop(j)
+    else:
+        ids = [record_id] * nrows
+    return {
+        "columns": ["ID"] + cols,
+        "nrows": nrows,
+        "data": [_encode_column(ids)] + [_encode_column(column) for column in data],
+    }
+
+
+def _encode_typed_column(column, mask=None):
+    """Encode one typed ``table_columns()`` buffer as ``(kind, payload)``."""
+    if isinstance(column, tuple):
+        codes, values = column
+        return "s", (np.asarray(codes, dtype=np.int32), list(values))
+    column = np.asarray(column)
+    if column.dtype.kind == "f":
+        return "f", column.astype(np.float64, copy=False)
+    if mask is not None and np.any(mask):
+        column = column.astype(np.float64)
+        column[np.asarray(mask, dtype=bool)] = np.nan
+        return "f", column
+    return "i", column.astype(np.int64, copy=False)
+
+
+def _fill_blank_ids(kind, payload, record_id):
+    """Replace blank or missing values of an encoded ``ID`` column with *record_id*."""
+    if kind != "s":
+        values = _decode_column(kind, payload)
+        return _encode_column([
+            record_id if value is None or (isinstance(value, float) and np.isnan(value))
+            else value.item() if isinstance(value, np.generic) else value
+            for value in values
+        ])
+    codes, values = payload
+    blank = np.array([str(value).strip() == "" for value in values] + [True])
+    missing = blank[codes]
+    if not missing.any():
+        return kind, payload
+    values = list(values)
+    if record_id not in values:
+        values.append(record_id)
+    codes = codes.copy()
+    codes[missing] = values.index(record_id)
+    return "s", (codes, values)
+
+
+def encode_result_columns(cols, columns, masks, record_id):
+    """Encode a typed ``table_columns()`` Luna table for transfer to the parent.
+
+    The typed counterpart of :func:`encode_result_table`: buffers are
+    passed through without per-value conversion, an ``ID`` column is
+    placed first and blank IDs are filled with *record_id*.
+    """
+    record_id = "" if record_id is None else str(record_id)
+    cols = list(cols)
+    if masks is None:
+        masks = [None] * len(cols)
+    data = [_encode_typed_column(column, mask) for column, mask in zip(columns, masks)]
+    nrows = 0
+    if data:
+        kind, payload = data[0]
+        nrows = len(payload[0]) if kind == "s" else len(payload)
+    if "ID" in cols:
+        j = cols.index("ID")
+        cols.pop(j)
+        ids = _fill_blank_ids(*data.pop(j), record_id)
+    else:
+        ids = "s", (np.zeros(nrows, dtype=np.int32), [record_id])
+    return {"columns": ["ID"] + cols, "nrows": nrows, "data": [ids] + data}
+
+
+def _decode_column(kind, payload):
+    if kind != "s":
+        return payload
+    codes, categories = payload
+    lookup = np.empty(len(categories) + 1, dtype=object)
+    lookup[:-1] = categories
+    lookup[-1] = None
+    return lookup[codes]
+
+
+def _null_column(kind, nrows):
+    if kind == "s":
+        return "s", (np.full(nrows, -1, dtype=np.int32), [])
+    return "f", np.full(nrows, np.nan)
+
+
+def _concat_columns(encoded):
+    """Concatenate encoded columns, merging string dictionaries.
+
+    ``("n", nrows)`` entries stand for a column absent from one record and
+    become missing values of the merged kind.
+    """
+    kinds = {kind for kind, _ in encoded} - {"n"}
+    target = "s" if kinds == {"s"} else "f"
+    absent = any(kind == "n" for kind, _ in encoded)
+    encoded = [_null_column(target, payload) if kind == "n" else (kind, payload)
+               for kind, payload in encoded]
+    if kinds == {"i"} and not absent:
+        return "i", np.concatenate([payload for _, payload in encoded])
+    if kinds <= {"i", "f"}:
+        return "f", np.concatenate([payload.astype(np.float64, copy=False)
+                                    for _, payload in encoded])
+    if kinds == {"s"}:
+        merged = {}
+        parts = []
+        for _, (codes, categories) in encoded:
+            remap = np.array(
+                [merged.setdefault(value, len(merged)) for value in categories] + [-1],
+                dtype=np.int32,
+            )
+            parts.append(remap[codes])
+        return "s", (np.concatenate(parts), list(merged))
+    # numbers and strings for the same column in different records
+    values = np.concatenate([_decode_column(kind, payload).astype(object)
+                             for kind, payload in encoded])
+    return _encode_column([value.item() if isinstance(value, np.generic) else value
+                           for value in values])
+
+
+def _numeric_column(kind, payload):
+    """Convert a string column whose distinct values are all numeric.
+
+    Only the dictionary is parsed, so the cost is independent of the number
+    of rows.
+    """
+    if kind != "s":
+        return kind, payload
+    codes, categories = payload
+    try:
+        numeric = pd.to_numeric(pd.Series(categories, dtype=object)).to_numpy()
+    except (ValueError, TypeError):
+        return kind, payload
+    if numeric.dtype.kind == "i" and not (codes < 0).any():
+        return "i", numeric.astype(np.int64)[codes]
+    lookup = np.append(numeric.astype(np.float64), np.nan)
+    return "f", lookup[codes]
+
+
+def _merge_result_tables(parts, cmd=None, strata=None):
+    """Merge encoded tables (one per record) into ``(columns, encoded_columns)``.
+
+    With *cmd* and *strata*, the kind of each numeric column is recorded
+    in the session :func:`table_schema`, and integer columns it has seen
+    hold floats are returned as floats.
+    """
+    schema = table_schema() if cmd is not None else None
+    columns = []
+    for part in parts:
+        columns.extend(col for col in part["columns"] if col not in columns)
+    merged = []
+    for col in columns:
+        encoded = []
+        for part in parts:
+            if col in part["columns"]:
+                encoded.append(part["data"][part["columns"].index(col)])
+            else:
+                encoded.append(("n", part["nrows"]))
+        kind, payload = _concat_columns(encoded)
+        if "ID" not in col.split("_"):
+            kind, payload = _numeric_column(kind, payload)
+            if schema is not None and not (kind == "f" and np.isnan(payload).all()):
+                if schema.learn(cmd, strata, col, kind) == "f" and kind == "i":
+                    kind, payload = "f", payload.astype(np.float64)
+        merged.append((kind, payload))
+    return columns, merged
+
+
+def decode_result_tables(parts, cmd=None, strata=None):
+    """Decode and concatenate encoded tables (one per record) into a DataFrame.
+
+    String columns whose values are all numeric are returned as numbers,
+    except ``ID`` columns.  Pass *cmd* and *strata* to type the columns by
+    the session :func:`table_schema`.
+    """
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    columns, merged = _merge_result_tables(parts, cmd, strata)
+    return pd.DataFrame(
+        {col: _decode_column(kind, payload) for col, (kind, payload) in zip(columns, merged)},
+        columns=columns,
+    )
+
+
+def _inject_result_tables(target, cmd, strata, parts):
+    """Inject encoded tables into the result store of an engine or instance.
+
+    Columns are passed as typed buffers (``(codes, values)`` for strings) to
+    the bulk ``inject_columns`` binding, which fills the table without
+    per-value conversion.  The store is replaced under ``_ENGINE_LOCK``,
+    which the ``table()`` accessors hold while reading it in place.
+    """
+    columns, merged = _merge_result_tables(parts, cmd, strata)
+    with _ENGINE_LOCK:
+        _results_changed()
+        target.inject_columns(cmd, strata, columns,
+                              [payload for _, payload in merged],
+                              [None] * len(columns))
+
+
 def _init_child_project():
     global _CHILD_PROJ
     import lunapi as lp
@@ -602,6 +1122,63 @@ def _init_child_project():
     _CHILD_PROJ.silence(True)
 
 
+def _reset_child_project(proj):
+    """Drop sample-list, variable and result state left by a previous call."""
+    proj.clear()
+    proj.clear_vars()
+    proj.reinit()
+
+
+def _process_read_bytes(thread=False):
+    """Bytes read by this process (or thread) so far (``rchar`` in ``/proc``), or ``None``."""
+    try:
+        with open("/proc/thread-self/io" if thread else "/proc/self/io", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes, or ``None``."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _telemetry_start(thread=False):
+    cpu = time.thread_time() if thread else time.process_time()
+    return (time.perf_counter(), cpu, _process_read_bytes(thread), thread)
+
+
+def _record_telemetry(start, eval_time, convert_time):
+    """Resource usage of one record since *start* (see :func:`_telemetry_start`).
+
+    ``peak_rss`` is the worker's high-water mark after the record, and
+    ``bytes_read`` counts every read by the worker during the record, which
+    is dominated by the EDF and annotation files.  For thread workers, CPU
+    time and bytes read are those of the thread, while ``peak_rss`` is that
+    of the whole process.
+    """
+    wall0, cpu0, read0, thread = start
+    read1 = _process_read_bytes(thread)
+    cpu1 = time.thread_time() if thread else time.process_time()
+    return {
+        "worker": os.getpid(),
+        "wall_time": time.perf_counter() - wall0,
+        "cpu_time": cpu1 - cpu0,
+        "eval_time": eval_time,
+        "convert_time": convert_time,
+        "peak_rss": _peak_rss(),
+        "bytes_read": None if read0 is None or read1 is None else read1 - read0,
+    }
+
+
 def _run_record(proj, record):
     ordinal = record["ordinal"]
     sample_row = record["sample_row"]
@@ -610,6 +1187,8 @@ def _run_record(proj, record):
     params = record["params"]
     id_str = str(sample_row[0] or "").strip()
     stdout_txt = ""
+    start = _telemetry_start()
+    eval_time = convert_time = 0.0
     try:
         proj.clear_vars()
         proj.reinit()
@@ -621,8 +1200,11 @@ def _run_record(proj, record):
         except NameError:
             from lunapi.instance import inst as _inst
             p = _inst(proj.eng.inst(id_str))
+        t0 = time.perf_counter()
         stdout_txt = p.eval_lunascope(cmd) or ""
+        eval_time = time.perf_counter() - t0
 
+        t0 = time.perf_counter()
         tbls = p.strata()
         tree_tbls = None
         results = {}
@@ -630,9 +1212,9 @@ def _run_record(proj, record):
             tree_tbls = tbls[["Command", "Strata"]].copy()
             for row in tbls.itertuples(index=False):
                 key = _table_key(row.Command, row.Strata)
-                df = normalize_result_table(p.table(row.Command, row.Strata), id_str)
-                if df is not None:
-                    results[key] = df
+                cols, columns, masks = p.edf.table_columns(row.Command, row.Strata)
+                results[key] = encode_result_columns(cols, columns, masks, id_str)
+        convert_time = time.perf_counter() - t0
 
         try:
             p.silent_proc("REPORT show-all")
@@ -649,6 +1231,7 @@ def _run_record(proj, record):
             "results": results,
             "error": None,
             "traceback": None,
+            "telemetry": _record_telemetry(start, eval_time, convert_time),
         }
     except Exception as exc:
         return {
@@ -661,6 +1244,7 @@ def _run_record(proj, record):
             "results": {},
             "error": f"{type(exc).__name__}: {exc}",
             "traceback": traceback.format_exc(),
+            "telemetry": _record_telemetry(start, eval_time, convert_time),
         }
 
 
@@ -672,14 +1256,16 @@ def _slice_worker(task):
     rows = task["rows"]
     records = task["records"]
     try:
-        proj.clear()
+        _reset_child_project(proj)
         proj.eng.set_sample_list(rows)
         results = []
         for record in records:
             record = dict(record)
             record["slice_index"] = task["slice_index"]
+            _worker_event("record_start", record["ordinal"])
             result = _run_record(proj, record)
-            results.append(result)
+            if not _worker_event("record_done", result):
+                results.append(result)
         return {
             "slice_index": task["slice_index"],
             "start_ordinal": task["start_ordinal"],
@@ -701,6 +1287,8 @@ def _run_record_file(proj, record):
     cmd = record["cmd"]
     params = record["params"]
     id_str = str(sample_row[0] or "").strip()
+    start = _telemetry_start()
+    eval_time = 0.0
     try:
         proj.clear_vars()
         proj.reinit()
@@ -711,7 +1299,9 @@ def _run_record_file(proj, record):
         except NameError:
             from lunapi.instance import inst as _inst
             p = _inst(proj.eng.inst(id_str))
+        t0 = time.perf_counter()
         p.edf.eval_file(cmd)
+        eval_time = time.perf_counter() - t0
         return {
             "ordinal": ordinal,
             "label": label,
@@ -722,6 +1312,7 @@ def _run_record_file(proj, record):
             "results": {},
             "error": None,
             "traceback": None,
+            "telemetry": _record_telemetry(start, eval_time, 0.0),
         }
     except Exception as exc:
         return {
@@ -734,9 +1325,16 @@ def _run_record_file(proj, record):
             "results": {},
             "error": f"{type(exc).__name__}: {exc}",
             "traceback": traceback.format_exc(),
+            "telemetry": _record_telemetry(start, eval_time, 0.0),
         }
 
 
+def _slice_out_path(out_db, out_text, slice_index):
+    if out_db:
+        return f"{out_db}-{slice_index}.db"
+    return out_text  # all workers share same folder; rows are keyed by ID
+
+
 def _slice_worker_file(task):
     """Slice worker that writes results to a file (out_db or out_text mode)."""
     global _CHILD_PROJ
@@ -749,11 +1347,11 @@ def _slice_worker_file(task):
     out_text = task.get("out_text")
     slice_idx = task["slice_index"]
 
+    _reset_child_project(proj)
+    out_path = _slice_out_path(out_db, out_text, slice_idx)
     if out_db:
-        out_path = f"{out_db}-{slice_idx}.db"
         proj.eng.output_attach(out_path)
     else:
-        out_path = out_text  # all workers share same folder; rows are keyed by ID
         proj.eng.output_plaintext(out_path)
 
     try:
@@ -763,8 +1361,10 @@ def _slice_worker_file(task):
         for record in records:
             record = dict(record)
             record["slice_index"] = slice_idx
+            _worker_event("record_start", record["ordinal"])
             result = _run_record_file(proj, record)
-            results.append(result)
+            if not _worker_event("record_done", result):
+                results.append(result)
         return {
             "slice_index": slice_idx,
             "start_ordinal": task["start_ordinal"],
@@ -783,157 +1383,1947 @@ def _slice_worker_file(task):
             pass
 
 
-def _create_process_pool(workers, mp_context):
-    kwargs = {
-        "max_workers": workers,
-        "mp_context": mp_context,
-        "initializer": _init_child_project,
-    }
+def _run_record_thread(record):
+    """Run one record on the parent's engine from a :class:`ThreadBackend` worker.
+
+    Engine-global state (project variables, instance creation, evaluation
+    and the ``REPORT`` settings) is only touched under ``_ENGINE_LOCK``;
+    converting the instance's tables to column buffers runs outside it, in
+    parallel with other threads.  *params* are set for the record and the
+    previous project variables restored afterwards.
+    """
+    from .instance import inst as _inst
+    from .project import _coerce_var_value, proj
+
+    eng = proj.eng
+    ordinal = record["ordinal"]
+    id_str = str(record["sample_row"][0] or "").strip()
+    params = record["params"]
+    stdout_txt = ""
+    start = _telemetry_start(thread=True)
+    eval_time = convert_time = 0.0
     try:
-        return ProcessPoolExecutor(**kwargs)
-    except PermissionError:
-        real_sysconf = getattr(os, "sysconf", None)
-        if real_sysconf is None:
-            raise
+        with _ENGINE_LOCK:
+            saved = eng.get_all_opts() if params else None
+            try:
+                for key, value in params:
+                    eng.opt(key, _coerce_var_value(value))
+                if record.get("attach"):
+                    # channel fan-out: not a row of the project's sample list
+                    _, edf, annots = record["sample_row"][:3]
+                    p = _inst(eng.inst(id_str, edf, set(_split_annot_files(annots))))
+                else:
+                    p = _inst(eng.inst(ordinal - 1))
+                t0 = time.perf_counter()
+                stdout_txt = p.eval_lunascope(record["cmd"]) or ""
+                eval_time = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                tbls = p.strata()
+                raw = []
+                if tbls is not None:
+                    for row in tbls.itertuples(index=False):
+                        raw.append((row.Command, row.Strata,
+                                    p.edf.table_columns(row.Command, row.Strata)))
+                convert_time = time.perf_counter() - t0
+                try:
+                    p.silent_proc("REPORT show-all")
+                except RuntimeError:
+                    pass
+            finally:
+                if saved is not None:
+                    eng.clear_all_opts()
+                    for key, value in saved.items():
+                        eng.opt(key, value)
+        t0 = time.perf_counter()
+        results = {
+            _table_key(cmd, strata): encode_result_columns(cols, columns, masks, id_str)
+            for cmd, strata, (cols, columns, masks) in raw
+        }
+        convert_time += time.perf_counter() - t0
+        return {
+            "ordinal": ordinal,
+            "label": record["label"],
+            "id": id_str,
+            "slice_index": record.get("slice_index"),
+            "stdout": stdout_txt,
+            "tbls": None if tbls is None else tbls[["Command", "Strata"]].copy(),
+            "results": results,
+            "error": None,
+            "traceback": None,
+            "telemetry": _record_telemetry(start, eval_time, convert_time),
+        }
+    except Exception as exc:
+        return {
+            "ordinal": ordinal,
+            "label": record["label"],
+            "id": id_str,
+            "slice_index": record.get("slice_index"),
+            "stdout": stdout_txt,
+            "tbls": None,
+            "results": {},
+            "error": f"{type(exc).__name__}: {exc}",
+            "traceback": traceback.format_exc(),
+            "telemetry": _record_telemetry(start, eval_time, convert_time),
+        }
 
-        def safe_sysconf(name):
-            if name == "SC_SEM_NSEMS_MAX":
-                return -1
-            return real_sysconf(name)
 
-        os.sysconf = safe_sysconf
-        try:
-            return ProcessPoolExecutor(**kwargs)
-        finally:
-            os.sysconf = real_sysconf
+def _slice_worker_thread(task):
+    """Thread-backend counterpart of :func:`_slice_worker`.
 
+    Records are evaluated on the parent's engine and its own sample list,
+    so nothing is reset between slices.
+    """
+    results = []
+    for record in task["records"]:
+        record = dict(record)
+        record["slice_index"] = task["slice_index"]
+        _worker_event("record_start", record["ordinal"])
+        result = _run_record_thread(record)
+        if not _worker_event("record_done", result):
+            results.append(result)
+    return {
+        "slice_index": task["slice_index"],
+        "start_ordinal": task["start_ordinal"],
+        "end_ordinal": task["end_ordinal"],
+        "results": results,
+    }
 
-def run_parallel_project(
-    project,
-    cmdstr: str,
-    *,
-    workers=None,
-    batch_size=None,
-    params=None,
-    param_file=None,
-    strict: bool = False,
-    progress=None,
-    out_db=None,
-    out_text=None,
-    in_memory=None,
-    n1=None,
-    n2=None,
-    ids=None,
-    skip=None,
-) -> ParallelProcResult:
-    import multiprocessing
 
-    if out_db and out_text:
-        raise ValueError("out_db and out_text are mutually exclusive")
-    file_mode = bool(out_db or out_text)
-    if in_memory is None:
-        in_memory = not file_mode
-    if in_memory and file_mode:
-        raise ValueError(
-            "Simultaneous in_memory and file output is not supported; pass in_memory=False"
-        )
+# Slice functions submitted to a _ThreadWorker run as their in-process variant.
+_THREAD_SLICE_WORKERS = {_slice_worker: _slice_worker_thread}
 
-    sample_list = project.sample_list(df=False)
-    if not sample_list:
-        result = ParallelProcResult(
-            tables={},
-            errors=_errors_frame([]),
-            stdout=_stdout_frame([]),
-            records=_records_frame([]),
-            workers=0,
-        )
-        if strict:
-            raise ParallelProcError("parallel processing failed: no records in sample list", result)
-        return result
 
-    resolved_params = resolve_params(params=params, param_file=param_file)
-    if batch_size is None and progress is True and not file_mode:
-        batch_size = 1
+def _worker_event(kind, payload) -> bool:
+    """Send an in-progress ``("event", kind, payload)`` message to the pool.
 
-    tasks = [
-        {
-            "ordinal": idx,
-            "sample_row": normalize_sample_row(row),
-            "label": str(row[0] or "").strip(),
-            "cmd": cmdstr,
-            "params": resolved_params,
-        }
-        for idx, row in enumerate(sample_list, start=1)
-        if str(row[0] or "").strip()
-    ]
+    Returns ``False`` (and sends nothing) outside a :class:`WorkerPool` worker.
+    Slice workers announce each record as it starts and stream each record
+    result as it finishes, so that the parent can apply per-record limits and
+    keep the results of a slice whose worker is later killed.
+    """
+    send = getattr(_THREAD_STATE, "send", None)
+    if send is not None:
+        send(("event", kind, payload))
+        return True
+    if _EVENT_CONN is None:
+        return False
+    _EVENT_CONN.send(("event", kind, payload))
+    return True
+
+
+def _worker_main(conn):
+    """Child-process loop: keep one warm Luna engine and run submitted slices.
+
+    Messages are ``("ping",)``, ``("task", fn, payload)`` or ``None`` (exit).
+    Replies are ``("pong", pid)``, ``("result", value)`` or
+    ``("error", message, traceback)``, preceded by any ``("event", kind,
+    payload)`` messages sent while the task runs.
+    """
+    global _EVENT_CONN
+    _EVENT_CONN = conn
+    _init_child_project()
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if msg is None:
+            break
+        if msg[0] == "ping":
+            conn.send(("pong", os.getpid()))
+            continue
+        _, fn, payload = msg
+        try:
+            reply = ("result", fn(payload))
+        except Exception as exc:
+            reply = ("error", f"{type(exc).__name__}: {exc}", traceback.format_exc())
+        conn.send(reply)
 
-    # --- row-range and ID filtering (mirrors luna n1/n2 and id=/skip= args) ---
-    if n1 is not None or n2 is not None:
-        lo = n1 if n1 is not None else 1
-        hi = n2 if n2 is not None else (tasks[-1]["ordinal"] if tasks else 0)
-        tasks = [t for t in tasks if lo <= t["ordinal"] <= hi]
 
-    if ids is not None:
-        if isinstance(ids, str):
-            ids = ids.split()
-        ids_set = set(ids)
-        tasks = [t for t in tasks if t["label"] in ids_set]
+class WorkerPoolError(RuntimeError):
+    """Raised when a worker pool is used after close() or cannot be restarted."""
+    pass
 
-    if skip is not None:
-        if isinstance(skip, str):
-            skip = skip.split()
-        skip_set = set(skip)
-        tasks = [t for t in tasks if t["label"] not in skip_set]
-    # --------------------------------------------------------------------------
 
-    # Clamp workers to the actual number of tasks after filtering
-    workers = clamp_workers(workers, len(tasks))
-    slices = project_eval_slices(tasks, workers, batch_size=batch_size)
+class _Worker:
+    """One child process holding a warm ``_CHILD_PROJ`` engine."""
+
+    def __init__(self, ctx, index):
+        self.index = index
+        self._ctx = ctx
+        self.process = None
+        self.conn = None
+        self.task = None
+        self.current = None
+        self.streamed = []
+        self.tasks_run = 0
+        self.records_run = 0
+        self.started = None
+        self.start()
+
+    def start(self):
+        parent_conn, child_conn = self._ctx.Pipe(duplex=True)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn,),
+            name=f"lunapi-worker-{self.index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self.process = process
+        self.conn = parent_conn
+        self.task = None
+        self.current = None
+        self.streamed = []
+        self.tasks_run = 0
+        self.records_run = 0
+        self.started = time.time()
 
-    completed = []
-    completed_ordinals = set()
-    executor = None
-    pending = {}
-    pool_error = None
-    progress_callback, close_progress = _coerce_progress(progress, len(tasks))
+    @property
+    def pid(self):
+        return None if self.process is None else self.process.pid
 
-    def emit(event):
-        if progress_callback is not None:
-            progress_callback(event)
+    @property
+    def sentinel(self):
+        return self.process.sentinel
 
-    def handle_record_result(result):
-        ordinal = result.get("ordinal")
-        if ordinal in completed_ordinals:
-            return
-        completed_ordinals.add(ordinal)
-        completed.append(result)
-        emit({
-            "event": "record",
-            "ordinal": ordinal,
-            "total": len(tasks),
-            "id": result.get("id"),
-            "error": result.get("error"),
-        })
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
 
-    worker_fn = _slice_worker_file if file_mode else _slice_worker
-    collected_out_paths = []
+    def submit(self, fn, payload):
+        self.conn.send(("task", fn, payload))
+        self.task = payload
+        self.current = None
+        self.streamed = []
 
-    def handle_slice_result(slice_result):
-        if "out_path" in slice_result:
-            collected_out_paths.append(slice_result["out_path"])
-        for result in slice_result.get("results", []):
-            handle_record_result(result)
+    def rss(self):
+        """Resident set size of the worker process in bytes, if known."""
+        return _process_rss(self.pid)
 
-    try:
-        mp_context = multiprocessing.get_context("spawn")
-        executor = _create_process_pool(workers, mp_context)
-        for task_slice in slices:
-            submitted_slice = dict(task_slice)
-            if file_mode:
-                submitted_slice["out_db"] = out_db
-                submitted_slice["out_text"] = out_text
-            fut = executor.submit(worker_fn, submitted_slice)
-            pending[fut] = task_slice
+    def poll(self) -> bool:
+        return self.conn.poll()
+
+    def recv(self):
+        return self.conn.recv()
+
+    def exit_reason(self) -> str:
+        return f"worker process exited (exit code {self.process.exitcode})"
+
+    def ping(self, timeout) -> bool:
+        try:
+            self.conn.send(("ping",))
+            if not self.conn.poll(timeout):
+                return False
+            return self.conn.recv()[0] == "pong"
+        except (EOFError, OSError):
+            return False
+
+    def stop(self, timeout=5.0):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1.0)
+        self.conn.close()
+        self.process = None
+
+    def kill(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(1.0)
+        self.conn.close()
+        self.process = None
+
+    def restart(self):
+        self.kill()
+        self.start()
+
+
+class _ThreadWorker:
+    """One worker thread in this process, evaluating on the shared engine.
+
+    Messages are exchanged as with a :class:`_Worker` process, but objects
+    are handed over in memory: the thread appends each reply to an outbox
+    and writes an empty byte message to a pipe, whose read end is the
+    waitable :attr:`conn`.  Threads cannot be killed; :meth:`kill` detaches
+    the thread, which exits after its current slice.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.thread = None
+        self.conn = None
+        self.task = None
+        self.current = None
+        self.streamed = []
+        self.tasks_run = 0
+        self.records_run = 0
+        self.started = None
+        self.start()
+
+    def start(self):
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        self._inbox = queue.SimpleQueue()
+        self._outbox = deque()
+        self.thread = threading.Thread(
+            target=self._run,
+            args=(self._inbox, self._outbox, writer),
+            name=f"lunapi-worker-{self.index}",
+            daemon=True,
+        )
+        self.conn = reader
+        self.task = None
+        self.current = None
+        self.streamed = []
+        self.tasks_run = 0
+        self.records_run = 0
+        self.started = time.time()
+        self.thread.start()
+
+    @staticmethod
+    def _run(inbox, outbox, writer):
+        def send(msg):
+            outbox.append(msg)
+            try:
+                writer.send_bytes(b"")
+            except OSError:
+                pass  # detached by kill(); nobody is listening
+
+        _THREAD_STATE.send = send
+        try:
+            while True:
+                msg = inbox.get()
+                if msg is None:
+                    break
+                if msg[0] == "ping":
+                    send(("pong", os.getpid()))
+                    continue
+                _, fn, payload = msg
+                fn = _THREAD_SLICE_WORKERS.get(fn, fn)
+                try:
+                    reply = ("result", fn(payload))
+                except Exception as exc:
+                    reply = ("error", f"{type(exc).__name__}: {exc}", traceback.format_exc())
+                send(reply)
+        finally:
+            writer.close()
+
+    @property
+    def pid(self):
+        return os.getpid()
+
+    @property
+    def sentinel(self):
+        return self.conn
+
+    def is_alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def submit(self, fn, payload):
+        self._inbox.put(("task", fn, payload))
+        self.task = payload
+        self.current = None
+        self.streamed = []
+
+    def rss(self):
+        """Threads share the parent's memory, so per-worker RSS is not known."""
+        return None
+
+    def poll(self) -> bool:
+        return bool(self._outbox)
+
+    def recv(self):
+        self.conn.recv_bytes()
+        return self._outbox.popleft()
+
+    def exit_reason(self) -> str:
+        return "worker thread exited"
+
+    def ping(self, timeout) -> bool:
+        self._inbox.put(("ping",))
+        try:
+            if not self.conn.poll(timeout):
+                return False
+            return self.recv()[0] == "pong"
+        except (EOFError, OSError):
+            return False
+
+    def stop(self, timeout=5.0):
+        if self.thread is None:
+            return
+        self._inbox.put(None)
+        self.thread.join(timeout)
+        self.conn.close()
+        self.thread = None
+
+    def kill(self):
+        if self.thread is None:
+            return
+        self._inbox.put(None)
+        self.conn.close()
+        self.thread = None
+
+    def restart(self):
+        self.kill()
+        self.start()
+
+
+class _RemoteWorker:
+    """One worker slot on a ``lunapi-worker`` daemon, reached over TCP.
+
+    The daemon runs a dedicated child process for each connection and relays
+    the same messages as a local :class:`_Worker` pipe, so closing the
+    connection kills the remote process.
+    """
+
+    def __init__(self, address, authkey, index):
+        self.index = index
+        self.address = address
+        self._authkey = authkey
+        self.conn = None
+        self.task = None
+        self.current = None
+        self.streamed = []
+        self.tasks_run = 0
+        self.records_run = 0
+        self.started = None
+        self._pid = None
+        self.start()
+
+    def start(self):
+        self.conn = _Client(self.address, authkey=self._authkey)
+        self.task = None
+        self.current = None
+        self.streamed = []
+        self.tasks_run = 0
+        self.records_run = 0
+        self.started = time.time()
+        self._pid = None
+
+    @property
+    def pid(self):
+        """PID of the remote worker process, once known from :meth:`ping`."""
+        return self._pid
+
+    @property
+    def sentinel(self):
+        return self.conn
+
+    def is_alive(self) -> bool:
+        return self.conn is not None
+
+    def submit(self, fn, payload):
+        self.conn.send(("task", fn, payload))
+        self.task = payload
+        self.current = None
+        self.streamed = []
+
+    def rss(self):
+        return None
+
+    def poll(self) -> bool:
+        return self.conn.poll()
+
+    def recv(self):
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self._disconnect()
+            raise
+
+    def exit_reason(self) -> str:
+        host, port = self.address
+        return f"connection to worker daemon {host}:{port} was closed"
+
+    def ping(self, timeout) -> bool:
+        try:
+            self.conn.send(("ping",))
+            if not self.conn.poll(timeout):
+                return False
+            reply = self.conn.recv()
+        except (AttributeError, EOFError, OSError):
+            self._disconnect()
+            return False
+        if reply[0] != "pong":
+            return False
+        self._pid = reply[1]
+        return True
+
+    def _disconnect(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+        self.conn = None
+
+    def stop(self, timeout=5.0):
+        if self.conn is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self._disconnect()
+
+    def kill(self):
+        self._disconnect()
+
+    def restart(self):
+        self.kill()
+        self.start()
+
+
+def parse_worker_address(address):
+    """Parse ``'host:port'`` (or a ``(host, port)`` pair) into ``(host, port)``."""
+    if isinstance(address, (tuple, list)):
+        host, port = address
+    else:
+        host, sep, port = str(address).strip().rpartition(":")
+        if not sep:
+            raise ValueError(f"worker address must be host:port, got {address!r}")
+    host = str(host).strip("[]") or "127.0.0.1"
+    try:
+        port = int(port)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid port in worker address {address!r}") from None
+    return host, port
+
+
+def _worker_authkey(authkey=None):
+    if authkey is None:
+        authkey = os.environ.get("LUNAPI_WORKER_AUTHKEY")
+    if not authkey:
+        raise ValueError(
+            "an authkey is required for worker daemons: pass authkey= or set LUNAPI_WORKER_AUTHKEY"
+        )
+    return authkey.encode("utf-8") if isinstance(authkey, str) else bytes(authkey)
+
+
+class LocalBackend:
+    """Executor backend running pool workers as child processes on this machine.
+
+    This is the default backend of :class:`WorkerPool`.
+
+    Parameters
+    ----------
+    start_method : {'spawn', 'forkserver'}, optional
+        ``'spawn'`` (default) starts each worker as a fresh interpreter that
+        imports lunapi itself.  ``'forkserver'`` imports ``lunapi.lunapi0``
+        and the parallel worker module once in a fork server, and forks
+        new workers from it, so starting or recycling a worker takes
+        milliseconds rather than a full import.  Not available on Windows.
+    """
+
+    #: Maximum useful number of workers, or ``None`` to use the local CPU count.
+    capacity = None
+
+    #: Modules imported once by the fork server when ``start_method='forkserver'``.
+    preload = ["lunapi.lunapi0", "lunapi.parallel"]
+
+    def __init__(self, start_method=None):
+        start_method = "spawn" if start_method is None else str(start_method)
+        if start_method not in ("spawn", "forkserver"):
+            raise ValueError("start_method must be 'spawn' or 'forkserver'")
+        if start_method not in multiprocessing.get_all_start_methods():
+            raise ValueError(f"start method {start_method!r} is not available on this platform")
+        self.start_method = start_method
+        self._ctx = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            self._ctx.set_forkserver_preload(self.preload)
+
+    def __repr__(self):
+        return f"LocalBackend({self.start_method!r})"
+
+    def create_worker(self, index):
+        """Start and return worker number *index* (1-based)."""
+        return _Worker(self._ctx, index)
+
+
+class ThreadBackend:
+    """Executor backend running pool workers as threads in this process.
+
+    Workers evaluate records on the parent's own Luna engine and sample
+    list, so there is no process start-up, no import in each worker and no
+    pickling: record results are handed over in memory and injected into
+    the project's result store as usual.  This suits services that embed
+    lunapi and run small batches, where starting worker processes costs
+    more than the work itself, and keeps memory to a single engine.
+
+    Luna keeps project variables, output settings and part of its
+    evaluation state in process-wide globals, so evaluation itself is
+    serialised by an engine lock (the GIL is still released while Luna
+    runs).  What runs concurrently is everything around it: converting
+    result tables, and the Python-side work of the caller.  For CPU-bound
+    runs over many records, process workers remain faster.
+
+    File output (``out_db``/``out_text``), ``record_timeout`` and
+    ``max_rss`` need separate processes and are not supported.
+    """
+
+    #: Maximum useful number of workers, or ``None`` to use the local CPU count.
+    capacity = None
+
+    def __repr__(self):
+        return "ThreadBackend()"
+
+    def create_worker(self, index):
+        """Start and return worker thread number *index* (1-based)."""
+        return _ThreadWorker(index)
+
+
+def _coerce_backend(backend):
+    """Return a backend object; a start-method name selects a :class:`LocalBackend`.
+
+    ``'thread'`` selects a :class:`ThreadBackend`.
+    """
+    if backend == "thread":
+        return ThreadBackend()
+    if backend is None or isinstance(backend, str):
+        return LocalBackend(backend)
+    return backend
+
+
+def _check_thread_backend(backend, pool, file_mode, record_timeout, max_rss):
+    """Reject options a :class:`ThreadBackend` cannot honour."""
+    if pool is not None:
+        backend = pool.backend
+    if not (backend == "thread" or isinstance(backend, ThreadBackend)):
+        return
+    if file_mode:
+        raise ValueError(
+            "the thread backend does not support out_db/out_text; "
+            "Luna file output is shared by the whole process"
+        )
+    if record_timeout is not None or max_rss is not None:
+        raise ValueError("record_timeout and max_rss require process workers, not the thread backend")
+
+
+class SocketBackend:
+    """Executor backend running pool workers on ``lunapi-worker`` daemons.
+
+    Start a daemon on each machine with::
+
+      LUNAPI_WORKER_AUTHKEY=secret lunapi-worker --listen 0.0.0.0:7711
+
+    Each pool worker opens one connection, and the daemon runs one worker
+    process per connection.  List an address once per worker it should
+    host, and no more often than the daemon's ``--workers`` limit (extra
+    connections wait for a free slot).  Sample-list EDF/annotation paths and any ``out_db``/``out_text``
+    paths must be valid on every machine (e.g. a shared filesystem), and
+    all machines need the same lunapi version.  ``max_rss`` limits are
+    not applied to remote workers.
+
+    Parameters
+    ----------
+    addresses : list of str or (str, int)
+        Daemon addresses as ``'host:port'`` strings or ``(host, port)``
+        pairs, repeated for several workers on one daemon.
+    authkey : str or bytes, optional
+        Shared secret used to authenticate connections.  Defaults to the
+        ``LUNAPI_WORKER_AUTHKEY`` environment variable.
+    """
+
+    def __init__(self, addresses, authkey=None):
+        if isinstance(addresses, str):
+            addresses = addresses.replace(",", " ").split()
+        self.addresses = [parse_worker_address(address) for address in addresses]
+        if not self.addresses:
+            raise ValueError("SocketBackend requires at least one worker address")
+        self._authkey = _worker_authkey(authkey)
+
+    def __repr__(self):
+        hosts = ", ".join(f"{host}:{port}" for host, port in self.addresses)
+        return f"SocketBackend([{hosts}])"
+
+    @property
+    def capacity(self):
+        return len(self.addresses)
+
+    def create_worker(self, index):
+        address = self.addresses[(index - 1) % len(self.addresses)]
+        return _RemoteWorker(address, self._authkey, index)
+
+
+def _resolve_workers(workers, total_records, pool=None, backend=None):
+    """Number of workers for a run, bounded by the pool or backend capacity."""
+    if pool is not None:
+        return clamp_workers(pool.workers, total_records, cpu_count=pool.workers)
+    capacity = getattr(_coerce_backend(backend), "capacity", None)
+    if workers is None and capacity is not None:
+        workers = capacity
+    return clamp_workers(workers, total_records, cpu_count=capacity)
+
+
+def _fair_shares(jobs, total):
+    """Water-fill *total* worker slots over *jobs*, by priority and then arrival.
+
+    *jobs* are dicts with ``id``, ``priority``, ``created`` and ``want``.
+    Higher priorities are served first; jobs of equal priority split the
+    remaining slots evenly, with any remainder going to earlier arrivals.
+    Returns ``{id: slots}``.
+    """
+    shares = {job["id"]: 0 for job in jobs}
+    remaining = total
+    ordered = sorted(jobs, key=lambda job: (-job["priority"], job["created"]))
+    for _, group in itertools.groupby(ordered, key=lambda job: job["priority"]):
+        pending = [job for job in group if job["want"] > 0]
+        while remaining > 0 and pending:
+            each = max(1, remaining // len(pending))
+            for job in list(pending):
+                if remaining == 0:
+                    break
+                give = min(each, job["want"] - shares[job["id"]], remaining)
+                shares[job["id"]] += give
+                remaining -= give
+                if shares[job["id"]] >= job["want"]:
+                    pending.remove(job)
+    return shares
+
+
+class WorkerBudget:
+    """Shared budget of worker slots leased by concurrent parallel runs.
+
+    Without a budget every :func:`run_parallel_project` call sizes its own
+    pool, so concurrent runs on one machine oversubscribe it.  Runs given
+    the same budget instead lease workers from it: a run starts once it is
+    granted at least one slot, and each run's grant is recomputed between
+    slices as runs come and go.  Higher-*priority* runs are served first,
+    and runs of equal priority get equal shares (see :func:`_fair_shares`).
+    A run never has more records in flight than the slots it holds.
+
+    Slots are ``flock``-ed files in *path*, so a budget directory shared by
+    several processes (for example every kernel of a JupyterHub node, via
+    the ``LUNAPI_WORKER_BUDGET`` environment variable) is enforced across
+    all of them, and the slots of a process that dies are freed with it.
+    Without *path* the budget is private to this process.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Total worker slots.  Defaults to the number of CPUs.  The first
+        process to create a shared budget directory fixes its size; later
+        processes adopt it.
+    path : str or path-like, optional
+        Budget directory shared by the processes that should cooperate.
+    poll : float, optional
+        Seconds between grant recomputations.
+    """
+
+    def __init__(self, workers=None, path=None, poll=0.5):
+        import tempfile
+
+        self._tmpdir = None
+        if path is None:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="lunapi-budget-")
+            path = self._tmpdir.name
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.poll = float(poll)
+        config = self.path / "budget.json"
+        if not config.exists():
+            size = max(1, int(workers or os.cpu_count() or 1))
+            tmp = self.path / f"budget.{os.getpid()}.tmp"
+            tmp.write_text(json.dumps({"workers": size}))
+            try:
+                os.link(tmp, config)  # first creator wins
+            except FileExistsError:
+                pass
+            finally:
+                tmp.unlink()
+        self.workers = int(json.loads(config.read_text())["workers"])
+
+    def __repr__(self):
+        return f"WorkerBudget({self.workers} worker(s), {str(self.path)!r})"
+
+    def lease(self, workers, priority=0, timeout=None, cancel=None):
+        """Block until at least one slot is granted and return the lease.
+
+        Parameters
+        ----------
+        workers : int
+            Slots wanted.
+        priority : int, optional
+            Higher values are served first.
+        timeout : float, optional
+            Seconds to wait before raising :class:`TimeoutError`.
+        cancel : threading.Event, optional
+            Stop waiting with :class:`concurrent.futures.CancelledError`
+            once set.
+        """
+        lease = _BudgetLease(self, workers, priority)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while lease.rebalance(force=True) == 0:
+                if cancel is not None and cancel.is_set():
+                    raise CancelledError("parallel run cancelled")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"no worker slot granted within {timeout:g} s")
+                time.sleep(min(self.poll, 0.1))
+        except BaseException:
+            lease.close()
+            raise
+        return lease
+
+    def status(self) -> pd.DataFrame:
+        """Return one row per active run: ``Job``, ``PID``, ``Priority``, ``Want`` and ``Slots``."""
+        rows = [
+            {"Job": job["id"], "PID": job["pid"], "Priority": job["priority"],
+             "Want": job["want"], "Slots": job["held"]}
+            for job in sorted(self._jobs(), key=lambda job: job["created"])
+        ]
+        return pd.DataFrame(rows, columns=["Job", "PID", "Priority", "Want", "Slots"])
+
+    def _jobs(self, own=None):
+        """Return the state of live leases, removing those of dead processes."""
+        import fcntl
+
+        jobs = []
+        for state_path in self.path.glob("job-*.json"):
+            job_id = state_path.stem[len("job-"):]
+            lock_path = state_path.with_suffix(".lock")
+            if job_id != own:
+                try:
+                    fd = os.open(lock_path, os.O_RDWR)
+                except FileNotFoundError:
+                    continue
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    pass  # held: the lease is live
+                else:
+                    for stale in (state_path, lock_path):
+                        try:
+                            stale.unlink()
+                        except FileNotFoundError:
+                            pass
+                    continue
+                finally:
+                    os.close(fd)
+            try:
+                jobs.append(json.loads(state_path.read_text()))
+            except (OSError, ValueError):
+                continue  # released or being rewritten
+        return jobs
+
+
+class _BudgetLease:
+    """Slots of a :class:`WorkerBudget` held by one run."""
+
+    def __init__(self, budget, want, priority=0):
+        import fcntl
+        import uuid
+
+        self.budget = budget
+        self.want = max(1, int(want))
+        self.priority = int(priority)
+        self.id = uuid.uuid4().hex
+        self.created = time.time()
+        self._slots = {}
+        self._checked = 0.0
+        self._lock_fd = os.open(budget.path / f"job-{self.id}.lock", os.O_CREAT | os.O_RDWR, 0o666)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        self._write_state()
+
+    @property
+    def held(self) -> int:
+        return len(self._slots)
+
+    def _write_state(self):
+        state = {
+            "id": self.id,
+            "pid": os.getpid(),
+            "priority": self.priority,
+            "created": self.created,
+            "want": self.want,
+            "held": self.held,
+        }
+        tmp = self.budget.path / f"job-{self.id}.tmp"
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self.budget.path / f"job-{self.id}.json")
+
+    def rebalance(self, busy=0, force=False) -> int:
+        """Recompute this run's share, release or acquire slots, and return those held.
+
+        Slots in use by *busy* workers are kept even above the share; they
+        are released as those workers become idle.
+        """
+        import fcntl
+
+        now = time.monotonic()
+        if not force and now - self._checked < self.budget.poll:
+            return self.held
+        self._checked = now
+        before = self.held
+        share = _fair_shares(self.budget._jobs(own=self.id), self.budget.workers).get(self.id, 0)
+        while self.held > max(share, busy):
+            _, fd = self._slots.popitem()
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        for index in range(self.budget.workers):
+            if self.held >= share:
+                break
+            if index in self._slots:
+                continue
+            fd = os.open(self.budget.path / f"slot-{index}.lock", os.O_CREAT | os.O_RDWR, 0o666)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            self._slots[index] = fd
+        if self.held != before:
+            self._write_state()
+        return self.held
+
+    def close(self):
+        import fcntl
+
+        if self._lock_fd is None:
+            return
+        for fd in self._slots.values():
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._slots = {}
+        for suffix in (".json", ".lock"):
+            try:
+                (self.budget.path / f"job-{self.id}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+        os.close(self._lock_fd)
+        self._lock_fd = None
+
+
+_BUDGETS = {}
+
+
+def _coerce_budget(budget):
+    """Return the :class:`WorkerBudget` for a run, or ``None``.
+
+    ``None`` uses the budget directory named by ``LUNAPI_WORKER_BUDGET``,
+    if set; ``False`` disables budgeting.  Paths open (and reuse) a
+    budget in that directory.
+    """
+    if budget is False:
+        return None
+    if budget is None:
+        budget = os.environ.get("LUNAPI_WORKER_BUDGET") or None
+        if budget is None:
+            return None
+    if isinstance(budget, WorkerBudget):
+        return budget
+    key = os.path.abspath(os.fspath(budget))
+    if key not in _BUDGETS:
+        _BUDGETS[key] = WorkerBudget(path=key)
+    return _BUDGETS[key]
+
+
+class WorkerPool:
+    """Persistent pool of Luna worker processes reused across parallel runs.
+
+    Each worker is a spawned child process that imports lunapi and
+    inaugurates its own Luna engine once; the engine stays warm between
+    :meth:`proc_parallel` calls, and per-call sample-list, variable and
+    result state is reset at the start of each submitted slice.  Workers
+    that die are restarted automatically before they receive new work, and
+    :meth:`check` pings every worker and restarts any that do not answer.
+
+    Use as a context manager, or call :meth:`close` explicitly::
+
+      with proj.pool(workers=8) as pool:
+          r1 = pool.proc_parallel('HEADERS')
+          r2 = proj.proc_parallel('PSD sig=C3 spectrum', pool=pool)
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of worker processes.  Defaults to half the available CPUs,
+        capped at 10.
+    project : lunapi.project.proj, optional
+        Project whose sample list :meth:`proc_parallel` evaluates.
+    backend : LocalBackend, SocketBackend, ThreadBackend or str, optional
+        Where worker processes run.  Defaults to :class:`LocalBackend`;
+        ``'forkserver'`` is short for ``LocalBackend('forkserver')``.  Use
+        :class:`SocketBackend` to run workers on ``lunapi-worker`` daemons
+        on other machines, or ``'thread'`` (:class:`ThreadBackend`) for
+        worker threads sharing this process's engine.  Any object with a ``capacity``
+        attribute and a ``create_worker(index)`` method can be used.
+    """
+
+    def __init__(self, workers=None, project=None, backend=None):
+        self.backend = _coerce_backend(backend)
+        capacity = getattr(self.backend, "capacity", None)
+        if workers is None and capacity is not None:
+            workers = capacity
+        self.workers = clamp_workers(workers, cpu_count=capacity)
+        self.project = project
+        self.restarts = 0
+        self.recycled = 0
+        self._lock = threading.RLock()
+        self._claim = threading.Lock()
+        self._dispatching = False
+        self._workers = []
+        self._closed = False
+        try:
+            for idx in range(1, self.workers + 1):
+                self._workers.append(self.backend.create_worker(idx))
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __repr__(self):
+        state = "closed" if self._closed else "open"
+        return (f"WorkerPool({self.workers} worker(s), {self.backend!r}, {state}, "
+                f"restarts={self.restarts})")
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self, timeout=5.0) -> None:
+        """Stop all worker processes.  The pool cannot be reused afterwards."""
+        if self._closed:
+            return
+        self._closed = True
+        for worker in self._workers:
+            worker.stop(timeout)
+
+    def _require_open(self):
+        if self._closed:
+            raise WorkerPoolError("worker pool has been closed")
+
+    def _restart_worker(self, worker):
+        worker.restart()
+        self.restarts += 1
+
+    def restart(self, worker=None) -> None:
+        """Restart one worker (1-based index) or, by default, every worker.
+
+        Workers busy with a slice of a running dispatch are left to it; it
+        replaces them itself if they die or hang.
+        """
+        self._require_open()
+        with self._lock:
+            targets = self._workers if worker is None else [self._workers[int(worker) - 1]]
+            for target in targets:
+                if target.task is None:
+                    self._restart_worker(target)
+
+    def check(self, timeout=60.0) -> pd.DataFrame:
+        """Ping every worker, restarting any that are dead or unresponsive.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait for each worker to answer.  A freshly started
+            worker answers only after importing lunapi, so allow for that.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per worker with columns ``Worker``, ``PID``, ``Alive``,
+            ``Responsive``, ``Restarted`` and ``Tasks``.  Workers busy with
+            a slice of a running dispatch are not pinged: they count as
+            responsive while alive, and a dead one is left for the dispatch
+            to replace and recover.
+        """
+        self._require_open()
+        rows = []
+        with self._lock:
+            for worker in self._workers:
+                alive = worker.is_alive()
+                busy = worker.task is not None
+                responsive = alive if busy else alive and worker.ping(timeout)
+                tasks_run = worker.tasks_run
+                restarted = not (responsive or busy)
+                if restarted:
+                    self._restart_worker(worker)
+                rows.append({
+                    "Worker": worker.index,
+                    "PID": worker.pid,
+                    "Alive": alive,
+                    "Responsive": responsive,
+                    "Restarted": restarted,
+                    "Tasks": tasks_run,
+                })
+        return pd.DataFrame(rows, columns=["Worker", "PID", "Alive", "Responsive", "Restarted", "Tasks"])
+
+    def proc_parallel(self, cmdstr, **kwargs):
+        """Run :func:`run_parallel_project` on this pool's project.
+
+        Keyword arguments are those of :meth:`lunapi.project.proj.proc_parallel`.
+        """
+        project = self.project
+        if project is None:
+            from .project import proj
+            project = proj(verbose=False)
+        return run_parallel_project(project, cmdstr, pool=self, **kwargs)
+
+    def _recycle_worker(self, worker):
+        worker.stop()
+        worker.start()
+        self.recycled += 1
+
+    def _dispatch(self, worker_fn, slices, on_submit=None, record_timeout=None,
+                  max_rss=None, max_records_per_worker=None, on_record=None, cancel=None,
+                  lease=None):
+        """Feed *slices* to idle workers and yield ``(slice, result, failure)``.
+
+        *failure* is ``None`` on success, otherwise an ``(error, traceback)``
+        pair describing an exception raised by *worker_fn*; *result* then
+        holds any records the worker finished before failing.  Workers still
+        busy when the generator is closed early are restarted so that stale
+        replies cannot leak into a later run.
+
+        A worker that dies (for example, a segfault in the engine), whose
+        current record runs longer than *record_timeout* seconds, or whose
+        resident memory exceeds *max_rss* bytes, is replaced and only the
+        record at fault is reported as failed (see :meth:`_recover_task`);
+        the rest of its slice is requeued as new slices.  Workers that have run
+        *max_records_per_worker* records are restarted between slices.
+
+        *slices* may also be an :class:`_AdaptiveSlices`, which cuts slices
+        as workers become idle and is told each record's run time.
+        *on_record* is called with each record result as soon as the worker
+        reports it, before the rest of its slice has finished.  Once the
+        :class:`threading.Event` *cancel* is set, busy workers are restarted
+        and :class:`concurrent.futures.CancelledError` is raised.  With a
+        :class:`WorkerBudget` *lease*, no more slices are in flight than the
+        slots the lease currently holds.
+        """
+        self._require_open()
+        if isinstance(slices, _AdaptiveSlices):
+            queue = slices
+            next_index = slices.indices
+        else:
+            queue = deque(slices)
+            next_index = itertools.count(max((s["slice_index"] for s in slices), default=0) + 1)
+        # One dispatch at a time owns the workers, until it is exhausted or
+        # closed; another run started meanwhile fails rather than waiting on
+        # a generator that may never be resumed.  The lock is held only while
+        # worker state changes, never across a yield, so the consumer may
+        # call check() or restart() between results.
+        with self._claim:
+            if self._dispatching:
+                raise RuntimeError(
+                    "pool is busy with another run; exhaust or close it before starting another"
+                )
+            self._dispatching = True
+        try:
+            while True:
+                with self._lock:
+                    if not (queue or any(w.task is not None for w in self._workers)):
+                        break
+                    if cancel is not None and cancel.is_set():
+                        raise CancelledError("parallel run cancelled")
+                    in_flight = sum(w.task is not None for w in self._workers)
+                    limit = len(self._workers) if lease is None else lease.rebalance(in_flight)
+                    for worker in self._workers:
+                        if worker.task is None and queue and in_flight < limit:
+                            if not worker.is_alive():
+                                self._restart_worker(worker)
+                            task_slice = queue.popleft()
+                            worker.submit(worker_fn, task_slice)
+                            in_flight += 1
+                            if on_submit is not None:
+                                on_submit(task_slice)
+                    busy = [w for w in self._workers if w.task is not None]
+                handles = list(dict.fromkeys([w.conn for w in busy] + [w.sentinel for w in busy]))
+                ready = _wait_connections(handles, timeout=0.2)
+                with self._lock:
+                    finished = self._collect(busy, ready, queue, slices, next_index, on_record,
+                                             max_records_per_worker)
+                    finished.extend(self._enforce_limits(busy, queue, next_index,
+                                                         record_timeout, max_rss))
+                yield from finished
+        finally:
+            with self._lock:
+                for worker in self._workers:
+                    if worker.task is not None:
+                        self._restart_worker(worker)
+            with self._claim:
+                self._dispatching = False
+
+    def _collect(self, busy, ready, queue, slices, next_index, on_record, max_records_per_worker):
+        """Read the replies of *ready* workers; return the finished slices."""
+        finished = []
+        for worker in busy:
+            if worker.conn not in ready and worker.sentinel not in ready:
+                continue
+            task_slice = worker.task
+            msg = None
+            try:
+                while worker.poll():
+                    msg = worker.recv()
+                    if msg[0] != "event":
+                        break
+                    elapsed = self._handle_event(worker, msg[1], msg[2])
+                    if elapsed is not None:
+                        if queue is slices:
+                            queue.observe(elapsed)
+                        if on_record is not None:
+                            on_record(msg[2])
+                    msg = None
+            except (EOFError, OSError):
+                msg = None
+            if msg is None:
+                if worker.is_alive():
+                    continue
+                finished.append(self._recover_task(
+                    worker,
+                    f"WorkerDied: {worker.exit_reason()}",
+                    queue,
+                    next_index,
+                ))
+                continue
+            worker.task = None
+            worker.tasks_run += 1
+            if msg[0] == "result":
+                slice_result = msg[1]
+                slice_result["results"] = worker.streamed + slice_result.get("results", [])
+                finished.append((task_slice, slice_result, None))
+            else:
+                finished.append((task_slice, {"results": worker.streamed}, (msg[1], msg[2])))
+            if max_records_per_worker and worker.records_run >= max_records_per_worker:
+                self._recycle_worker(worker)
+        return finished
+
+    def _enforce_limits(self, busy, queue, next_index, record_timeout, max_rss):
+        """Replace workers whose current record is over time or memory."""
+        finished = []
+        now = time.monotonic()
+        for worker in busy:
+            if worker.task is None:
+                continue
+            reason = None
+            if (record_timeout is not None and worker.current is not None
+                    and now - worker.current[1] > record_timeout):
+                reason = f"TimeoutError: record exceeded record_timeout of {record_timeout:g} s"
+            elif max_rss is not None and worker.current is not None:
+                rss = worker.rss()
+                if rss is not None and rss > max_rss:
+                    reason = (f"MemoryError: worker RSS of {rss} bytes "
+                              f"exceeded max_rss of {max_rss} bytes")
+            if reason is not None:
+                finished.append(self._recover_task(worker, reason, queue, next_index))
+        return finished
+
+    def _handle_event(self, worker, kind, payload):
+        """Apply a worker event; return the run time of a finished record."""
+        if kind == "record_start":
+            worker.current = (payload, time.monotonic())
+        elif kind == "record_done":
+            elapsed = None if worker.current is None else time.monotonic() - worker.current[1]
+            worker.streamed.append(payload)
+            worker.current = None
+            worker.records_run += 1
+            return elapsed
+        return None
+
+    def _recover_task(self, worker, reason, queue, next_index):
+        """Replace a dead or killed *worker* and isolate the record at fault.
+
+        Records the worker finished are kept.  If the worker had announced
+        the record it was running, that record alone is failed with *reason*
+        and the rest of the slice is requeued.  Otherwise (the worker died
+        outside a record) the unfinished records are bisected into two
+        requeued slices, so a crashing record is narrowed down to a
+        one-record slice, which is then failed.
+        """
+        task_slice = worker.task
+        streamed = worker.streamed
+        current = worker.current[0] if worker.current is not None else None
+        self._restart_worker(worker)
+        done = {result.get("ordinal") for result in streamed}
+        pending = [record for record in task_slice["records"] if record["ordinal"] not in done]
+        results = list(streamed)
+        if current is not None:
+            failed = [record for record in pending if record["ordinal"] == current]
+            parts = [[record for record in pending if record["ordinal"] != current]]
+        elif len(pending) == 1:
+            failed, parts = pending, []
+        else:
+            mid = len(pending) // 2
+            failed, parts = [], [pending[:mid], pending[mid:]]
+        for record in failed:
+            results.append(_failed_record_result(record, task_slice["slice_index"], reason, None))
+        requeued = [_requeued_slice(task_slice, part, next(next_index)) for part in parts if part]
+        queue.extendleft(reversed(requeued))
+        return task_slice, {"slice_index": task_slice["slice_index"], "results": results}, None
+
+
+def _requeued_slice(task_slice, records, slice_index):
+    ordinals = [record["ordinal"] for record in records]
+    requeued = dict(task_slice)
+    requeued.update({
+        "slice_index": slice_index,
+        "start_ordinal": min(ordinals),
+        "end_ordinal": max(ordinals),
+        "rows": [list(record["sample_row"]) for record in records],
+        "records": records,
+    })
+    return requeued
+
+
+def _process_rss(pid):
+    """Return the resident set size of process *pid* in bytes, or ``None``.
+
+    Read from ``/proc``, so only available on Linux.
+    """
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def parse_memory_size(value):
+    """Parse a memory size given as bytes or as a string such as ``'4G'``.
+
+    Suffixes ``K``, ``M``, ``G`` and ``T`` (optionally followed by ``B``)
+    are binary multiples.  ``None`` is returned unchanged.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        size = int(value)
+    else:
+        text = str(value).strip().upper().removesuffix("B")
+        units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+        try:
+            if text and text[-1] in units:
+                size = int(float(text[:-1]) * units[text[-1]])
+            else:
+                size = int(float(text))
+        except ValueError:
+            raise ValueError(f"invalid memory size: {value!r}") from None
+    if size <= 0:
+        raise ValueError(f"memory size must be positive: {value!r}")
+    return size
+
+
+class ResultCache:
+    """Local, size-bounded cache of per-record :func:`run_parallel_project` results.
+
+    Entries are keyed by the record's ID, EDF and annotation files, the
+    command string and the resolved parameters (plus the lunapi version), so
+    a re-run after adding subjects evaluates only the new or changed
+    records.  Files are fingerprinted by size and modification time, or by
+    a SHA-256 of their content with ``content_hash=True`` (slower, but
+    robust to copies and touched files).  Once the cache grows beyond
+    *max_size*, least-recently-used entries are evicted.
+
+    Only successful, in-memory records are cached.  Entries are pickled
+    files under *path*, which must therefore not be writable by untrusted
+    users.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Cache directory; created if missing.
+    max_size : int or str, optional
+        Size bound in bytes or as a string such as ``'10G'`` (default).
+    content_hash : bool, optional
+        Fingerprint files by content instead of size and mtime.
+    """
+
+    def __init__(self, path, max_size="10G", content_hash=False):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = parse_memory_size(max_size)
+        self.content_hash = bool(content_hash)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.path / "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+        self.reset_stats()
+
+    def __repr__(self):
+        return f"ResultCache({str(self.path)!r}, {len(self)} entries, {self.size()} bytes)"
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def size(self) -> int:
+        """Total size of the cached entries in bytes."""
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def reset_stats(self):
+        self.hits = self.misses = self.stored = self.evicted = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counts since the last :meth:`reset_stats`, and the cache size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "entries": len(self),
+            "size": self.size(),
+        }
+
+    def _fingerprint(self, path):
+        if not path or path == ".":
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return [path, None]
+        if not self.content_hash:
+            return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+        return [st.st_size, digest.hexdigest()]
+
+    def key(self, task) -> str:
+        """Return the cache key of one task dict (see :func:`_project_tasks`)."""
+        from .resources import lp_version
+
+        row = task["sample_row"]
+        annots = _split_annot_files(row[2]) if len(row) > 2 else []
+        ident = {
+            "version": lp_version,
+            "id": str(row[0] or "").strip(),
+            "edf": self._fingerprint(row[1] if len(row) > 1 else ""),
+            "annots": [self._fingerprint(a) for a in sorted(annots)],
+            "cmd": task["cmd"],
+            "params": [[str(k), str(v)] for k, v in task["params"]],
+        }
+        blob = json.dumps(ident, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def _entry_path(self, key):
+        return self.path / key[:2] / f"{key}.pkl"
+
+    def get(self, key):
+        """Return the cached payload for *key*, or ``None``, updating recency and stats."""
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry_path = self._entry_path(key)
+        payload = None
+        if self._db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone():
+            try:
+                with open(entry_path, "rb") as fh:
+                    payload = pickle.load(fh)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if payload is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        return payload
+
+    def put(self, key, payload):
+        """Store *payload* under *key*, then evict least-recently-used entries."""
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(exist_ok=True)
+        tmp = entry_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, entry_path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, size, last_used) VALUES (?, ?, ?)",
+                (key, entry_path.stat().st_size, time.time()),
+            )
+            self.stored += 1
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self.size()
+        if total <= self.max_size:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_size:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                self._entry_path(key).unlink()
+            except OSError:
+                pass
+            total -= size
+            self.evicted += 1
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            for (key,) in self._db.execute("SELECT key FROM entries").fetchall():
+                try:
+                    self._entry_path(key).unlink()
+                except OSError:
+                    pass
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _coerce_cache(cache):
+    """Return a :class:`ResultCache`; a path opens one with default settings."""
+    if cache is None or isinstance(cache, ResultCache):
+        return cache
+    return ResultCache(cache)
+
+
+def _cached_record_result(task, payload):
+    return {
+        "ordinal": task["ordinal"],
+        "label": task["label"],
+        "id": str(task["sample_row"][0] or "").strip(),
+        "slice_index": None,
+        "stdout": payload.get("stdout", ""),
+        "tbls": payload.get("tbls"),
+        "results": payload.get("results") or {},
+        "error": None,
+        "traceback": None,
+        "cached": True,
+    }
+
+
+class ResultSpill:
+    """Memory budget for the project result store, spilling tables to disk.
+
+    When the tables held by the engine exceed *max_size*, the least
+    recently used ones are written to ``.npz`` files (one array per column)
+    under *path* and replaced in the engine by empty placeholders.
+    :meth:`lunapi.project.proj.table` reads spilled tables back from disk,
+    loading only the columns it needs, so spilling is transparent to
+    callers.  A spilled table that a later command recomputes is used from
+    the engine again and its file is removed.
+
+    Set up through :meth:`lunapi.project.proj.result_store_budget`.
+
+    Parameters
+    ----------
+    max_size : int or str, optional
+        Budget in bytes or as a string such as ``'4G'``.  ``None`` stops
+        further spilling; tables already spilled stay readable.
+    path : str or path-like, optional
+        Spill directory; a temporary directory removed at exit by default.
+    """
+
+    def __init__(self, max_size=None, path=None):
+        self.max_size = parse_memory_size(max_size)
+        self._tmpdir = None
+        if path is None:
+            import tempfile
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="lunapi-spill-")
+            path = self._tmpdir.name
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._clock = itertools.count()
+        self._used = {}
+        self._files = {}  # (cmd, strata) -> {"path", "columns", "rows", "bytes"}
+        # spilling reads and replaces engine tables, so it shares the engine lock
+        self._lock = _ENGINE_LOCK
+
+    def configure(self, max_size=None, path=None):
+        """Change the budget and, if given, the directory for later spills."""
+        with self._lock:
+            self.max_size = parse_memory_size(max_size)
+            if path is not None:
+                self.path = Path(path)
+                self.path.mkdir(parents=True, exist_ok=True)
+
+    def touch(self, cmd, strata):
+        """Mark a table as just used."""
+        with self._lock:
+            self._used[(cmd, strata)] = next(self._clock)
+
+    def spilled(self, eng, cmd, strata):
+        """Return the spill record of a table, or ``None`` if the engine holds it."""
+        with self._lock:
+            entry = self._files.get((cmd, strata))
+            if entry is None:
+                return None
+            try:
+                stale = bool(eng.vars(cmd, strata))  # recomputed since it was spilled
+            except Exception:
+                stale = True  # no longer in the result store
+            if stale:
+                self._drop((cmd, strata))
+                return None
+            return entry
+
+    def table(self, eng, cmd, strata, columns=None, where=None, ids=None):
+        """Return a spilled table as a DataFrame, or ``None`` if it is not spilled."""
+        entry = self.spilled(eng, cmd, strata)
+        if entry is None:
+            return None
+        self.touch(cmd, strata)
+        cols = entry["columns"]
+        wanted, filters = _table_query(columns, where, ids)
+        needed = set(cols) if wanted is None else set(wanted) | {f[0] for f in filters}
+        load = [col for col in cols if col in needed]
+        with np.load(entry["path"]) as arrays:
+            buffers, masks = [], []
+            for col in load:
+                j = cols.index(col)
+                if f"v{j}" in arrays:
+                    buffers.append((arrays[f"c{j}"], arrays[f"v{j}"].tolist()))
+                else:
+                    buffers.append(arrays[f"c{j}"])
+                masks.append(arrays[f"m{j}"] if f"m{j}" in arrays else None)
+        return _filter_frame(_columns2df(load, buffers, masks), columns, where, ids)
+
+    def enforce(self, eng):
+        """Spill least recently used tables until the engine is within budget."""
+        with self._lock:
+            usage = eng.table_usage()
+            present = {(cmd, strata) for cmd, strata, *_ in usage}
+            resident = []
+            for cmd, strata, nrows, ncols, nbytes in usage:
+                key = (cmd, strata)
+                if ncols == 0:
+                    continue
+                if key in self._files:
+                    self._drop(key)  # recomputed since it was spilled
+                if key not in self._used:
+                    self._used[key] = next(self._clock)
+                resident.append((self._used[key], key, nbytes))
+            for key in [key for key in self._files if key not in present]:
+                self._drop(key)
+            if self.max_size is None:
+                return
+            total = sum(nbytes for _, _, nbytes in resident)
+            for _, key, nbytes in sorted(resident):
+                if total <= self.max_size:
+                    break
+                self._spill(eng, *key, nbytes)
+                total -= nbytes
+
+    def usage(self, eng):
+        """Return per-table memory and disk usage as a DataFrame."""
+        with self._lock:
+            rows = []
+            for cmd, strata, nrows, ncols, nbytes in eng.table_usage():
+                entry = self.spilled(eng, cmd, strata) if ncols == 0 else None
+                if entry is None:
+                    rows.append((cmd, strata, nrows, ncols, nbytes, False, 0))
+                else:
+                    rows.append((cmd, strata, entry["rows"], len(entry["columns"]), nbytes, True,
+                                 entry["path"].stat().st_size))
+        return _usage_frame(rows)
+
+    def _spill(self, eng, cmd, strata, nbytes):
+        cols, columns, masks = eng.table_columns(cmd, strata)
+        arrays = {}
+        nrows = 0
+        for j, (column, mask) in enumerate(zip(columns, masks)):
+            if isinstance(column, tuple):
+                codes, values = column
+                arrays[f"c{j}"] = np.asarray(codes)
+                arrays[f"v{j}"] = np.array(values, dtype=str)
+            else:
+                arrays[f"c{j}"] = np.asarray(column)
+            nrows = len(arrays[f"c{j}"])
+            if mask is not None:
+                arrays[f"m{j}"] = np.asarray(mask, dtype=bool)
+        name = hashlib.sha1(f"{cmd}\0{strata}".encode()).hexdigest()
+        path = self.path / f"{name}.npz"
+        np.savez(path, **arrays)
+        eng.inject_columns(cmd, strata, [], [], [])
+        self._files[(cmd, strata)] = {
+            "path": path, "columns": list(cols), "rows": nrows, "bytes": nbytes,
+        }
+
+    def _drop(self, key):
+        entry = self._files.pop(key, None)
+        if entry is not None:
+            try:
+                entry["path"].unlink()
+            except OSError:
+                pass
+
+
+def _usage_frame(rows):
+    return pd.DataFrame(
+        rows, columns=["Command", "Strata", "Rows", "Columns", "Bytes", "Spilled", "DiskBytes"],
+    ).astype({"Rows": "int64", "Columns": "int64", "Bytes": "int64", "DiskBytes": "int64"})
+
+
+class _CheckpointJournal:
+    """Append-only JSON-lines journal of completed records for file-output runs.
+
+    The journal lives next to the output (``<out_db>.journal`` or
+    ``<out_text>.journal``).  Each run appends a ``start`` line with the
+    command and parameters, then one ``record`` line per finished record with
+    its ordinal, ID, slice and output path, flushed to disk as records
+    complete so that an interrupted run can be resumed.
+    """
+
+    def __init__(self, out_db=None, out_text=None):
+        base = out_db if out_db else str(out_text).rstrip("/\\")
+        self.path = Path(f"{base}.journal")
+        self._fh = None
+
+    def load(self):
+        """Return ``(entries, last_start)`` for successfully completed records.
+
+        *entries* maps ``(ordinal, id)`` to the journal entry of the latest
+        successful run of that record.  A truncated final line (from a run
+        killed mid-write) is ignored.
+        """
+        entries = {}
+        last_start = None
+        if not self.path.exists():
+            return entries, last_start
+        with open(self.path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("event") == "start":
+                    last_start = entry
+                elif entry.get("event") == "record":
+                    key = (entry.get("ordinal"), entry.get("id"))
+                    if entry.get("ok"):
+                        entries[key] = entry
+                    else:
+                        entries.pop(key, None)
+        return entries, last_start
+
+    def max_slice(self):
+        top = 0
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("event") == "record" and entry.get("slice_index"):
+                        top = max(top, int(entry["slice_index"]))
+        return top
+
+    def open(self, cmdstr, params, resume):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "a" if resume else "w", encoding="utf-8")
+        self._write({
+            "event": "start",
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "cmd": cmdstr,
+            "params": [list(pair) for pair in params],
+        })
+
+    def record(self, result, out_path):
+        self._write({
+            "event": "record",
+            "ordinal": result.get("ordinal"),
+            "id": result.get("id"),
+            "label": result.get("label"),
+            "slice_index": result.get("slice_index"),
+            "out_path": None if out_path is None else str(out_path),
+            "ok": not result.get("error"),
+        })
+
+    def _write(self, entry):
+        self._fh.write(json.dumps(entry) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def _slice_db_files(out_db):
+    """Yield ``(path, slice_index)`` for existing ``<out_db>-<slice>.db`` files."""
+    base = Path(out_db)
+    prefix = f"{base.name}-"
+    for path in base.parent.glob(f"{prefix}*.db"):
+        index = path.name[len(prefix):-len(".db")]
+        if index.isdigit():
+            yield path, int(index)
+
+
+def _prune_slice_db(path, keep_ids):
+    """Delete the rows of every individual not in *keep_ids* from a slice database.
+
+    On resume a slice database is kept for the records it completed, but it
+    may also hold rows of records that failed or were interrupted mid-write;
+    those records are rerun, so their old rows would otherwise be merged twice.
+    Rows are keyed by ID, so the caller reruns every record sharing an ID
+    with one that reruns (see :func:`run_parallel_project`).
+    """
+    con = sqlite3.connect(path)
+    try:
+        cur = con.cursor()
+        tables = {row[0] for row in cur.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+        if not {"individuals", "datapoints"} <= tables:
+            return
+        stale = [
+            indiv_id
+            for indiv_id, name in cur.execute("SELECT indiv_id, indiv_name FROM individuals")
+            if name not in keep_ids
+        ]
+        if stale:
+            marks = ",".join("?" * len(stale))
+            cur.execute(f"DELETE FROM datapoints WHERE indiv_id IN ({marks})", stale)
+            cur.execute(f"DELETE FROM individuals WHERE indiv_id IN ({marks})", stale)
+            con.commit()
+    finally:
+        con.close()
+
+
+def _merge_slice_dbs(out_db, out_paths, resume):
+    """Merge per-slice databases into *out_db* and remove the slice files.
+
+    On resume an existing *out_db* (from an earlier merged run) is folded in
+    as well.  Returns the new list of output paths.
+    """
+    slice_paths = [Path(p) for p in dict.fromkeys(out_paths) if Path(p).is_file()]
+    sources = list(slice_paths)
+    if resume and Path(out_db).is_file():
+        sources.insert(0, Path(out_db))
+    if not sources:
+        return []
+    merge_db([str(p) for p in sources], out_db, overwrite=True)
+    for path in slice_paths:
+        path.unlink()
+    return [out_db]
+
+
+def _resumed_record_result(entry):
+    return {
+        "ordinal": entry.get("ordinal"),
+        "label": entry.get("label"),
+        "id": entry.get("id"),
+        "slice_index": entry.get("slice_index"),
+        "stdout": "",
+        "tbls": None,
+        "results": {},
+        "error": None,
+        "traceback": None,
+    }
+
+
+def _project_tasks(sample_list, cmdstr, resolved_params, n1=None, n2=None, ids=None, skip=None):
+    """Build per-record task dicts for *sample_list*, applying row and ID filters."""
+    tasks = [
+        {
+            "ordinal": idx,
+            "sample_row": normalize_sample_row(row),
+            "label": str(row[0] or "").strip(),
+            "cmd": cmdstr,
+            "params": resolved_params,
+        }
+        for idx, row in enumerate(sample_list, start=1)
+        if str(row[0] or "").strip()
+    ]
+
+    # --- row-range and ID filtering (mirrors luna n1/n2 and id=/skip= args) ---
+    if n1 is not None or n2 is not None:
+        lo = n1 if n1 is not None else 1
+        hi = n2 if n2 is not None else (tasks[-1]["ordinal"] if tasks else 0)
+        tasks = [t for t in tasks if lo <= t["ordinal"] <= hi]
+
+    if ids is not None:
+        if isinstance(ids, str):
+            ids = ids.split()
+        ids_set = set(ids)
+        tasks = [t for t in tasks if t["label"] in ids_set]
+
+    if skip is not None:
+        if isinstance(skip, str):
+            skip = skip.split()
+        skip_set = set(skip)
+        tasks = [t for t in tasks if t["label"] not in skip_set]
+    # --------------------------------------------------------------------------
+    return tasks
+
+
+def _plan_slices(tasks, workers, batch_size, schedule, first_index=1):
+    if batch_size == "auto":
+        ordered = _cost_ordered(tasks) if schedule == "cost" else tasks
+        return _AdaptiveSlices(ordered, workers, first_index=first_index)
+    if schedule == "cost":
+        slices = project_cost_slices(tasks, workers, batch_size=batch_size)
+    else:
+        slices = project_eval_slices(tasks, workers, batch_size=batch_size)
+    for task_slice in slices:
+        task_slice["slice_index"] += first_index - 1
+    return slices
+
+
+def _iter_record_results(tasks, slices, workers, *, pool=None, out_db=None,
+                         out_text=None, emit=None, out_paths=None, record_timeout=None,
+                         max_rss=None, max_records_per_worker=None, backend=None,
+                         cancel=None, lease=None):
+    """Run *slices* on worker processes and yield one result dict per record.
+
+    Records are yielded as their slices complete, so the caller holds at most
+    the records of the slices in flight.  Slices whose worker raised or died
+    yield a failed result for each of their records, and records that never
+    returned are yielded as failures once the pool is drained.  A pool is
+    started on *backend* (and closed) for the run unless *pool* is given.  The limits are
+    those of :meth:`WorkerPool._dispatch`.
+    """
+    file_mode = bool(out_db or out_text)
+    worker_fn = _slice_worker_file if file_mode else _slice_worker
+    completed_ordinals = set()
+    reported = set()
+    pool_error = None
+    cancelled = False
+
+    def record_event(result):
+        if emit is not None and result.get("ordinal") not in reported:
+            reported.add(result.get("ordinal"))
+            emit({
+                "event": "record",
+                "ordinal": result.get("ordinal"),
+                "total": len(tasks),
+                "id": result.get("id"),
+                "error": result.get("error"),
+            })
+
+    def on_submit(task_slice):
+        if emit is not None:
             emit({
                 "event": "slice_queued",
                 "slice_index": task_slice["slice_index"],
@@ -941,43 +3331,285 @@ def run_parallel_project(
                 "end_ordinal": task_slice["end_ordinal"],
             })
 
-        while pending:
-            done_futs, _ = wait(pending.keys(), timeout=0.2, return_when=FIRST_COMPLETED)
-            if not done_futs:
-                continue
-            for fut in done_futs:
-                task_slice = pending.pop(fut)
-                try:
-                    slice_result = fut.result()
-                except Exception as exc:
-                    tb = traceback.format_exc()
-                    slice_result = {
-                        "slice_index": task_slice["slice_index"],
-                        "results": [
-                            _synthetic_error_result(record, task_slice["slice_index"], exc, tb)
-                            for record in task_slice["records"]
-                        ],
-                    }
-                handle_slice_result(slice_result)
+    if isinstance(slices, _AdaptiveSlices):
+        submitted = slices
+        if file_mode:
+            submitted.extra.update(out_db=out_db, out_text=out_text)
+    else:
+        submitted = []
+        for task_slice in slices:
+            submitted_slice = dict(task_slice)
+            if file_mode:
+                submitted_slice["out_db"] = out_db
+                submitted_slice["out_text"] = out_text
+            submitted.append(submitted_slice)
+
+    own_pool = pool is None
+    try:
+        if own_pool and submitted:
+            pool = WorkerPool(workers, backend=backend)
+        dispatched = pool._dispatch(
+            worker_fn,
+            submitted,
+            on_submit,
+            record_timeout=record_timeout,
+            max_rss=parse_memory_size(max_rss),
+            max_records_per_worker=max_records_per_worker,
+            on_record=record_event,
+            cancel=cancel,
+            lease=lease,
+        ) if submitted else ()
+        for task_slice, slice_result, failure in dispatched:
+            if failure is not None:
+                error, tb = failure
+                finished = list((slice_result or {}).get("results", []))
+                done = {result.get("ordinal") for result in finished}
+                slice_result = {
+                    "slice_index": task_slice["slice_index"],
+                    "results": finished + [
+                        _failed_record_result(record, task_slice["slice_index"], error, tb)
+                        for record in task_slice["records"]
+                        if record["ordinal"] not in done
+                    ],
+                }
+            if out_paths is not None:
+                if "out_path" in slice_result:
+                    out_paths.append(slice_result["out_path"])
+                elif file_mode and any(not r.get("error") for r in slice_result["results"]):
+                    out_paths.append(_slice_out_path(out_db, out_text, task_slice["slice_index"]))
+            for result in slice_result.get("results", []):
+                if result.get("ordinal") in completed_ordinals:
+                    continue
+                completed_ordinals.add(result.get("ordinal"))
+                record_event(result)
+                yield result
+    except CancelledError:
+        cancelled = True
+        raise
     except Exception as exc:
         pool_error = (exc, traceback.format_exc())
     finally:
-        if executor is not None:
-            executor.shutdown(wait=True, cancel_futures=True)
-
-    missing = [record for record in tasks if record["ordinal"] not in completed_ordinals]
-    if pool_error is not None:
-        exc, tb = pool_error
-        for record in missing:
-            handle_record_result(_synthetic_error_result(record, None, exc, tb))
-    else:
-        for record in missing:
-            handle_record_result(_synthetic_missing_result(record))
+        if own_pool and pool is not None:
+            pool.close(0.0 if cancelled else 5.0)
+
+    for record in tasks:
+        if record["ordinal"] in completed_ordinals:
+            continue
+        if pool_error is not None:
+            exc, tb = pool_error
+            result = _synthetic_error_result(record, None, exc, tb)
+        else:
+            result = _synthetic_missing_result(record)
+        record_event(result)
+        yield result
+
+
+def run_parallel_project(
+    project,
+    cmdstr: str,
+    *,
+    workers=None,
+    batch_size=None,
+    params=None,
+    param_file=None,
+    strict: bool = False,
+    progress=None,
+    out_db=None,
+    out_text=None,
+    in_memory=None,
+    n1=None,
+    n2=None,
+    ids=None,
+    skip=None,
+    pool=None,
+    schedule="ordinal",
+    resume=False,
+    record_timeout=None,
+    max_rss=None,
+    max_records_per_worker=None,
+    backend=None,
+    merge=False,
+    cache=None,
+    cancel=None,
+    detach=False,
+    budget=None,
+    priority=0,
+) -> ParallelProcResult:
+    started = time.perf_counter()
+    if out_db and out_text:
+        raise ValueError("out_db and out_text are mutually exclusive")
+    if cache is not None and (out_db or out_text):
+        raise ValueError("cache is only supported for in-memory results")
+    if merge and not out_db:
+        raise ValueError("merge=True requires out_db")
+    if resume and not (out_db or out_text):
+        raise ValueError("resume=True requires out_db or out_text")
+    max_rss = parse_memory_size(max_rss)
+    if schedule not in ("ordinal", "cost"):
+        raise ValueError("schedule must be 'ordinal' or 'cost'")
+    file_mode = bool(out_db or out_text)
+    _check_thread_backend(backend, pool, file_mode, record_timeout, max_rss)
+    if in_memory is None:
+        in_memory = not file_mode
+    if in_memory and file_mode:
+        raise ValueError(
+            "Simultaneous in_memory and file output is not supported; pass in_memory=False"
+        )
+
+    sample_list = project.sample_list(df=False)
+    if not sample_list:
+        result = ParallelProcResult(
+            tables={},
+            errors=_errors_frame([]),
+            stdout=_stdout_frame([]),
+            records=_records_frame([]),
+            workers=0,
+        )
+        if strict:
+            raise ParallelProcError("parallel processing failed: no records in sample list", result)
+        return result
+
+    resolved_params = resolve_params(params=params, param_file=param_file)
+    if batch_size is None and progress is True and not file_mode:
+        batch_size = "auto"
+
+    tasks = _project_tasks(sample_list, cmdstr, resolved_params, n1=n1, n2=n2, ids=ids, skip=skip)
+
+    completed = []
+    journal = _CheckpointJournal(out_db, out_text) if file_mode else None
+    slice_offset = 0
+    if resume:
+        done, last_start = journal.load()
+        changed = [] if last_start is None else [
+            what for what, before, now in (
+                ("command", last_start.get("cmd"), cmdstr),
+                ("parameters", last_start.get("params"), [list(pair) for pair in resolved_params]),
+            )
+            if json.loads(json.dumps(now)) != before
+        ]
+        if changed:
+            warnings.warn(
+                f"resuming {journal.path} which was started with different "
+                f"{' and '.join(changed)}; journaled records are not rerun",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        # Output rows are keyed by ID, so a completed record cannot be told
+        # apart from a record with the same ID that reruns: rerun both.
+        rerun_ids = {
+            str(task["sample_row"][0] or "").strip()
+            for task in tasks
+            if (task["ordinal"], str(task["sample_row"][0] or "").strip()) not in done
+        }
+        done = {key: entry for key, entry in done.items() if key[1] not in rerun_ids}
+        slice_offset = journal.max_slice()
+        if out_db:
+            # drop partial databases of slices that never completed a record,
+            # and the rows of records that will rerun from the others
+            kept = {}
+            for entry in done.values():
+                kept.setdefault(entry.get("slice_index"), set()).add(entry.get("id"))
+            for path, index in _slice_db_files(out_db):
+                slice_offset = max(slice_offset, index)
+                if index not in kept:
+                    path.unlink()
+                else:
+                    _prune_slice_db(path, kept[index])
+        remaining = []
+        for task in tasks:
+            entry = done.get((task["ordinal"], str(task["sample_row"][0] or "").strip()))
+            if entry is None:
+                remaining.append(task)
+            else:
+                completed.append(_resumed_record_result(entry))
+        tasks = remaining
+
+    cache = _coerce_cache(cache)
+    cache_keys = {}
+    if cache is not None:
+        cache.reset_stats()
+        remaining = []
+        for task in tasks:
+            key = cache.key(task)
+            payload = cache.get(key)
+            if payload is None:
+                cache_keys[task["ordinal"]] = key
+                remaining.append(task)
+            else:
+                completed.append(_cached_record_result(task, payload))
+        tasks = remaining
+
+    # Clamp workers to the actual number of tasks after filtering
+    workers = _resolve_workers(workers, len(tasks), pool=pool, backend=backend)
+    budget = _coerce_budget(budget)
+    if budget is not None and pool is None:
+        workers = min(workers, budget.workers)
+    slices = _plan_slices(tasks, workers, batch_size, schedule, first_index=slice_offset + 1)
+
+    progress_callback, close_progress = _coerce_progress(progress, len(tasks))
+
+    def emit(event):
+        if progress_callback is not None:
+            progress_callback(event)
+
+    collected_out_paths = [
+        _slice_out_path(out_db, out_text, record["slice_index"])
+        for record in completed
+    ]
+    if journal is not None:
+        journal.open(cmdstr, resolved_params, resume)
+    lease = None
+    try:
+        if budget is not None and tasks:
+            lease = budget.lease(workers, priority, cancel=cancel)
+        for record_result in _iter_record_results(
+            tasks,
+            slices,
+            workers,
+            pool=pool,
+            out_db=out_db,
+            out_text=out_text,
+            emit=emit,
+            out_paths=collected_out_paths,
+            record_timeout=record_timeout,
+            max_rss=max_rss,
+            max_records_per_worker=max_records_per_worker,
+            backend=backend,
+            cancel=cancel,
+            lease=lease,
+        ):
+            completed.append(record_result)
+            key = cache_keys.get(record_result.get("ordinal"))
+            if key is not None and not record_result.get("error"):
+                cache.put(key, {
+                    "stdout": record_result.get("stdout", ""),
+                    "tbls": record_result.get("tbls"),
+                    "results": record_result.get("results") or {},
+                })
+            if journal is not None:
+                out_path = None
+                if record_result.get("slice_index") is not None:
+                    out_path = _slice_out_path(out_db, out_text, record_result["slice_index"])
+                journal.record(record_result, out_path)
+    finally:
+        if lease is not None:
+            lease.close()
+        if journal is not None:
+            journal.close()
+
+    if merge:
+        collected_out_paths = _merge_slice_dbs(out_db, collected_out_paths, resume)
 
     if file_mode:
         result = _collate_file_results(completed, workers, collected_out_paths)
     else:
-        result = _collate_results(completed, workers, project)
+        with _ENGINE_LOCK:
+            result = _collate_results(completed, workers, project)
+            if detach:
+                result = result.copy()
+    result.elapsed = time.perf_counter() - started
+    if cache is not None:
+        result.cache_stats = cache.stats()
     close_progress()
     n_total = len(result.records)
     n_errors = len(result.errors)
@@ -1001,6 +3633,631 @@ def run_parallel_project(
     return result
 
 
+def _split_annot_files(annots):
+    return [a for a in str(annots or "").split(",") if a.strip() and a.strip() != "."]
+
+
+def _contiguous_chunks(items, n):
+    """Split *items* into *n* contiguous, near-equal groups (order kept)."""
+    n = max(1, min(int(n), len(items)))
+    size, extra = divmod(len(items), n)
+    chunks, start = [], 0
+    for i in range(n):
+        stop = start + size + (1 if i < extra else 0)
+        chunks.append(items[start:stop])
+        start = stop
+    return chunks
+
+
+def _strata_has_factor(strata, factor):
+    return factor in _strata_parts(strata)
+
+
+# Commands whose epoch-level output does not depend on other epochs, with the
+# options that make them emit per-epoch tables; and set-up commands that may
+# precede them in a time-segmented run.
+_EPOCH_LOCAL_COMMANDS = {
+    "PSD": ("epoch", "epoch-spectrum"),
+    "MTM": ("epoch", "segment-output"),
+    "SIGSTATS": ("epoch",),
+    "HJORTH": ("epoch",),
+    "STATS": ("epoch",),
+}
+_EPOCH_SETUP_COMMANDS = {"EPOCH", "SIGNALS", "FILTER", "REFERENCE", "RESAMPLE", "COPY", "RENAME", "uV", "mV"}
+
+
+def _command_lines(cmdstr):
+    """Return the Luna commands of *cmdstr* as token lists (``&``/newline separated)."""
+    return [
+        tokens
+        for line in str(cmdstr).replace("&", "\n").splitlines()
+        if (tokens := line.split()) and not tokens[0].startswith("%")
+    ]
+
+
+def _check_epoch_local(cmdstr):
+    """Raise ``ValueError`` unless every command in *cmdstr* is epoch-local."""
+    for tokens in _command_lines(cmdstr):
+        name, options = tokens[0], tokens[1:]
+        if name in _EPOCH_SETUP_COMMANDS:
+            continue
+        if name not in _EPOCH_LOCAL_COMMANDS:
+            raise ValueError(
+                f"{name} is not epoch-local and cannot be split by epoch; supported commands are "
+                + ", ".join(sorted(_EPOCH_LOCAL_COMMANDS))
+            )
+        required = _EPOCH_LOCAL_COMMANDS[name]
+        if not any(option.split("=", 1)[0] in required for option in options):
+            raise ValueError(f"{name} needs one of {', '.join(required)} to emit per-epoch output")
+
+
+# Commands whose output pairs or pools channels (CH1/CH2 tables, or models
+# fitted over all channels), which a channel-split run cannot reproduce.
+_CROSS_CHANNEL_COMMANDS = {"COH", "CORREL", "PSI", "XCORR", "MI", "TSYNC", "GED", "ICA"}
+
+
+def _check_channel_local(cmdstr):
+    """Raise ``ValueError`` if a command in *cmdstr* relates channels to each other."""
+    for tokens in _command_lines(cmdstr):
+        if tokens[0] in _CROSS_CHANNEL_COMMANDS:
+            raise ValueError(
+                f"{tokens[0]} relates channels to each other and cannot be split by channel; "
+                "use split='epoch' or proc()"
+            )
+
+
+def _channel_invariant_part(parts, factors=()):
+    """Reduce the per-group parts of a table not stratified by ``CH``.
+
+    Returns ``(part, dropped)``: the first group's table restricted to the
+    columns every group agrees on (recording-level values such as the
+    duration), and the names of the columns that differ between groups and
+    so describe only part of the channels.  *part* is ``None`` when no
+    column besides ``ID`` is left, or when one of the strata *factors*
+    differs (e.g. ``CH1``/``CH2`` of channel pairs), as the rows then
+    describe different things in each group.
+    """
+    first = parts[0]
+    names = first["columns"]
+    if any(part["nrows"] != first["nrows"] for part in parts[1:]):
+        return None, names[1:]
+    keep, dropped = [], []
+    for j, col in enumerate(names):
+        values = pd.Series(_decode_column(*first["data"][j]))
+        agree = all(
+            col in part["columns"]
+            and values.equals(pd.Series(_decode_column(*part["data"][part["columns"].index(col)])))
+            for part in parts[1:]
+        )
+        if agree:
+            keep.append(j)
+        else:
+            dropped.append(col)
+    if set(dropped) & set(factors) or all(names[j] == "ID" for j in keep):
+        return None, names[1:]
+    return {
+        "columns": [names[j] for j in keep],
+        "nrows": first["nrows"],
+        "data": [first["data"][j] for j in keep],
+    }, dropped
+
+
+def _epoch_count(cmdstr, edf):
+    """Number of epochs of *edf* under the ``EPOCH`` settings in *cmdstr* (30 s default)."""
+    length, inc = 30.0, None
+    for tokens in _command_lines(cmdstr):
+        if tokens[0] != "EPOCH":
+            continue
+        for option in tokens[1:]:
+            key, _, value = option.partition("=")
+            if key in ("len", "dur") and value:
+                length = float(value)
+            elif key == "inc" and value:
+                inc = float(value)
+    inc = length if inc is None else inc
+    duration = read_edf_header(edf)["duration"]
+    if duration < length:
+        return 0
+    return int((duration - length) // inc) + 1
+
+
+def _epoch_ranged_command(cmdstr, first, last):
+    """Insert ``MASK epoch=first-last`` after the last ``EPOCH`` command of *cmdstr*."""
+    lines = str(cmdstr).replace("&", "\n").splitlines()
+    at = 0
+    for idx, line in enumerate(lines):
+        tokens = line.split()
+        if tokens and tokens[0] == "EPOCH":
+            at = idx + 1
+    lines.insert(at, f"MASK epoch={first}-{last}")
+    return "\n".join(lines)
+
+
+def run_parallel_instance(
+    instance,
+    cmdstr: str,
+    *,
+    split="sig",
+    sig=None,
+    workers=None,
+    chunks=None,
+    params=None,
+    param_file=None,
+    strict: bool = False,
+    progress=None,
+    pool=None,
+    backend=None,
+    record_timeout=None,
+    max_rss=None,
+) -> ProcResult:
+    """Evaluate *cmdstr* on one recording, split by channel or by epoch range.
+
+    See :meth:`lunapi.instance.inst.proc_parallel`.  Each worker attaches the
+    instance's EDF and annotations and evaluates one part: with
+    ``split='sig'``, ``sig`` restricted to one contiguous group of channels;
+    with ``split='epoch'``, all epochs outside one contiguous range masked.
+    Tables stratified by ``CH`` (``E`` for epoch splits) are concatenated in
+    order and injected into *instance*'s result store.  For channel splits
+    other tables keep only the columns all groups agree on, with a
+    ``RuntimeWarning`` naming any that differ, and commands that relate
+    channels to each other are rejected; for epoch splits other tables
+    describe only part of the recording and are dropped.  With a
+    :class:`ThreadBackend` the parts are evaluated one at a time on the
+    shared engine, so a split gains no evaluation parallelism there.
+    """
+    if split not in ("sig", "epoch"):
+        raise ValueError("split must be 'sig' or 'epoch'")
+    max_rss = parse_memory_size(max_rss)
+    _check_thread_backend(backend, pool, False, record_timeout, max_rss)
+    edf = instance.edf.get_edf_file()
+    if not edf:
+        raise ValueError("instance has no attached EDF file; a split run re-reads it in each worker")
+    annots = ",".join(_split_annot_files(instance.edf.get_annot_files())) or "."
+    id_str = instance.id()
+    resolved_params = resolve_params(params=params, param_file=param_file)
+
+    if split == "sig":
+        _check_channel_local(cmdstr)
+        if sig is None:
+            channels = [str(ch) for ch in instance.edf.channels()]
+        elif isinstance(sig, str):
+            channels = [ch for ch in sig.replace(",", " ").split() if ch]
+        else:
+            channels = [str(ch) for ch in sig]
+        if not channels:
+            raise ValueError("no channels to split")
+        workers = _resolve_workers(workers, len(channels), pool=pool, backend=backend)
+        base_params = [(key, value) for key, value in resolved_params if key != "sig"]
+        parts = [
+            (group[0] if len(group) == 1 else f"{group[0]}..{group[-1]}",
+             cmdstr,
+             base_params + [("sig", ",".join(group))])
+            for group in _contiguous_chunks(channels, chunks if chunks is not None else workers)
+        ]
+        stitch = "CH"
+    else:
+        _check_epoch_local(cmdstr)
+        n_epochs = _epoch_count(cmdstr, edf)
+        if n_epochs < 1:
+            raise ValueError("recording is shorter than one epoch")
+        if sig is not None:
+            sig = sig if isinstance(sig, str) else ",".join(str(ch) for ch in sig)
+            resolved_params = [(k, v) for k, v in resolved_params if k != "sig"] + [("sig", sig)]
+        workers = _resolve_workers(workers, n_epochs, pool=pool, backend=backend)
+        ranges = _contiguous_chunks(list(range(1, n_epochs + 1)), chunks if chunks is not None else workers)
+        parts = [
+            (f"E{span[0]}-{span[-1]}", _epoch_ranged_command(cmdstr, span[0], span[-1]), resolved_params)
+            for span in ranges
+        ]
+        stitch = "E"
+
+    tasks = [
+        {
+            "ordinal": idx,
+            "sample_row": [id_str, edf, annots],
+            "label": label,
+            "cmd": part_cmd,
+            "params": part_params,
+            "attach": True,
+        }
+        for idx, (label, part_cmd, part_params) in enumerate(parts, start=1)
+    ]
+    workers = min(workers, len(tasks))
+    slices = project_eval_slices(tasks, workers, batch_size=1)
+    progress_callback, close_progress = _coerce_progress(progress, len(tasks))
+    started = time.perf_counter()
+    try:
+        completed = list(_iter_record_results(
+            tasks,
+            slices,
+            workers,
+            pool=pool,
+            emit=progress_callback,
+            record_timeout=record_timeout,
+            max_rss=max_rss,
+            backend=backend,
+        ))
+    finally:
+        close_progress()
+
+    completed.sort(key=lambda item: item.get("ordinal", 0))
+    result_parts = {}
+    for record_result in completed:
+        for key, part in (record_result.get("results") or {}).items():
+            if part is None:
+                continue
+            stitched = _strata_has_factor(key.split(": ", 1)[1], stitch)
+            if not stitched and split == "epoch":
+                continue
+            result_parts.setdefault(key, []).append(part)
+        record_result["results"] = None
+    partial = []
+    for key, table_parts in result_parts.items():
+        cmd, strata = key.split(": ", 1)
+        if not _strata_has_factor(strata, stitch):
+            part, dropped = _channel_invariant_part(table_parts, _strata_parts(strata))
+            if dropped:
+                partial.append(f"{key} ({', '.join(dropped)})")
+            if part is None:
+                continue
+            table_parts = [part]
+        _inject_result_tables(instance.edf, cmd, strata, table_parts)
+    if partial:
+        warnings.warn(
+            "columns that differ between channel groups were dropped: " + "; ".join(partial),
+            RuntimeWarning,
+            stacklevel=2,
+        )
+    result = ProcResult(
+        _owner=instance,
+        errors=_errors_frame(completed),
+        stdout=_stdout_frame(completed),
+        records=_records_frame(completed),
+        workers=workers,
+        elapsed=time.perf_counter() - started,
+    )
+    if strict and not result.ok:
+        what = "channel group(s)" if split == "sig" else "epoch range(s)"
+        raise ProcError(f"parallel processing failed for {len(result.errors)} {what}", result)
+    return result
+
+
+def iter_parallel_project(
+    project,
+    cmdstr: str,
+    *,
+    workers=None,
+    batch_size=1,
+    params=None,
+    param_file=None,
+    progress=None,
+    n1=None,
+    n2=None,
+    ids=None,
+    skip=None,
+    pool=None,
+    schedule="ordinal",
+    record_timeout=None,
+    max_rss=None,
+    max_records_per_worker=None,
+    backend=None,
+):
+    """Yield one :class:`ProcResult` per sample-list record as records complete.
+
+    Unlike :func:`run_parallel_project`, nothing is accumulated in the parent
+    process or injected into the project's result cache: each yielded result
+    holds only that record's tables, so memory is bounded by the records in
+    flight (``workers x batch_size``).  Results arrive in completion order;
+    use ``result.records["Ordinal"]`` to restore sample-list order.  Closing
+    the generator early stops the run.
+    """
+    if schedule not in ("ordinal", "cost"):
+        raise ValueError("schedule must be 'ordinal' or 'cost'")
+    max_rss = parse_memory_size(max_rss)
+    _check_thread_backend(backend, pool, False, record_timeout, max_rss)
+    sample_list = project.sample_list(df=False)
+    if not sample_list:
+        return
+    resolved_params = resolve_params(params=params, param_file=param_file)
+    tasks = _project_tasks(sample_list, cmdstr, resolved_params, n1=n1, n2=n2, ids=ids, skip=skip)
+    workers = _resolve_workers(workers, len(tasks), pool=pool, backend=backend)
+    slices = _plan_slices(tasks, workers, batch_size, schedule)
+    progress_callback, close_progress = _coerce_progress(progress, len(tasks))
+    record_results = _iter_record_results(
+        tasks,
+        slices,
+        workers,
+        pool=pool,
+        emit=progress_callback,
+        record_timeout=record_timeout,
+        max_rss=max_rss,
+        max_records_per_worker=max_records_per_worker,
+        backend=backend,
+    )
+    try:
+        for record_result in record_results:
+            yield _record_proc_result(record_result)
+    finally:
+        record_results.close()
+        close_progress()
+
+
+# Memory model used when no pilot run measured it: a worker process with an
+# engine loaded, plus the EDF held as 8-byte samples with a working copy.
+_ESTIMATE_BASE_RSS = 256 * 1024 ** 2
+_ESTIMATE_BYTES_PER_SAMPLE = 16
+_ESTIMATE_MEMORY_FRACTION = 0.8
+
+
+def _available_memory():
+    """Return the memory available for new processes in bytes, or ``None``."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _fit_cost(x, y):
+    """Fit ``y = a + b * x`` by least squares with ``b >= 0``; return ``(a, b)``.
+
+    With fewer than two distinct *x* values the model is the mean of *y*.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) < 2 or np.ptp(x) == 0:
+        return float(np.mean(y)), 0.0
+    b, a = np.polyfit(x, y, 1)
+    if b < 0:
+        return float(np.mean(y)), 0.0
+    return float(a), float(b)
+
+
+def _edf_header_row(task):
+    row = task["sample_row"]
+    edf = str(row[1]) if len(row) > 1 and row[1] else ""
+    header = {}
+    if edf and os.path.isfile(edf):
+        try:
+            header = read_edf_header(edf)
+        except (OSError, ValueError):
+            header = {}
+    rates = header.get("sample_rates") or []
+    return {
+        "Ordinal": task["ordinal"],
+        "ID": task["label"],
+        "EDF": edf,
+        "Duration": header.get("duration"),
+        "Channels": header.get("signals"),
+        "MaxSampleRate": max(rates) if rates else None,
+        "Samples": estimate_record_cost(row),
+        "FileSize": header.get("file_size", os.path.getsize(edf) if os.path.isfile(edf) else None),
+    }
+
+
+def estimate_parallel_project(
+    project,
+    cmdstr=None,
+    *,
+    pilot=0,
+    params=None,
+    param_file=None,
+    workers=None,
+    memory=None,
+    seed=None,
+    n1=None,
+    n2=None,
+    ids=None,
+    skip=None,
+    pool=None,
+    backend=None,
+) -> dict:
+    """Estimate the run time and memory of :func:`run_parallel_project` before running it.
+
+    Only EDF headers are read (duration, channels, sample rates and file
+    size).  With *pilot*, the command is also run on that many randomly
+    chosen records (through :func:`iter_parallel_project`, so the project
+    result cache is untouched) and per-record wall time and peak worker
+    memory are fitted as linear in the record's number of samples, then
+    extrapolated to every record.  Without a pilot, memory follows a
+    fixed per-sample model and run time is not predicted.
+
+    Returns a dict with ``records`` (per-record header fields with
+    ``PredictedTime`` and ``PredictedRSS``), ``pilot`` (the pilot records,
+    or ``None``), ``total_duration``, ``total_samples``, ``total_size``,
+    ``predicted_time`` (summed record seconds), ``predicted_wall`` (with
+    the suggested workers), ``worker_rss`` (bytes a worker needs for the
+    largest record), ``memory_available`` and the suggested ``workers``
+    and ``batch_size``.
+    """
+    sample_list = project.sample_list(df=False)
+    resolved_params = resolve_params(params=params, param_file=param_file)
+    tasks = _project_tasks(sample_list, cmdstr, resolved_params, n1=n1, n2=n2, ids=ids, skip=skip)
+    records = pd.DataFrame(
+        [_edf_header_row(task) for task in tasks],
+        columns=["Ordinal", "ID", "EDF", "Duration", "Channels", "MaxSampleRate", "Samples", "FileSize"],
+    )
+    for column in ("Duration", "MaxSampleRate", "Samples"):
+        records[column] = pd.to_numeric(records[column], errors="coerce")
+    for column in ("Channels", "FileSize"):
+        records[column] = pd.to_numeric(records[column], errors="coerce").round().astype("Int64")
+
+    pilot_frame = None
+    time_model = None
+    rss_model = (float(_ESTIMATE_BASE_RSS), float(_ESTIMATE_BYTES_PER_SAMPLE))
+    candidates = records.loc[records["Samples"] > 0, "ID"].tolist()
+    if pilot and candidates:
+        if cmdstr is None:
+            raise ValueError("a pilot run needs cmdstr")
+        import random
+
+        chosen = random.Random(seed).sample(candidates, min(int(pilot), len(candidates)))
+        rows = []
+        for result in iter_parallel_project(
+            project, cmdstr, workers=workers or len(chosen), params=params,
+            param_file=param_file, ids=chosen, pool=pool, backend=backend,
+        ):
+            rows.append(result.records.iloc[0])
+        pilot_frame = pd.DataFrame(rows).reset_index(drop=True)
+        pilot_frame = pilot_frame.merge(records[["ID", "Samples"]], on="ID", how="left")
+        ok = pilot_frame[pilot_frame["OK"] & pilot_frame["WallTime"].notna()]
+        if not ok.empty:
+            time_model = _fit_cost(ok["Samples"], ok["WallTime"])
+            measured = ok[ok["PeakRSS"].notna()]
+            if not measured.empty:
+                rss_model = _fit_cost(measured["Samples"], measured["PeakRSS"].astype(float))
+
+    samples = records["Samples"].fillna(0.0)
+    records["PredictedTime"] = (
+        time_model[0] + time_model[1] * samples if time_model is not None else np.nan
+    )
+    records["PredictedRSS"] = (rss_model[0] + rss_model[1] * samples).round().astype("Int64")
+
+    memory_available = parse_memory_size(memory) if memory is not None else _available_memory()
+    worker_rss = int(records["PredictedRSS"].max()) if len(records) else int(rss_model[0])
+    suggested = clamp_workers(workers if workers is not None else default_workers(), len(records) or None)
+    if memory_available:
+        fits = int(memory_available * _ESTIMATE_MEMORY_FRACTION // max(worker_rss, 1))
+        suggested = max(1, min(suggested, fits))
+
+    predicted_time = predicted_wall = None
+    batch_size = "auto"
+    if time_model is not None and len(records):
+        times = records["PredictedTime"]
+        predicted_time = float(times.sum())
+        predicted_wall = max(predicted_time / suggested, float(times.max()))
+        share = -(-len(records) // suggested)
+        wanted = int(_AUTO_BATCH_SECONDS / max(float(times.mean()), 1e-6))
+        batch_size = max(1, min(wanted, share, _AUTO_BATCH_MAX))
+
+    return {
+        "records": records,
+        "pilot": pilot_frame,
+        "total_duration": float(records["Duration"].sum()),
+        "total_samples": float(samples.sum()),
+        "total_size": int(records["FileSize"].sum()),
+        "predicted_time": predicted_time,
+        "predicted_wall": predicted_wall,
+        "worker_rss": worker_rss,
+        "memory_available": memory_available,
+        "workers": suggested,
+        "batch_size": batch_size,
+    }
+
+
+def _async_progress(loop, progress):
+    """Adapt an async progress sink to a callback safe to call from a worker thread.
+
+    *progress* may be an :class:`asyncio.Queue` (events are put on it, then
+    ``None`` once the run ends), a coroutine function (scheduled as a task
+    per event) or a plain callable (called on the event loop).  Anything
+    else is passed through to :func:`_coerce_progress`.  Returns
+    ``(callback, finish)``.
+    """
+    if isinstance(progress, asyncio.Queue):
+        return (
+            lambda event: loop.call_soon_threadsafe(progress.put_nowait, event),
+            lambda: progress.put_nowait(None),
+        )
+    if asyncio.iscoroutinefunction(progress):
+        return (
+            lambda event: loop.call_soon_threadsafe(loop.create_task, progress(event)),
+            lambda: None,
+        )
+    if callable(progress):
+        return (lambda event: loop.call_soon_threadsafe(progress, event)), (lambda: None)
+    return progress, (lambda: None)
+
+
+async def _await_thread(fn, cancel, wait_on_cancel=True):
+    """Run *fn* in the loop's default executor and await it.
+
+    If the awaiting task is cancelled, *cancel* is set and, with
+    *wait_on_cancel*, the thread is awaited so that its workers are torn
+    down before the cancellation propagates.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(None, fn)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        cancel.set()
+        if wait_on_cancel:
+            await asyncio.wait([future])
+            if not future.cancelled():
+                future.exception()  # retrieved; the cancellation is what propagates
+        raise
+
+
+async def run_parallel_project_async(project, cmdstr: str, *, progress=None, **kwargs):
+    """Awaitable :func:`run_parallel_project` for use inside an event loop.
+
+    The run is coordinated from a thread of the loop's default executor;
+    records are evaluated by worker processes (or a shared *pool*), so the
+    event loop is never blocked.  Cancelling the awaiting task stops the
+    run: busy workers are restarted, and :class:`asyncio.CancelledError`
+    propagates once they are.  Results are detached from the project's
+    result cache, so concurrent runs on one project do not overwrite each
+    other.
+
+    *progress* may be an :class:`asyncio.Queue`, receiving each progress
+    event and a final ``None``; a coroutine function or plain callable,
+    called on the event loop with each event; or any value accepted by
+    :func:`run_parallel_project`.  Other keyword arguments are those of
+    :func:`run_parallel_project`.
+    """
+    loop = asyncio.get_running_loop()
+    cancel = threading.Event()
+    callback, finish = _async_progress(loop, progress)
+
+    def run():
+        return run_parallel_project(
+            project, cmdstr, progress=callback, cancel=cancel, detach=True, **kwargs
+        )
+
+    try:
+        return await _await_thread(run, cancel)
+    finally:
+        finish()
+
+
+async def run_instance_async(instance, cmdstr: str):
+    """Awaitable :meth:`lunapi.instance.inst.proc` for use inside an event loop.
+
+    Evaluation runs in a thread of the loop's default executor through the
+    ``eval_lunascope`` binding, which releases the GIL while Luna runs, so
+    the event loop keeps serving other requests.  The engine is shared by
+    the whole process, so
+    evaluations from concurrent calls are serialised, and each returns a
+    :class:`ProcResult` detached from the instance's result cache.  A call
+    cancelled while waiting for the engine never starts; one cancelled
+    mid-evaluation returns immediately while the evaluation finishes in
+    the background.
+    """
+    cancel = threading.Event()
+
+    def run():
+        with _ENGINE_LOCK:
+            if cancel.is_set():
+                raise CancelledError("evaluation cancelled")
+            instance.eval_lunascope(cmdstr)
+            return ProcResult(
+                _owner=instance,
+                errors=_errors_frame([]),
+                stdout=_stdout_frame([]),
+                records=_records_frame([]),
+                workers=1,
+            ).copy()
+
+    return await _await_thread(run, cancel, wait_on_cancel=False)
+
+
 def _coerce_progress(progress, total):
     if progress is None or progress is False:
         return None, lambda: None
@@ -1039,6 +4296,10 @@ def _coerce_progress(progress, total):
 
 
 def _synthetic_error_result(record, slice_index, exc, tb):
+    return _failed_record_result(record, slice_index, f"{type(exc).__name__}: {exc}", tb)
+
+
+def _failed_record_result(record, slice_index, error, tb):
     return {
         "ordinal": record["ordinal"],
         "label": record["label"],
@@ -1047,7 +4308,7 @@ def _synthetic_error_result(record, slice_index, exc, tb):
         "stdout": "",
         "tbls": None,
         "results": {},
-        "error": f"{type(exc).__name__}: {exc}",
+        "error": error,
         "traceback": tb,
     }
 
@@ -1066,26 +4327,37 @@ def _synthetic_missing_result(record):
     }
 
 
+def _record_proc_result(result) -> ProcResult:
+    """Wrap one record result dict as a standalone, self-contained ProcResult."""
+    tables = {
+        key: decode_result_tables([part], *_split_table_key(key))
+        for key, part in (result.get("results") or {}).items()
+        if part is not None
+    }
+    return ProcResult(
+        tables=tables,
+        errors=_errors_frame([result]),
+        stdout=_stdout_frame([result]),
+        records=_records_frame([result]),
+        workers=1,
+    )
+
+
 def _collate_results(completed, workers, project) -> ProcResult:
     completed = sorted(completed, key=lambda item: item.get("ordinal", 0))
     result_parts = {}
     for result in completed:
-        for key, df in (result.get("results") or {}).items():
-            if df is not None:
-                result_parts.setdefault(key, []).append(df)
+        for key, part in (result.get("results") or {}).items():
+            if part is not None:
+                result_parts.setdefault(key, []).append(part)
+        result["results"] = None
     for key, parts in result_parts.items():
         if not parts:
             continue
-        df = pd.concat(parts, ignore_index=True)
-        for col in df.columns:
-            if "ID" not in col.split("_"):
-                try:
-                    df[col] = pd.to_numeric(df[col])
-                except (ValueError, TypeError):
-                    pass
         cmd, strata = key.split(": ", 1)
-        project.eng.inject_table(cmd, strata, df.columns.tolist(),
-                               [df[col].tolist() for col in df.columns])
+        _inject_result_tables(project.eng, cmd, strata, parts)
+    if getattr(project, "_spill", None) is not None:
+        project._spill.enforce(project.eng)
     return ProcResult(
         _owner=project,
         errors=_errors_frame(completed),
@@ -1260,17 +4532,22 @@ def read_text_table(path, cmd_or_file, factors=None) -> pd.DataFrame:
         raise FileNotFoundError(msg)
 
     # ── concatenate, skipping unreadable files with a warning ────────────
+    # ID and strata factors are read as text, so labels that look numeric in
+    # some files keep one type across all of them; the schema then converts
+    # the columns that are numeric throughout.
+    schema = table_schema()
+    text = {col: str for col in ["ID", *facs]}
     dfs = []
     for f in matches:
         try:
-            dfs.append(pd.read_csv(f, sep='\t', compression='infer'))
+            dfs.append(pd.read_csv(f, sep='\t', compression='infer', dtype=text))
         except Exception as exc:
             warnings.warn(f"Skipping {f}: {exc}")
 
     if not dfs:
         raise ValueError(f"All files matching '{matched_name}' were unreadable")
 
-    return pd.concat(dfs, ignore_index=True)
+    return schema.cast(pd.concat(dfs, ignore_index=True), cmd, facs)
 
 
 class _ErrorsFrame(pd.DataFrame):
@@ -1320,37 +4597,78 @@ def _stdout_frame(results):
     return pd.DataFrame(rows, columns=["Ordinal", "ID", "Stdout"])
 
 
+# records-frame column -> telemetry key (see _record_telemetry)
+_TELEMETRY_COLUMNS = {
+    "Worker": "worker",
+    "WallTime": "wall_time",
+    "CPUTime": "cpu_time",
+    "EvalTime": "eval_time",
+    "ConvertTime": "convert_time",
+    "PeakRSS": "peak_rss",
+    "BytesRead": "bytes_read",
+}
+
+
 def _records_frame(results):
-    rows = [
-        {
+    rows = []
+    for result in results:
+        telemetry = result.get("telemetry") or {}
+        row = {
             "Ordinal": result.get("ordinal"),
             "ID": result.get("id"),
             "Label": result.get("label"),
             "Slice": result.get("slice_index"),
             "OK": not bool(result.get("error")),
+            "Cached": bool(result.get("cached")),
         }
-        for result in results
-    ]
-    return pd.DataFrame(rows, columns=["Ordinal", "ID", "Label", "Slice", "OK"])
+        for column, key in _TELEMETRY_COLUMNS.items():
+            row[column] = telemetry.get(key)
+        rows.append(row)
+    frame = pd.DataFrame(rows, columns=["Ordinal", "ID", "Label", "Slice", "OK", "Cached", *_TELEMETRY_COLUMNS])
+    for column in _TELEMETRY_COLUMNS:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    for column in ("Worker", "PeakRSS", "BytesRead"):
+        frame[column] = frame[column].round().astype("Int64")
+    return frame
 
 
 __all__ = [
     "FileOutputModeError",
+    "LocalBackend",
     "ParallelProcError",
     "ParallelProcResult",
     "ProcError",
     "ProcResult",
+    "ResultCache",
+    "ResultSpill",
+    "SocketBackend",
+    "ThreadBackend",
+    "WorkerBudget",
+    "WorkerPool",
+    "WorkerPoolError",
     "clamp_workers",
     "coerce_strata",
+    "decode_result_tables",
     "default_workers",
+    "encode_result_columns",
+    "encode_result_table",
+    "estimate_parallel_project",
+    "estimate_record_cost",
+    "iter_parallel_project",
     "list_text_tables",
     "normalize_result_table",
     "normalize_sample_row",
     "parse_param_file",
+    "parse_memory_size",
     "parse_param_text",
+    "parse_worker_address",
+    "project_cost_slices",
     "project_eval_slices",
     "read_text_table",
     "resolve_params",
+    "run_instance_async",
+    "run_parallel_instance",
     "run_parallel_project",
+    "run_parallel_project_async",
     "tokenize_param_line",
 ]
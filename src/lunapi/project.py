@@ -36,8 +36,8 @@ except ImportError:
     _ipy_display = None
 
 from .resources import resources, lp_version
-from .parallel import coerce_strata as _coerce_strata
-from .results import tables, cmdfile
+from .parallel import coerce_strata as _coerce_strata, _results_changed, _ENGINE_LOCK
+from .results import tables, cmdfile, _columns2df, _table_query
 
 
 def _coerce_var_value(value):
@@ -66,6 +66,9 @@ class proj:
     # single static engine class
     eng = _luna.inaugurate()
 
+    # spill policy of the engine's result store (see result_store_budget)
+    _spill = None
+
     def __init__(self, verbose = True ):
         self.n = 0
         if verbose: print( "initiated lunapi",lp_version,proj.eng ,"\n" )
@@ -107,6 +110,7 @@ class proj:
         """
 
         # first clear any existing sample list
+        _results_changed()
         proj.eng.clear()
 
         # then try to build a new one
@@ -157,6 +161,7 @@ class proj:
             self.var( 'path' , path )
 
         # read sample list from file, after clearing anything present
+        _results_changed()
         proj.eng.clear()
         self.n = proj.eng.read_sample_list( filename )
         print( "read",self.n,"individuals from" , filename )
@@ -212,6 +217,7 @@ class proj:
         -------
         None
         """
+        _results_changed()
         proj.eng.reset()
 
     def reinit(self) -> None:
@@ -221,6 +227,7 @@ class proj:
         -------
         None
         """
+        _results_changed()
         self.eng.reinit()
 
     #------------------------------------------------------------------------
@@ -309,6 +316,7 @@ class proj:
         -------
         None
         """
+        _results_changed()
         proj.eng.clear()
 
 
@@ -604,10 +612,13 @@ class proj:
         object
           Status value returned by the C++ backend.
         """
+        _results_changed()
         if s is None:
-            return proj.eng.import_db(f)
+            rv = proj.eng.import_db(f)
         else:
-            return proj.eng.import_db_subset(f,s)
+            rv = proj.eng.import_db_subset(f,s)
+        self._enforce_result_budget()
+        return rv
 
     #------------------------------------------------------------------------
 
@@ -654,7 +665,9 @@ class proj:
         ProcResult
         """
         from .parallel import ProcResult, _errors_frame, _stdout_frame, _records_frame
+        _results_changed()
         proj.eng.eval(cmdstr)
+        self._enforce_result_budget()
         return ProcResult(
             _owner=self,
             errors=_errors_frame([]),
@@ -668,7 +681,10 @@ class proj:
     def proc_parallel(self, cmdstr, workers=None, batch_size=None, params=None,
                             param_file=None, strict=False, progress=True,
                             out_db=None, out_text=None, in_memory=None,
-                            n1=None, n2=None, ids=None, skip=None):
+                            n1=None, n2=None, ids=None, skip=None, pool=None,
+                            schedule="ordinal", resume=False, record_timeout=None,
+                            max_rss=None, max_records_per_worker=None, backend=None,
+                            merge=False, cache=None, budget=None, priority=0):
         """Evaluate Luna commands across the sample list using worker processes.
 
         This is intended for file-backed project sample lists.  Each worker
@@ -683,10 +699,13 @@ class proj:
         workers : int, optional
             Number of worker processes.  Defaults to half the available CPUs,
             capped at 10 and at the number of sample-list records.
-        batch_size : int, optional
-            Number of records per submitted worker batch.  Smaller values provide
-            more frequent progress updates.  Defaults to one batch per worker,
-            or one record per batch when ``progress=True``.
+        batch_size : int or 'auto', optional
+            Number of records per submitted worker batch.  ``'auto'`` starts
+            with one-record batches and grows them from the observed
+            per-record run time, so fast commands are not dominated by
+            per-batch overhead.  Progress is reported per record whatever the
+            batch size.  Defaults to one batch per worker, or ``'auto'`` when
+            ``progress=True`` and results are kept in memory.
         params : dict or iterable of (str, object), optional
             Project-level Luna variables to apply in each worker before each
           record is evaluated.  Values override duplicate keys from
@@ -712,12 +731,87 @@ class proj:
         skip : str or list of str, optional
           Exclude individuals whose ID appears in this list.  A plain
           string is split on whitespace.  Mirrors Luna's ``skip=`` option.
+        pool : lunapi.parallel.WorkerPool, optional
+          Persistent worker pool (see :meth:`pool`) to run on instead of
+          starting and stopping fresh worker processes for this call.
+          *workers* is ignored when a pool is given.
+        schedule : {'ordinal', 'cost'}, optional
+          Order in which records are submitted to workers.  ``'ordinal'``
+          (default) submits contiguous sample-list chunks in order.
+          ``'cost'`` estimates each record's cost from its EDF header
+          (duration x channels x sample rate) and submits the longest
+          recordings first, one record per batch unless *batch_size* is
+          given.  Results are ordered by sample-list ordinal either way.
+        resume : bool, optional
+          File-output runs (*out_db* / *out_text*) keep an append-only
+          checkpoint journal next to the output (``<out_db>.journal``) of
+          every finished record.  With ``resume=True`` records that already
+          completed successfully are skipped and their existing outputs are
+          reused; failed and unfinished records are run again.  Works with
+          *n1*, *n2*, *ids* and *skip*.
+        record_timeout : float, optional
+          Maximum run time of a single record, in seconds.  A worker stuck
+          on a record for longer is killed and replaced; the record is
+          reported in ``errors`` and the rest of its batch is rescheduled.
+        max_rss : int or str, optional
+          Maximum resident memory of a worker process, in bytes or as a
+          string such as ``'8G'``.  A worker exceeding it is killed and
+          replaced in the same way (Linux only).
+        max_records_per_worker : int, optional
+          Restart each worker process after it has run this many records,
+          to contain memory growth.  Workers are only restarted between
+          batches.
+        backend : str or lunapi.parallel.SocketBackend, optional
+          Executor backend for the worker processes started for this call.
+          ``'forkserver'`` forks workers from a server that has already
+          imported lunapi, which makes worker start-up much faster than the
+          default ``'spawn'``; a :class:`~lunapi.parallel.SocketBackend`
+          runs them on ``lunapi-worker`` daemons on other machines (see
+          :meth:`pool`).  ``'thread'`` evaluates records in worker threads
+          of this process on its own engine, with no worker start-up or
+          pickling; Luna evaluation itself is serialised, so this pays off
+          for short runs embedded in a service rather than for large
+          batches (see :class:`~lunapi.parallel.ThreadBackend`).  Ignored
+          when a *pool* is given.
+        merge : bool, optional
+          With *out_db*, merge the per-slice ``<out_db>-<slice>.db`` files
+          into a single database at *out_db* once all records have run,
+          unifying factor, level, variable and individual IDs and building
+          covering indexes on ``datapoints`` (see
+          :func:`lunapi.destrat.merge_db`).  The slice files are removed
+          after a successful merge.  On resume, an existing merged *out_db*
+          is folded in.
+        cache : str, path-like or lunapi.parallel.ResultCache, optional
+          Reuse results of earlier runs.  Records whose EDF and annotation
+          files (by size and modification time, or by content hash), ID,
+          command string and *params* are unchanged since they were cached
+          are returned without evaluation; the rest run and are added to
+          the cache.  A path opens a :class:`~lunapi.parallel.ResultCache`
+          with a 10 GB least-recently-used size bound.  In-memory results
+          only.
+        budget : str, path-like, lunapi.parallel.WorkerBudget or bool, optional
+          Lease workers from a budget shared with concurrent runs instead
+          of sizing a pool independently.  The run waits for at least one
+          slot, and its share is recomputed between batches as other runs
+          start and finish.  A directory path shares the budget with every
+          process that uses the same path.  Defaults to the directory named
+          by the ``LUNAPI_WORKER_BUDGET`` environment variable, if set;
+          ``False`` disables budgeting.
+        priority : int, optional
+          Higher-priority runs are granted budget slots first; runs of equal
+          priority share the budget evenly.  Default 0.
 
         Returns
         -------
         lunapi.parallel.ParallelProcResult
           Object containing concatenated ``tables`` plus ``errors``,
-          ``stdout`` and per-record metadata.
+          ``stdout`` and per-record metadata.  ``records`` includes each
+          record's worker PID and resource use (``WallTime``, ``CPUTime``,
+          ``EvalTime``, ``ConvertTime`` in seconds; ``PeakRSS`` and
+          ``BytesRead`` in bytes); ``summary()`` aggregates them into
+          throughput, worker utilisation and the slowest records.  With
+          *cache*, ``records.Cached`` marks records served from the cache
+          and ``cache_stats`` holds the hit, miss, store and eviction counts.
         """
         from .parallel import run_parallel_project
 
@@ -737,6 +831,190 @@ class proj:
             n2=n2,
             ids=ids,
             skip=skip,
+            pool=pool,
+            schedule=schedule,
+            resume=resume,
+            record_timeout=record_timeout,
+            max_rss=max_rss,
+            max_records_per_worker=max_records_per_worker,
+            backend=backend,
+            merge=merge,
+            cache=cache,
+            budget=budget,
+            priority=priority,
+        )
+
+    #------------------------------------------------------------------------
+
+    def proc_iter(self, cmdstr, workers=None, batch_size=1, params=None,
+                        param_file=None, progress=False,
+                        n1=None, n2=None, ids=None, skip=None, pool=None,
+                        schedule="ordinal", record_timeout=None, max_rss=None,
+                        max_records_per_worker=None, backend=None):
+        """Stream per-record results of a parallel run as records complete.
+
+        A generator version of :meth:`proc_parallel`.  Each record is
+        yielded as a self-contained :class:`~lunapi.parallel.ProcResult`
+        holding only that record's tables, ``errors``, ``stdout`` and
+        one-row ``records`` frame.  Results are not collated or added to
+        the project result cache, so parent memory stays bounded by the
+        records in flight and results can be written to any sink
+        incrementally::
+
+          for res in p.proc_iter('PSD sig=C3 spectrum', workers=8):
+              if res.ok:
+                  res['PSD: F_CH'].to_parquet(f"{res.records.ID[0]}.parquet")
+
+        Parameters
+        ----------
+        cmdstr : str
+          One or more Luna commands, optionally separated by newlines.
+        workers : int, optional
+          Number of worker processes (see :meth:`proc_parallel`).
+        batch_size : int or 'auto', optional
+          Number of records per submitted worker batch, or ``'auto'`` to
+          size batches from observed record run times.  Defaults to 1.
+        params, param_file, n1, n2, ids, skip, pool, schedule
+          As for :meth:`proc_parallel`.
+        record_timeout, max_rss, max_records_per_worker, backend
+          As for :meth:`proc_parallel`.
+        progress : bool or callable, optional
+          As for :meth:`proc_parallel`; off by default.
+
+        Yields
+        ------
+        lunapi.parallel.ProcResult
+          One result per record, in completion order.
+        """
+        from .parallel import iter_parallel_project
+
+        return iter_parallel_project(
+            self,
+            cmdstr,
+            workers=workers,
+            batch_size=batch_size,
+            params=params,
+            param_file=param_file,
+            progress=progress,
+            n1=n1,
+            n2=n2,
+            ids=ids,
+            skip=skip,
+            pool=pool,
+            schedule=schedule,
+            record_timeout=record_timeout,
+            max_rss=max_rss,
+            max_records_per_worker=max_records_per_worker,
+            backend=backend,
+        )
+
+    #------------------------------------------------------------------------
+
+    async def proc_async(self, cmdstr, progress=None, **kwargs):
+        """Awaitable version of :meth:`proc_parallel` for use in an event loop.
+
+        The run is coordinated from an executor thread while worker
+        processes evaluate the records, so the event loop is not blocked.
+        Pass a shared *pool* (see :meth:`pool`) so that concurrent requests
+        draw on one bounded set of warm workers::
+
+          async def handler(request):
+              queue = asyncio.Queue()
+              task = asyncio.create_task(p.proc_async('HEADERS', pool=pool, progress=queue))
+              while (event := await queue.get()) is not None:
+                  ...                      # stream progress to the client
+              return (await task)['HEADERS: CH']
+
+        Cancelling the awaiting task stops the run and restarts any busy
+        workers before :class:`asyncio.CancelledError` propagates.
+
+        Parameters
+        ----------
+        cmdstr : str
+          One or more Luna commands, optionally separated by newlines.
+        progress : asyncio.Queue or callable, optional
+          A queue receives each progress event and then ``None`` once the
+          run has ended; a coroutine function or plain callable is called
+          on the event loop with each event.  Off by default.
+        **kwargs
+          Other arguments of :meth:`proc_parallel`.
+
+        Returns
+        -------
+        lunapi.parallel.ProcResult
+          As for :meth:`proc_parallel`, except that in-memory results are
+          detached from the project result cache, so concurrent calls do
+          not overwrite each other's tables.
+        """
+        from .parallel import run_parallel_project_async
+
+        return await run_parallel_project_async(self, cmdstr, progress=progress, **kwargs)
+
+    #------------------------------------------------------------------------
+
+    def estimate(self, cmdstr=None, pilot=0, params=None, param_file=None,
+                 workers=None, memory=None, seed=None,
+                 n1=None, n2=None, ids=None, skip=None, pool=None, backend=None):
+        """Estimate run time and worker memory of :meth:`proc_parallel` before a run.
+
+        Reads only the EDF headers of the sample list, and optionally times
+        *cmdstr* on a small random pilot subset to extrapolate per-record
+        cost from each record's number of samples::
+
+          est = p.estimate('PSD sig=C3 spectrum', pilot=5)
+          est['predicted_wall'], est['worker_rss']
+          p.proc_parallel('PSD sig=C3 spectrum',
+                          workers=est['workers'], batch_size=est['batch_size'])
+
+        Parameters
+        ----------
+        cmdstr : str, optional
+          Luna commands to time; required when *pilot* is set.
+        pilot : int, optional
+          Number of randomly chosen records to run the command on.  Without
+          a pilot, worker memory follows a fixed per-sample model and run
+          time is not predicted.
+        params, param_file, n1, n2, ids, skip, pool, backend
+          As for :meth:`proc_parallel`.
+        workers : int, optional
+          Upper bound for the suggested number of workers; also the number
+          of pilot workers.  Defaults to half the available CPUs, capped
+          at 10.
+        memory : int or str, optional
+          Memory to plan for, such as ``'32G'``.  Defaults to the memory
+          currently available on this machine.
+        seed : int, optional
+          Seed for choosing pilot records.
+
+        Returns
+        -------
+        dict
+          ``records`` (per-record duration, channels, sample rate, samples,
+          file size and predicted time and peak RSS), ``pilot`` (measured
+          pilot records or ``None``), totals (``total_duration`` seconds,
+          ``total_samples``, ``total_size`` bytes), ``predicted_time``
+          (summed record seconds), ``predicted_wall`` (seconds with the
+          suggested workers), ``worker_rss`` (bytes per worker),
+          ``memory_available``, and suggested ``workers`` and
+          ``batch_size`` that fit in memory.
+        """
+        from .parallel import estimate_parallel_project
+
+        return estimate_parallel_project(
+            self,
+            cmdstr,
+            pilot=pilot,
+            params=params,
+            param_file=param_file,
+            workers=workers,
+            memory=memory,
+            seed=seed,
+            n1=n1,
+            n2=n2,
+            ids=ids,
+            skip=skip,
+            pool=pool,
+            backend=backend,
         )
 
     #------------------------------------------------------------------------
@@ -744,7 +1022,10 @@ class proj:
     def procn(self, cmdstr, workers=None, batch_size=None, params=None,
              param_file=None, strict=False, progress=True,
              out_db=None, out_text=None, in_memory=None,
-             n1=None, n2=None, ids=None, skip=None):
+             n1=None, n2=None, ids=None, skip=None, pool=None,
+             schedule=None, resume=None, record_timeout=None, max_rss=None,
+             max_records_per_worker=None, backend=None, merge=None, cache=None,
+             budget=None, priority=None):
         """Evaluate Luna commands across the sample list using N worker processes.
 
         Convenience alias for :meth:`proc_parallel`.
@@ -765,12 +1046,60 @@ class proj:
             "n2": n2,
             "ids": ids,
             "skip": skip,
+            "pool": pool,
+            "schedule": schedule,
+            "resume": resume,
+            "record_timeout": record_timeout,
+            "max_rss": max_rss,
+            "max_records_per_worker": max_records_per_worker,
+            "backend": backend,
+            "merge": merge,
+            "cache": cache,
+            "budget": budget,
+            "priority": priority,
         }
         kwargs.update({key: value for key, value in optional.items() if value is not None})
         return self.proc_parallel(cmdstr, **kwargs)
 
     #------------------------------------------------------------------------
 
+    def pool(self, workers=None, backend=None):
+        """Start a persistent pool of worker processes for :meth:`proc_parallel`.
+
+        Worker processes import lunapi and start their Luna engines once, and
+        stay warm across calls until the pool is closed.  Use the pool as a
+        context manager so that workers are always shut down::
+
+          with p.pool(workers=8) as pool:
+              hdr = pool.proc_parallel('HEADERS')
+              psd = p.proc_parallel('PSD sig=C3 spectrum', pool=pool)
+
+        Parameters
+        ----------
+        workers : int, optional
+          Number of worker processes.  Defaults to half the available CPUs,
+          capped at 10, or to one per address of a remote *backend*.
+        backend : str or lunapi.parallel.SocketBackend, optional
+          ``'forkserver'`` to fork local workers from a preloaded server
+          (fast start and recycling), ``'thread'`` for in-process worker
+          threads, or a socket backend to run the workers on
+          ``lunapi-worker`` daemons on other machines::
+
+            be = lp.SocketBackend(['node1:7711', 'node1:7711', 'node2:7711'],
+                                  authkey='secret')
+            with p.pool(backend=be) as pool:
+                res = pool.proc_parallel('PSD sig=C3 spectrum')
+
+        Returns
+        -------
+        lunapi.parallel.WorkerPool
+        """
+        from .parallel import WorkerPool
+
+        return WorkerPool(workers=workers, project=self, backend=backend)
+
+    #------------------------------------------------------------------------
+
     def silent_proc(self, cmdstr ) -> ProcResult:
         """Evaluate Luna commands across all sample-list individuals without printing log output.
 
@@ -789,8 +1118,10 @@ class proj:
         from .parallel import ProcResult, _errors_frame, _stdout_frame, _records_frame
         silence_mode = self.is_silenced()
         self.silence(True,False)
+        _results_changed()
         proj.eng.eval(cmdstr)
         self.silence( silence_mode , False )
+        self._enforce_result_budget()
         return ProcResult(
             _owner=self,
             errors=_errors_frame([]),
@@ -844,7 +1175,7 @@ class proj:
 
     #------------------------------------------------------------------------
 
-    def table( self, cmd , strata = 'BL' ):
+    def table( self, cmd , strata = 'BL' , columns = None , where = None , ids = None ):
         """Return a specific output table as a DataFrame.
 
         Parameters
@@ -854,18 +1185,90 @@ class proj:
         strata : str, optional
           Stratum label for the desired table (e.g. ``'CH_F'``, ``'E'``).
           Defaults to ``'BL'`` (baseline / un-stratified).
+        columns : list of str, optional
+          Return only these columns, in this order.
+        where : dict, optional
+          Keep rows whose column values match: ``{'CH': ['C3', 'C4']}``,
+          ``{'E': 1}``, or ``{'F': slice(0.5, 4)}`` for an inclusive range.
+        ids : str or list of str, optional
+          Keep rows for these individual IDs.
 
         Returns
         -------
         pandas.DataFrame or None
           Result table, or ``None`` if the result store is empty.
+
+        Notes
+        -----
+        Rows and columns are selected in the result store before
+        conversion, so only the selected part of a large table is copied
+        into pandas::
+
+          proj.table( 'PSD' , 'CH_F' , where = { 'CH' : 'C3' , 'F' : slice( 11 , 15 ) } )
         """
         if self.empty_result_set(): return None
-        strata = _coerce_strata( proj.eng.strata(), cmd, strata )
-        r = proj.eng.table( cmd , strata )
-        t = pd.DataFrame( r[1] ).T
-        t.columns = r[0]
-        return t
+        # the store is read in place with the GIL released: hold off writers
+        with _ENGINE_LOCK:
+            strata = _coerce_strata( proj.eng.strata(), cmd, strata )
+            if proj._spill is not None:
+                t = proj._spill.table( proj.eng , cmd , strata , columns , where , ids )
+                if t is not None: return t
+                proj._spill.touch( cmd , strata )
+            return _columns2df( *proj.eng.table_columns( cmd , strata , *_table_query( columns , where , ids ) ) )
+
+    #------------------------------------------------------------------------
+
+    def result_store_usage( self ):
+        """Report the memory held by each table in the result store.
+
+        Returns
+        -------
+        pandas.DataFrame
+          One row per command/strata table, with columns ``Command``,
+          ``Strata``, ``Rows``, ``Columns``, ``Bytes`` (approximate memory
+          held by the engine), ``Spilled`` and ``DiskBytes`` (size of the
+          spill file, see :meth:`result_store_budget`).
+        """
+        from .parallel import _usage_frame
+        if proj._spill is not None:
+            return proj._spill.usage( proj.eng )
+        with _ENGINE_LOCK:
+            return _usage_frame( [ ( *u , False , 0 ) for u in proj.eng.table_usage() ] )
+
+    #------------------------------------------------------------------------
+
+    def result_store_budget( self , max_size , path = None ):
+        """Cap the memory held by the result store, spilling tables to disk.
+
+        Whenever :meth:`proc`, :meth:`silent_proc`, :meth:`proc_parallel` or
+        :meth:`import_db` leave more than *max_size* bytes of tables in the
+        result store, the least recently used tables are written to
+        ``.npz`` files and dropped from memory.  :meth:`table` reads them
+        back transparently.
+
+        Parameters
+        ----------
+        max_size : int or str or None
+          Budget in bytes or as a string such as ``'4G'``.  ``None`` stops
+          further spilling; tables already spilled stay readable.
+        path : str or path-like, optional
+          Directory for spill files.  Defaults to a temporary directory
+          removed when Python exits.
+
+        Returns
+        -------
+        None
+        """
+        from .parallel import ResultSpill
+        if proj._spill is None:
+            proj._spill = ResultSpill( max_size , path )
+        else:
+            proj._spill.configure( max_size , path )
+        self._enforce_result_budget()
+
+    def _enforce_result_budget( self ):
+        if proj._spill is not None:
+            proj._spill.enforce( proj.eng )
 
     #------------------------------------------------------------------------
 
@@ -886,6 +1289,9 @@ class proj:
           the result store is empty.
         """
         if self.empty_result_set(): return None
+        if proj._spill is not None:
+            entry = proj._spill.spilled( proj.eng , cmd , strata )
+            if entry is not None: return list( entry[ 'columns' ] )
         return proj.eng.vars( cmd , strata )
 
 
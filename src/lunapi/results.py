@@ -32,6 +32,7 @@ This module provides helper functions for:
 from .resources import lp_version
 import lunapi.lunapi0 as _luna
 
+import numpy as np
 import pandas as pd
 try:
     from IPython.display import display as ICD
@@ -275,10 +276,7 @@ def table( ts, cmd , strata = 'BL' ):
    pandas.DataFrame
        Result table with properly named columns.
    """
-   r = ts[cmd][strata]
-   t = pd.DataFrame( r[1] ).T
-   t.columns = r[0]
-   return t
+   return _table2df( ts[cmd][strata] )
 
 # --------------------------------------------------------------------------------
 
@@ -309,10 +307,147 @@ def tables( ts ):
 
 
 def _table2df( r ):
-   """Convert a single raw ``(column_names, data_matrix)`` tuple to a DataFrame."""
-   t = pd.DataFrame( r[1] ).T
-   t.columns = r[0]
-   return t
+   """Convert a single raw ``(column_names, columns)`` tuple to a DataFrame.
+
+   The raw data are column-major, so each column is typed on its own:
+   integer and float columns become ``int64`` / ``float64`` (``NaN`` for
+   missing values) and anything else stays ``object``.
+   """
+   cols = list( r[0] )
+   return pd.DataFrame( dict( zip( cols , r[1] ) ) , columns = cols )
+
+# --------------------------------------------------------------------------------
+
+
+def _column2array( column , mask = None ):
+   """Convert one typed column buffer from ``table_columns()`` to an array."""
+   if isinstance( column , tuple ):
+      codes , values = column
+      lookup = np.empty( len( values ) + 1 , dtype = object )
+      lookup[:-1] = values
+      lookup[-1] = None
+      return lookup[ np.asarray( codes ) ]
+   column = np.asarray( column )
+   if mask is not None and column.dtype.kind == 'i':
+      column = column.astype( np.float64 )
+      column[ mask ] = np.nan
+   return column
+
+
+def _columns2df( cols , columns , masks = None ):
+   """Build a typed DataFrame from the ``table_columns()`` binding.
+
+   Parameters
+   ----------
+   cols : list of str
+       Column names.
+   columns : list
+       One buffer per column: an ``int64`` or ``float64`` array, or a
+       ``(codes, values)`` pair for a dictionary-encoded string column
+       (code ``-1`` for missing).
+   masks : list, optional
+       One bool array (or ``None``) per column flagging missing values.
+       Integer columns with a mask become ``float64`` with ``NaN``, as
+       elsewhere in lunapi.  The engine returns a mask whenever the stored
+       column has missing values, even if none are among the selected
+       rows, so a column has the same type however the table is filtered.
+
+   Returns
+   -------
+   pandas.DataFrame
+   """
+   cols = list( cols )
+   if masks is None:
+      masks = [ None ] * len( cols )
+   return pd.DataFrame(
+      { col : _column2array( column , mask ) for col , column , mask in zip( cols , columns , masks ) } ,
+      columns = cols )
+
+
+def _table_query( columns = None , where = None , ids = None ):
+   """Normalise ``table()`` selection arguments for ``table_columns()``.
+
+   Parameters
+   ----------
+   columns : str or list of str, optional
+       Columns to return, in order.  ``None`` returns all columns.
+   where : dict, optional
+       Maps a column name to the value(s) to keep: a single value, a list
+       (or other collection) of values, or a ``slice(lo, hi)`` keeping
+       numbers between *lo* and *hi* inclusive (either may be ``None``).
+   ids : str or list of str, optional
+       Individual IDs to keep; shorthand for ``where={'ID': ids}``.
+
+   Returns
+   -------
+   tuple
+       ``(columns, filters)``: a list of names (or ``None``) and a list of
+       ``(column, strings, numbers, lo, hi)`` filters, ``strings`` being
+       ``None`` for a range.  Values match string cells by their text and
+       numeric cells by their numeric value.
+   """
+   if isinstance( columns , str ):
+      columns = [ columns ]
+   where = dict( where or {} )
+   if ids is not None:
+      where[ 'ID' ] = [ ids ] if isinstance( ids , str ) else list( ids )
+   filters = []
+   for col , spec in where.items():
+      if isinstance( spec , slice ):
+         if spec.step is not None:
+            raise ValueError( f"where[{col!r}]: a slice range cannot have a step" )
+         filters.append( ( col , None , [] , spec.start , spec.stop ) )
+         continue
+      values = [ spec ] if isinstance( spec , ( str , bytes ) ) or not np.iterable( spec ) else list( spec )
+      strings , numbers = [] , []
+      for value in values:
+         if isinstance( value , ( bool , np.bool_ ) ):
+            value = int( value )
+         if isinstance( value , ( int , float , np.number ) ):
+            numbers.append( float( value ) )
+            strings.append( str( value ) )
+            if float( value ).is_integer() and str( int( value ) ) != str( value ):
+               strings.append( str( int( value ) ) )
+            continue
+         strings.append( str( value ) )
+         try:
+            numbers.append( float( value ) )
+         except ValueError:
+            pass
+      filters.append( ( col , strings , numbers , None , None ) )
+   return ( None if columns is None else list( columns ) ) , filters
+
+
+def _filter_frame( df , columns = None , where = None , ids = None ):
+   """Apply ``table()`` selection arguments to a DataFrame already in memory."""
+   columns , filters = _table_query( columns , where , ids )
+   if not filters and columns is None:
+      return df
+   keep = np.ones( len( df ) , dtype = bool )
+   for col , strings , numbers , lo , hi in filters:
+      if col not in df.columns:
+         raise KeyError( f"table has no column {col}" )
+      series = df[ col ]
+      if strings is None:
+         values = pd.to_numeric( series , errors = 'coerce' )
+         match = values.notna()
+         if lo is not None: match &= values >= lo
+         if hi is not None: match &= values <= hi
+      elif series.dtype.kind in 'iuf':
+         match = series.isin( numbers )
+      else:
+         match = series.map( lambda v : isinstance( v , str ) and v in strings
+                             or isinstance( v , ( int , float , np.number ) ) and v in numbers )
+         match = match.astype( bool )
+      keep &= match.to_numpy()
+   if columns is not None:
+      missing = [ col for col in columns if col not in df.columns ]
+      if missing:
+         raise KeyError( f"table has no column {missing[0]}" )
+   out = df.loc[ keep ] if filters else df
+   if columns is not None:
+      out = out[ columns ]
+   return out.reset_index( drop = True )
 
 # --------------------------------------------------------------------------------
 
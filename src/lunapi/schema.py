@@ -0,0 +1,238 @@
+#    --------------------------------------------------------------------
+#
+#    This file is part of Luna.
+#
+#    LUNA is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Luna is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with Luna. If not, see <http://www.gnu.org/licenses/>.
+#
+#    Please see LICENSE.txt for more details.
+#
+#    --------------------------------------------------------------------
+
+"""Column types of Luna output tables, shared by the table readers.
+
+The Luna command dictionary (``fetch_tbls`` / ``fetch_vars``) lists the
+tables each command writes and the variables in each table, but not their
+types.  :class:`TableSchema` keys columns by ``(command, factors, variable)``
+using that dictionary, and records which columns have held numbers, and
+whether floats or only integers, so a column keeps one dtype across the
+tables of a session.  Whether a column is text is decided per table, as
+each output may differ: a column whose values in one table are not all
+numeric stays text in that table only.  The parallel collation,
+:meth:`lunapi.destrat.destrat.get` and
+:func:`lunapi.parallel.read_text_table` share the session registry
+returned by :func:`table_schema`.
+
+Kinds are those of the parallel table encoding: ``'i'`` (integer),
+``'f'`` (float) and ``'s'`` (text).
+"""
+
+from __future__ import annotations
+
+import threading
+
+import pandas as pd
+
+
+def _factor_set(strata):
+    """Return the strata factors of *strata* as a frozenset (``BL`` is empty)."""
+    if strata is None:
+        return frozenset()
+    if isinstance(strata, str):
+        strata = strata.split("_")
+    return frozenset(str(part) for part in strata if str(part) and str(part) != "BL")
+
+
+def _merge_kind(old, new):
+    if old is None or old == new:
+        return new
+    return "f"  # 'i' and 'f'
+
+
+def _series_kind(series):
+    kind = series.dtype.kind
+    if kind in "iu":
+        return "i"
+    if kind == "f":
+        return "f"
+    return "s"
+
+
+def _parse_numeric(series):
+    """Return *series* as numbers, or ``None`` if it holds non-numeric text.
+
+    Textual NA/NaN markers count as missing values.
+    """
+    if series.dtype.kind in "iuf":
+        return series
+    text = series.astype("string").str.strip().str.casefold()
+    cleaned = series.mask(text.isin(("na", "nan")))
+    numeric = pd.to_numeric(cleaned, errors="coerce")
+    if numeric[cleaned.notna()].notna().all():
+        return numeric
+    return None
+
+
+def _luna_dictionary(cmd):
+    """Return ``{factors: variables}`` for *cmd* from the Luna dictionary."""
+    try:
+        import lunapi.lunapi0 as _luna
+        tables = _luna.fetch_tbls(cmd, True)
+        return {
+            _factor_set(tbl): frozenset(_luna.fetch_vars(cmd, tbl, True))
+            for tbl in tables
+        }
+    except Exception:
+        return {}
+
+
+class TableSchema:
+    """Registry of the column types of Luna output tables.
+
+    Parameters
+    ----------
+    dictionary : callable, optional
+        ``dictionary(cmd)`` returns ``{factors: variables}`` (frozensets)
+        for the tables of *cmd*.  Defaults to the Luna command dictionary.
+
+    Notes
+    -----
+    Only numeric kinds of columns the schema knows are recorded: the
+    strata factors of the table and the variables the dictionary lists for
+    it (``ID`` is always text).  A recorded ``'i'`` widens to ``'f'`` once
+    a float turns up, and never narrows or turns to text: a table whose
+    values in a column are not all numeric keeps them as text without
+    changing the record.  Other columns (commands missing from the
+    dictionary, injected tables) are inferred on every call; :meth:`clear`
+    forgets everything.
+    """
+
+    def __init__(self, dictionary=None):
+        self._dictionary = _luna_dictionary if dictionary is None else dictionary
+        self._tables = {}
+        self._kinds = {}
+        self._lock = threading.RLock()
+
+    def variables(self, cmd, strata):
+        """Return the variables the dictionary lists for a command/strata table."""
+        with self._lock:
+            if cmd not in self._tables:
+                self._tables[cmd] = self._dictionary(cmd) or {}
+            return self._tables[cmd].get(_factor_set(strata), frozenset())
+
+    def _known(self, cmd, factors, column):
+        return (column == "ID" or column in factors
+                or column in self.variables(cmd, factors))
+
+    def kind(self, cmd, strata, column):
+        """Return the recorded kind of a column, or ``None`` if not numeric so far."""
+        if column == "ID":
+            return "s"
+        with self._lock:
+            return self._kinds.get((cmd, _factor_set(strata), column))
+
+    def kinds(self, cmd, strata, columns):
+        """Return ``{column: kind}`` for the recorded columns among *columns*."""
+        factors = _factor_set(strata)
+        with self._lock:
+            found = {col: self._kinds.get((cmd, factors, col)) for col in columns}
+        found.update({col: "s" for col in columns if col == "ID"})
+        return {col: kind for col, kind in found.items() if kind is not None}
+
+    def recorded(self, cmd, strata):
+        """Return ``{column: kind}`` for every recorded column of a table."""
+        factors = _factor_set(strata)
+        with self._lock:
+            return {col: kind for (c, f, col), kind in self._kinds.items()
+                    if c == cmd and f == factors}
+
+    def learn(self, cmd, strata, column, kind):
+        """Record that a column holds values of *kind*; return the kind to use.
+
+        Text (``'s'``) is not recorded and is returned as is, for the table
+        at hand only; numeric kinds are merged with the recorded one.
+        """
+        factors = _factor_set(strata)
+        if kind == "s" or column == "ID" or not self._known(cmd, factors, column):
+            return kind
+        with self._lock:
+            key = (cmd, factors, column)
+            merged = _merge_kind(self._kinds.get(key), kind)
+            self._kinds[key] = merged
+            return merged
+
+    def cast(self, frame, cmd, strata, names=None, exclude=("ID",)):
+        """Return *frame* with its numeric text columns converted to numbers.
+
+        Parameters
+        ----------
+        frame : pandas.DataFrame
+            Table to cast.  It is not modified.
+        cmd, strata : str
+            Command and strata (string or factor list) of the table.
+        names : dict, optional
+            Maps column names to schema variable names, for pivoted tables
+            whose columns are named ``VAR.FAC_LVL``.
+        exclude : sequence of str, optional
+            Columns left untouched.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Columns whose values are all numeric become numeric, as floats
+            if the column has been recorded as ``'f'``; columns holding any
+            other text are kept as text.
+        """
+        names = names or {}
+        parsed = {}
+        for col in frame.columns:
+            if col in exclude:
+                continue
+            series = frame[col]
+            numeric = _parse_numeric(series)
+            if numeric is None:
+                continue
+            parsed[col] = series, numeric
+            if numeric.notna().any():  # all-missing columns say nothing of the type
+                self.learn(cmd, strata, names.get(col, col), _series_kind(numeric))
+        kinds = self.kinds(cmd, strata, {names.get(col, col) for col in parsed})
+        converted = {}
+        for col, (series, numeric) in parsed.items():
+            if kinds.get(names.get(col, col)) == "f" and numeric.dtype.kind != "f":
+                numeric = numeric.astype("float64")
+            if numeric is not series:
+                converted[col] = numeric
+        if not converted:
+            return frame
+        return pd.DataFrame(
+            {col: converted.get(col, frame[col]) for col in frame.columns},
+            index=frame.index,
+            columns=frame.columns,
+        )
+
+    def clear(self):
+        """Forget the cached dictionary and every recorded kind."""
+        with self._lock:
+            self._tables.clear()
+            self._kinds.clear()
+
+
+_SCHEMA = TableSchema()
+
+
+def table_schema():
+    """Return the session-wide :class:`TableSchema`."""
+    return _SCHEMA
+
+
+__all__ = ["TableSchema", "table_schema"]
@@ -0,0 +1,139 @@
+#    --------------------------------------------------------------------
+#
+#    This file is part of Luna.
+#
+#    LUNA is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Luna is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with Luna. If not, see <http://www.gnu.org/licenses/>.
+#
+#    Please see LICENSE.txt for more details.
+#
+#    --------------------------------------------------------------------
+
+"""Worker daemon serving parallel-run slices over TCP (``lunapi-worker``).
+
+Run one daemon per machine::
+
+  LUNAPI_WORKER_AUTHKEY=secret lunapi-worker --listen 0.0.0.0:7711 --workers 16
+
+and point a :class:`lunapi.parallel.SocketBackend` at it.  Every accepted
+connection gets its own worker process running the same loop as a local
+:class:`lunapi.parallel.WorkerPool` worker; the daemon relays messages
+between the connection and that process, and kills the process when the
+connection closes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import threading
+from multiprocessing.connection import Listener
+from multiprocessing.connection import wait as _wait_connections
+
+from .parallel import _worker_authkey, _worker_main, parse_worker_address
+
+
+def _relay(ctx, client, slots):
+    """Serve one client connection with a dedicated worker process."""
+    parent_conn, child_conn = ctx.Pipe(duplex=True)
+    process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+    try:
+        process.start()
+        child_conn.close()
+        while True:
+            ready = _wait_connections([parent_conn, client, process.sentinel])
+            if parent_conn in ready:
+                try:
+                    client.send_bytes(parent_conn.recv_bytes())
+                except (EOFError, OSError):
+                    break
+                continue
+            if client in ready:
+                try:
+                    parent_conn.send_bytes(client.recv_bytes())
+                except (EOFError, OSError):
+                    break
+                continue
+            break  # worker process exited with nothing left to relay
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join(1.0)
+        for conn in (parent_conn, client):
+            try:
+                conn.close()
+            except OSError:
+                pass
+        slots.release()
+
+
+def serve(address, authkey=None, workers=None):
+    """Accept connections on *address* and run one worker process per connection.
+
+    Parameters
+    ----------
+    address : str or (str, int)
+        ``'host:port'`` to listen on.
+    authkey : str or bytes, optional
+        Shared secret clients must present.  Defaults to the
+        ``LUNAPI_WORKER_AUTHKEY`` environment variable.
+    workers : int, optional
+        Maximum number of concurrent connections (worker processes).
+        Further clients wait until a slot is free.  Unlimited by default.
+    """
+    host, port = parse_worker_address(address)
+    authkey = _worker_authkey(authkey)
+    ctx = multiprocessing.get_context("spawn")
+    slots = threading.BoundedSemaphore(workers) if workers else threading.Semaphore(2 ** 30)
+    with Listener((host, port), authkey=authkey) as listener:
+        bound_host, bound_port = listener.address
+        print(f"lunapi-worker: listening on {bound_host}:{bound_port}", flush=True)
+        while True:
+            slots.acquire()
+            try:
+                client = listener.accept()
+            except multiprocessing.AuthenticationError as exc:
+                print(f"lunapi-worker: rejected connection: {exc}", file=sys.stderr, flush=True)
+                slots.release()
+                continue
+            except OSError:
+                slots.release()
+                raise
+            threading.Thread(target=_relay, args=(ctx, client, slots), daemon=True).start()
+
+
+def main(argv=None):
+    """Command-line entry point for ``lunapi-worker``."""
+    parser = argparse.ArgumentParser(
+        prog="lunapi-worker",
+        description="Serve lunapi proc_parallel worker processes over TCP.",
+    )
+    parser.add_argument("--listen", required=True, metavar="HOST:PORT",
+                        help="address to listen on, e.g. 0.0.0.0:7711")
+    parser.add_argument("--authkey", default=None,
+                        help="shared secret (default: $LUNAPI_WORKER_AUTHKEY)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="maximum concurrent worker processes (default: unlimited)")
+    args = parser.parse_args(argv)
+    try:
+        serve(args.listen, authkey=args.authkey, workers=args.workers)
+    except ValueError as exc:
+        parser.error(str(exc))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -85,6 +85,24 @@ def test_eval_and_table(rec):
     assert "PSD" in df.columns
 
 
+def test_table_columns_are_typed(rec):
+    rec.eval("EPOCH len=30\nPSD sig=EEG dB=T spectrum=T")
+    df = rec.table("PSD", "CH_F")
+    assert df["F"].dtype == "float64"
+    assert df["PSD"].dtype == "float64"
+    assert df["CH"].dtype == object
+
+
+def test_table_pushes_down_column_and_row_selection(rec):
+    rec.eval("EPOCH len=30\nPSD sig=EEG dB=T spectrum=T")
+    full = rec.table("PSD", "CH_F")
+    band = rec.table("PSD", "CH_F", columns=["F", "PSD"],
+                     where={"CH": "EEG", "F": slice(8, 12)})
+    expected = full[full["F"].between(8, 12)][["F", "PSD"]].reset_index(drop=True)
+    pd.testing.assert_frame_equal(band, expected)
+    assert rec.table("PSD", "CH_F", where={"CH": "C3"}).empty
+
+
 def test_epoch_command(rec):
     result = rec.proc("EPOCH len=30")
     assert any("EPOCH" in k for k in result)
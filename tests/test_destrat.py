@@ -1,7 +1,10 @@
+import sqlite3
+
 import pandas as pd
+import pytest
 from pandas.api.types import is_numeric_dtype
 
-from lunapi.destrat import _maybe_numeric
+from lunapi.destrat import _maybe_numeric, destrat, merge_db
 
 
 def test_maybe_numeric_converts_numeric_text_and_missing_markers():
@@ -27,3 +30,71 @@ def test_maybe_numeric_keeps_existing_numeric_column_numeric():
     result = _maybe_numeric(source)
 
     pd.testing.assert_series_equal(result, source)
+
+
+_LUNA_SCHEMA = """
+CREATE TABLE factors (factor_id INTEGER PRIMARY KEY, factor_name VARCHAR(20) NOT NULL, is_numeric INTEGER);
+CREATE TABLE levels (level_id INTEGER PRIMARY KEY, level_name VARCHAR(20) NOT NULL, factor_id INTEGER NOT NULL);
+CREATE TABLE strata (strata_id INTEGER NOT NULL, level_id INTEGER);
+CREATE TABLE individuals (indiv_id INTEGER PRIMARY KEY, indiv_name VARCHAR(20) NOT NULL, file_name VARCHAR(20));
+CREATE TABLE commands (cmd_id INTEGER PRIMARY KEY, cmd_name VARCHAR(20) NOT NULL, cmd_number INTEGER, cmd_timestamp VARCHAR(20), cmd_parameters VARCHAR(400));
+CREATE TABLE variables (variable_id INTEGER PRIMARY KEY, variable_name VARCHAR(20) NOT NULL, command_name VARCHAR(20), variable_label VARCHAR(20));
+CREATE TABLE timepoints (timepoint_id INTEGER PRIMARY KEY, epoch INTEGER, start UNSIGNED BIG INT, stop UNSIGNED BIG INT);
+CREATE TABLE datapoints (indiv_id INTEGER NOT NULL, cmd_id INTEGER NOT NULL, variable_id INTEGER NOT NULL, value NUMERIC, strata_id INTEGER, timepoint_id INTEGER);
+"""
+
+
+def _write_luna_db(path, indiv, channels):
+    """Write a minimal Luna-style database with SIGSTATS H1 per channel.
+
+    Channels are inserted in the given order, so IDs differ between files.
+    """
+    con = sqlite3.connect(path)
+    con.executescript(_LUNA_SCHEMA)
+    con.execute("INSERT INTO individuals VALUES (1, ?, ?)", (indiv, f"{indiv}.edf"))
+    con.execute("INSERT INTO commands VALUES (1, 'SIGSTATS', 1, '', '')")
+    con.execute("INSERT INTO factors VALUES (1, 'CH', 0)")
+    con.execute("INSERT INTO factors VALUES (2, '_SIGSTATS', 0)")
+    con.execute("INSERT INTO levels VALUES (1, '.', 2)")
+    con.execute("INSERT INTO variables VALUES (1, 'H1', 'SIGSTATS', '')")
+    for i, ch in enumerate(channels):
+        con.execute("INSERT INTO levels VALUES (?, ?, 1)", (i + 2, ch))
+        con.execute("INSERT INTO strata VALUES (?, 1)", (i + 1,))
+        con.execute("INSERT INTO strata VALUES (?, ?)", (i + 1, i + 2))
+        con.execute(
+            "INSERT INTO datapoints VALUES (1, 1, 1, ?, ?, NULL)",
+            (float(len(indiv) * 10 + i), i + 1),
+        )
+    con.commit()
+    con.close()
+
+
+def test_merge_db_unifies_ids_and_indexes_datapoints(tmp_path):
+    _write_luna_db(tmp_path / "out-1.db", "id1", ["C3", "C4"])
+    _write_luna_db(tmp_path / "out-2.db", "id22", ["C4", "EEG"])
+
+    target = merge_db(str(tmp_path / "out-*.db"), str(tmp_path / "out.db"))
+
+    con = sqlite3.connect(target)
+    try:
+        levels = con.execute("SELECT level_name FROM levels ORDER BY level_id").fetchall()
+        indexes = {row[0] for row in con.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'datapoints'"
+        )}
+        n_strata = con.execute("SELECT COUNT(DISTINCT strata_id) FROM strata").fetchone()[0]
+        n_factors = con.execute("SELECT COUNT(*) FROM factors").fetchone()[0]
+    finally:
+        con.close()
+    assert [name for (name,) in levels] == [".", "C3", "C4", "EEG"]
+    assert n_factors == 2
+    assert n_strata == 3
+    assert "datapoints_covering" in indexes
+
+    df = destrat(target).get("SIGSTATS", r="CH").sort_values(["ID", "CH"])
+    assert df[["ID", "CH"]].values.tolist() == [
+        ["id1", "C3"], ["id1", "C4"], ["id22", "C4"], ["id22", "EEG"],
+    ]
+    assert df["H1"].tolist() == [30.0, 31.0, 40.0, 41.0]
+
+    with pytest.raises(FileExistsError):
+        merge_db(str(tmp_path / "out-1.db"), target)
@@ -5,10 +5,14 @@ from lunapi.parallel import (
     ParallelProcError,
     ParallelProcResult,
     clamp_workers,
+    decode_result_tables,
     default_workers,
+    encode_result_table,
     normalize_result_table,
     normalize_sample_row,
+    parse_memory_size,
     parse_param_text,
+    project_cost_slices,
     project_eval_slices,
     resolve_params,
 )
@@ -69,6 +73,36 @@ def test_project_eval_slices_respects_batch_size():
     ]
 
 
+def test_project_cost_slices_submit_longest_first():
+    costs = {1: 10.0, 2: 50.0, 3: 0.0, 4: 50.0, 5: 20.0}
+    tasks = [
+        {"ordinal": i, "sample_row": [f"S{i}", f"{i}.edf", "."], "label": f"S{i}",
+         "cost": costs[i]}
+        for i in range(1, 6)
+    ]
+
+    slices = project_cost_slices(tasks, workers=2)
+
+    assert [s["slice_index"] for s in slices] == [1, 2, 3, 4, 5]
+    assert [s["rows"][0][0] for s in slices] == ["S2", "S4", "S5", "S1", "S3"]
+    assert [s["cost"] for s in slices] == [50.0, 50.0, 20.0, 10.0, 0.0]
+
+
+def test_project_cost_slices_estimates_cost_from_edf_header(tmp_path, tmp_edf):
+    edf = tmp_edf
+    tasks = [
+        {"ordinal": 1, "sample_row": ["missing", str(tmp_path / "none.edf"), "."], "label": "missing"},
+        {"ordinal": 2, "sample_row": ["a", str(edf), "."], "label": "a"},
+    ]
+
+    slices = project_cost_slices(tasks, workers=2, batch_size=2)
+
+    assert len(slices) == 1
+    assert (slices[0]["start_ordinal"], slices[0]["end_ordinal"]) == (1, 2)
+    assert [row[0] for row in slices[0]["rows"]] == ["a", "missing"]
+    assert slices[0]["cost"] == 256 * 30 * 4
+
+
 def test_normalize_result_table_adds_id_column():
     df = pd.DataFrame({"X": [1, 2]})
 
@@ -87,6 +121,95 @@ def test_normalize_result_table_fills_blank_ids():
     assert out["ID"].tolist() == ["S1", "S1", "S2"]
 
 
+def test_encode_result_table_uses_typed_buffers_and_fills_ids():
+    encoded = encode_result_table(
+        ["CH", "N", "F", "ID"],
+        [["C3", "C4", None], [1, 2, 3], [0.5, None, 2], [None, "", "other"]],
+        "S1",
+    )
+
+    assert encoded["columns"] == ["ID", "CH", "N", "F"]
+    kinds = [kind for kind, _ in encoded["data"]]
+    assert kinds == ["s", "s", "i", "f"]
+    codes, categories = encoded["data"][1][1]
+    assert codes.tolist() == [0, 1, -1]
+    assert categories == ["C3", "C4"]
+
+    df = decode_result_tables([encoded])
+
+    assert df["ID"].tolist() == ["S1", "S1", "other"]
+    assert df["CH"].tolist() == ["C3", "C4", None]
+    assert df["N"].dtype == "int64"
+    assert df["F"].isna().tolist() == [False, True, False]
+
+
+def test_encode_result_columns_matches_raw_table_encoding():
+    import numpy as np
+
+    from lunapi.parallel import encode_result_columns
+    from lunapi.results import _columns2df, _table2df
+
+    cols = ["CH", "N", "F", "ID"]
+    columns = [
+        (np.array([0, 1, -1], dtype=np.int32), ["C3", "C4"]),
+        np.array([1, 2, 3], dtype=np.int64),
+        np.array([0.5, np.nan, 2.0]),
+        (np.array([-1, 0, 1], dtype=np.int32), ["", "other"]),
+    ]
+    masks = [np.array([False, False, True]), None, np.array([False, True, False]),
+             np.array([True, False, False])]
+
+    typed = decode_result_tables([encode_result_columns(cols, columns, masks, "S1")])
+    raw = decode_result_tables([encode_result_table(
+        cols, [["C3", "C4", None], [1, 2, 3], [0.5, None, 2], [None, "", "other"]], "S1",
+    )])
+    pd.testing.assert_frame_equal(typed, raw)
+
+    frame = _columns2df(
+        ["N", "M", "CH"],
+        [np.array([1, 2]), np.array([3, 0]), (np.array([1, -1], dtype=np.int32), ["C3", "C4"])],
+        [None, np.array([False, True]), None],
+    )
+    assert frame["N"].dtype == "int64"
+    assert frame["M"].tolist()[0] == 3 and pd.isna(frame["M"].iloc[1])
+    assert frame["CH"].tolist() == ["C4", None]
+    assert _table2df((["E", "X"], [[1, 2], [0.5, None]]))["E"].dtype == "int64"
+
+
+def test_decode_result_tables_merges_string_dictionaries():
+    first = encode_result_table(["CH", "X"], [["C3", "C4"], [1, 2]], "S1")
+    second = encode_result_table(["CH", "X"], [["C4", "O1"], [0.5, 1.5]], "S2")
+
+    df = decode_result_tables([first, second])
+
+    assert df["ID"].tolist() == ["S1", "S1", "S2", "S2"]
+    assert df["CH"].tolist() == ["C3", "C4", "C4", "O1"]
+    assert df["X"].tolist() == [1.0, 2.0, 0.5, 1.5]
+
+
+def test_decode_result_tables_parses_numeric_strings_and_missing_columns():
+    first = encode_result_table(["E", "SS"], [["1", "2"], ["N2", "N3"]], "S1")
+    second = encode_result_table(["E"], [["3"]], "S2")
+
+    df = decode_result_tables([first, second])
+
+    assert df["E"].dtype == "int64"
+    assert df["E"].tolist() == [1, 2, 3]
+    assert df["SS"].tolist() == ["N2", "N3", None]
+
+
+def test_decode_result_tables_widens_int_columns_missing_from_a_record():
+    first = encode_result_table(["E", "N"], [[1, 2], [10, 20]], "S1")
+    second = encode_result_table(["E"], [[3]], "S2")
+
+    df = decode_result_tables([first, second])
+
+    assert df["E"].dtype == "int64"
+    assert df["N"].dtype == "float64"
+    assert df["N"].tolist()[:2] == [10.0, 20.0]
+    assert pd.isna(df["N"].iloc[2])
+
+
 def test_normalize_sample_row_joins_annotation_collections():
     assert normalize_sample_row(["S1", "x.edf", {"b.annot", "a.annot"}]) == [
         "S1",
@@ -137,6 +260,117 @@ def test_parallel_result_programmatic_table_accessors():
     assert result.commands()["Command"].tolist() == ["HEADERS", "PSD"]
 
 
+def test_table_waits_for_engine_writers(lp):
+    import threading
+
+    import numpy as np
+    from lunapi.parallel import _ENGINE_LOCK
+
+    lp.reinit()
+    lp.eng.inject_columns("LOCKED", "CH", ["ID", "CH"],
+                          [(np.zeros(2, dtype=np.int32), ["S1"]),
+                           (np.arange(2, dtype=np.int32), ["C3", "C4"])])
+    read = []
+    released = threading.Event()
+
+    def writer():
+        with _ENGINE_LOCK:
+            started.set()
+            released.wait(10)
+
+    started = threading.Event()
+    holder = threading.Thread(target=writer, daemon=True)
+    holder.start()
+    started.wait(10)
+    reader = threading.Thread(target=lambda: read.append(lp.table("LOCKED", "CH")), daemon=True)
+    reader.start()
+    reader.join(0.5)
+
+    assert not read
+    released.set()
+    reader.join(10)
+    assert read[0]["CH"].tolist() == ["C3", "C4"]
+
+
+def test_parallel_result_table_selects_columns_and_rows():
+    result = ParallelProcResult(
+        tables={
+            "PSD: CH_F": pd.DataFrame({
+                "ID": ["S1", "S1", "S2", "S2"],
+                "CH": ["C3", "C4", "C3", "C4"],
+                "F": [0.5, 10.0, 0.5, 10.0],
+                "PSD": [1.0, 2.0, 3.0, 4.0],
+            }),
+        },
+    )
+
+    band = result.table("PSD", "CH_F", columns=["ID", "PSD"],
+                        where={"CH": ["C3"], "F": slice(None, 4)})
+    assert band.to_dict("list") == {"ID": ["S1", "S2"], "PSD": [1.0, 3.0]}
+    assert result.table("PSD", "CH_F", where={"F": 10}, ids="S2")["PSD"].tolist() == [4.0]
+    assert result.table("PSD", "CH_F", where={"F": "10"})["PSD"].tolist() == [2.0, 4.0]
+    with pytest.raises(KeyError, match="no column X"):
+        result.table("PSD", "CH_F", where={"X": 1})
+
+
+def test_table_query_normalises_selection_for_the_engine():
+    from lunapi.results import _table_query
+
+    columns, filters = _table_query("PSD", {"CH": "C3", "F": slice(0.5, 4), "E": 2}, ["S1"])
+
+    assert columns == ["PSD"]
+    assert filters == [
+        ("CH", ["C3"], [], None, None),
+        ("F", None, [], 0.5, 4),
+        ("E", ["2"], [2.0], None, None),
+        ("ID", ["S1"], [], None, None),
+    ]
+
+
+class _CountingOwner:
+    def __init__(self, tables):
+        self.tables = tables
+        self.calls = 0
+
+    def strata(self):
+        rows = [k.split(": ") for k in self.tables]
+        return pd.DataFrame(rows, columns=["Command", "Strata"])
+
+    def table(self, cmd, strata):
+        self.calls += 1
+        return self.tables[f"{cmd}: {strata}"].copy()
+
+
+def test_proc_result_memoises_tables_until_results_change(monkeypatch):
+    from lunapi import parallel
+
+    owner = _CountingOwner({
+        "HEADERS: BL": pd.DataFrame({"ID": ["S1"], "NR": [10]}),
+        "PSD: CH_F": pd.DataFrame({"ID": ["S1"], "PSD": [1.0]}),
+        "PSD: CH": pd.DataFrame({"ID": ["S1"], "N": [2]}),
+    })
+    result = ParallelProcResult(_owner=owner)
+
+    first = result["PSD: CH_F"]
+    assert result.table("PSD", "CH_F") is first
+    assert list(result.values())[1] is first
+    assert owner.calls == 3
+
+    copied = result.copy()
+    assert owner.calls == 3
+    copied["PSD: CH_F"].loc[0, "PSD"] = 9.0
+    assert first["PSD"].tolist() == [1.0]
+
+    parallel._results_changed()
+    assert result["PSD: CH_F"] is not first
+    assert owner.calls == 4
+
+    monkeypatch.setattr(parallel, "_TABLE_CACHE_SIZE", 2)
+    dict(result.items())
+    assert len(result._memo) == 2
+    assert list(result._memo) == [("PSD", "CH_F"), ("PSD", "CH")]
+
+
 def test_parse_param_text_supports_luna_delimiters_and_comments():
     text = """
 % comment
@@ -163,6 +397,15 @@ def test_resolve_params_file_then_dict_override(tmp_path):
     ]
 
 
+def test_parse_memory_size_accepts_bytes_and_suffixes():
+    assert parse_memory_size(None) is None
+    assert parse_memory_size(1000) == 1000
+    assert parse_memory_size("512M") == 512 * 1024 ** 2
+    assert parse_memory_size("1.5gb") == int(1.5 * 1024 ** 3)
+    with pytest.raises(ValueError):
+        parse_memory_size("lots")
+
+
 def test_parse_param_text_rejects_bad_lines():
     with pytest.raises(ValueError):
         parse_param_text("novalue")
@@ -229,3 +472,752 @@ def test_proc_parallel_strict_raises_with_partial_result(lp, tmp_sl_two):
 
     assert not excinfo.value.result.ok
     assert len(excinfo.value.result.errors) == 2
+
+
+def test_proc_parallel_cost_schedule_keeps_ordinal_order(lp, tmp_sl_two):
+    lp.sample_list(str(tmp_sl_two))
+
+    result = lp.proc_parallel("HEADERS", workers=2, schedule="cost", progress=False)
+
+    assert result.ok
+    assert result.records["Ordinal"].tolist() == [1, 2]
+    assert result["HEADERS: CH"]["ID"].tolist() == ["test_subject_1", "test_subject_2"]
+
+    with pytest.raises(ValueError):
+        lp.proc_parallel("HEADERS", schedule="random")
+
+
+def test_proc_iter_streams_one_result_per_record(lp, tmp_sl_two):
+    lp.sample_list(str(tmp_sl_two))
+
+    results = list(lp.proc_iter("HEADERS", workers=2))
+
+    assert len(results) == 2
+    assert all(res.ok for res in results)
+    ordered = sorted(results, key=lambda res: res.records["Ordinal"].iloc[0])
+    assert [res.records["ID"].iloc[0] for res in ordered] == ["test_subject_1", "test_subject_2"]
+    assert ordered[0]["HEADERS: CH"]["ID"].tolist() == ["test_subject_1"]
+
+
+def test_proc_parallel_records_include_telemetry_and_summary(lp, tmp_sl_two):
+    lp.sample_list(str(tmp_sl_two))
+
+    result = lp.proc_parallel("HEADERS", workers=2, progress=False)
+    summary = result.summary(slowest=1)
+
+    assert result.records["WallTime"].notna().all()
+    assert (result.records["WallTime"] >= result.records["EvalTime"]).all()
+    assert result.records["Worker"].notna().all()
+    assert summary["records"] == 2
+    assert summary["elapsed"] > 0
+    assert summary["records_per_second"] > 0
+    assert 0 < summary["utilisation"] <= 1
+    assert len(summary["slowest"]) == 1
+
+
+def test_estimate_reads_headers_and_extrapolates_pilot(lp, tmp_sl_two):
+    lp.sample_list(str(tmp_sl_two))
+
+    headers_only = lp.estimate(memory="1G", workers=8)
+
+    assert headers_only["records"]["ID"].tolist() == ["test_subject_1", "test_subject_2"]
+    assert (headers_only["records"]["Duration"] > 0).all()
+    assert headers_only["predicted_time"] is None
+    assert headers_only["batch_size"] == "auto"
+    assert headers_only["workers"] == 2
+    assert headers_only["workers"] * headers_only["worker_rss"] <= 1024 ** 3
+
+    piloted = lp.estimate("HEADERS", pilot=1, seed=1, memory="64G")
+
+    assert len(piloted["pilot"]) == 1
+    assert piloted["records"]["PredictedTime"].notna().all()
+    assert piloted["predicted_wall"] >= piloted["records"]["PredictedTime"].max()
+    assert isinstance(piloted["batch_size"], int)
+    assert lp.estimate(memory=headers_only["worker_rss"])["workers"] == 1
+
+
+def test_proc_iter_yields_failed_records(lp, tmp_sl_two):
+    lp.sample_list(str(tmp_sl_two))
+
+    results = list(lp.proc_iter("NOT_A_REAL_COMMAND", workers=2))
+
+    assert len(results) == 2
+    assert not any(res.ok for res in results)
+    assert all(len(res.errors) == 1 for res in results)
+
+
+def _journal_records(path):
+    import json
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    return [line for line in lines if line["event"] == "record"]
+
+
+def test_proc_parallel_resume_skips_journaled_records(lp, tmp_sl_two, tmp_path):
+    lp.sample_list(str(tmp_sl_two))
+    out_db = tmp_path / "run.db"
+
+    first = lp.proc_parallel("HEADERS", workers=2, out_db=str(out_db), progress=False)
+    journal = tmp_path / "run.db.journal"
+
+    assert first.ok
+    assert sorted((r["ordinal"], r["ok"]) for r in _journal_records(journal)) == [(1, True), (2, True)]
+
+    resumed = lp.proc_parallel("HEADERS", workers=2, out_db=str(out_db), progress=False, resume=True)
+
+    assert resumed.ok
+    assert resumed.records["Ordinal"].tolist() == [1, 2]
+    assert len(_journal_records(journal)) == 2
+
+
+def test_proc_parallel_resume_reruns_failed_records(lp, tmp_sl_two, tmp_path):
+    lp.sample_list(str(tmp_sl_two))
+    out_db = tmp_path / "run.db"
+
+    failed = lp.proc_parallel("NOT_A_REAL_COMMAND", workers=2, out_db=str(out_db), ids="test_subject_2")
+    first_slices = {r["slice_index"] for r in _journal_records(tmp_path / "run.db.journal")}
+
+    assert not failed.ok
+    with pytest.warns(RuntimeWarning):
+        resumed = lp.proc_parallel("HEADERS", workers=2, out_db=str(out_db), resume=True)
+
+    assert resumed.ok
+    records = _journal_records(tmp_path / "run.db.journal")
+    assert sorted(r["ok"] for r in records) == [False, True, True]
+    assert not first_slices & {r["slice_index"] for r in records if r["ok"]}
+
+    with pytest.raises(ValueError):
+        lp.proc_parallel("HEADERS", resume=True)
+
+
+def test_proc_parallel_resume_warns_when_parameters_change(lp, tmp_sl_two, tmp_path):
+    lp.sample_list(str(tmp_sl_two))
+    out_db = tmp_path / "run.db"
+
+    lp.proc_parallel("HEADERS", workers=2, out_db=str(out_db), progress=False, params={"x": "1"})
+
+    with pytest.warns(RuntimeWarning, match="parameters"):
+        lp.proc_parallel("HEADERS", workers=2, out_db=str(out_db), progress=False,
+                         params={"x": "2"}, resume=True)
+
+
+def test_proc_parallel_resume_reruns_records_sharing_an_id_with_a_rerun(lp, tmp_sl_two, tmp_path):
+    import json
+
+    rows = [line.split("\t") for line in tmp_sl_two.read_text().splitlines() if line.strip()]
+    sample_list = tmp_path / "dup.lst"
+    sample_list.write_text("\n".join("\t".join(row) for row in rows + rows[:1]) + "\n")
+    lp.sample_list(str(sample_list))
+    out_db = tmp_path / "run.db"
+    first_id, second_id = rows[0][0], rows[1][0]
+    journal = tmp_path / "run.db.journal"
+    entries = [{"event": "start", "cmd": "HEADERS", "params": []}] + [
+        {"event": "record", "ordinal": ordinal, "id": indiv, "label": indiv,
+         "slice_index": 1, "out_path": None, "ok": True}
+        for ordinal, indiv in ((1, first_id), (2, second_id))
+    ]  # ordinal 3 (a second first_id) was interrupted
+    journal.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+
+    lp.proc_parallel("HEADERS", workers=2, out_db=str(out_db), progress=False, resume=True)
+
+    rerun = sorted(r["ordinal"] for r in _journal_records(journal)[2:])
+    assert rerun == [1, 3]
+
+
+def test_resume_prunes_rerun_records_from_kept_slice_databases(tmp_path):
+    import sqlite3
+
+    from lunapi.parallel import _prune_slice_db
+
+    path = tmp_path / "run.db-1.db"
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE individuals (indiv_id INTEGER PRIMARY KEY, indiv_name TEXT)")
+    con.execute("CREATE TABLE datapoints (indiv_id INTEGER, value TEXT)")
+    con.executemany("INSERT INTO individuals VALUES (?, ?)", [(1, "S1"), (2, "S2")])
+    con.executemany("INSERT INTO datapoints VALUES (?, ?)", [(1, "a"), (2, "b"), (2, "c")])
+    con.commit()
+    con.close()
+
+    _prune_slice_db(path, {"S1"})
+
+    con = sqlite3.connect(path)
+    assert con.execute("SELECT indiv_name FROM individuals").fetchall() == [("S1",)]
+    assert con.execute("SELECT value FROM datapoints").fetchall() == [("a",)]
+    con.close()
+
+
+def test_proc_parallel_merge_consolidates_slice_databases(lp, tmp_sl_two, tmp_path):
+    lp.sample_list(str(tmp_sl_two))
+    out_db = tmp_path / "run.db"
+
+    result = lp.proc_parallel("HEADERS", workers=2, out_db=str(out_db), progress=False, merge=True)
+
+    assert result.ok
+    assert result._out_paths == [str(out_db)]
+    assert out_db.is_file()
+    assert not list(tmp_path.glob("run.db-*.db"))
+
+    with pytest.raises(ValueError):
+        lp.proc_parallel("HEADERS", merge=True)
+
+
+def test_proc_parallel_cache_skips_unchanged_records(lp, tmp_sl_two, tmp_path):
+    from lunapi.parallel import ResultCache
+
+    lp.sample_list(str(tmp_sl_two))
+    cache = ResultCache(tmp_path / "cache")
+
+    first = lp.proc_parallel("HEADERS", workers=2, progress=False, cache=cache)
+    second = lp.proc_parallel("HEADERS", workers=2, progress=False, cache=cache)
+    other = lp.proc_parallel("HEADERS", workers=2, progress=False, cache=cache, params={"x": "1"})
+
+    assert first.cache_stats["misses"] == 2 and first.cache_stats["stored"] == 2
+    assert not first.records["Cached"].any()
+    assert second.cache_stats["hits"] == 2 and second.cache_stats["misses"] == 0
+    assert second.records["Cached"].all()
+    pd.testing.assert_frame_equal(first["HEADERS: CH"], second["HEADERS: CH"])
+    assert other.cache_stats["misses"] == 2
+
+    small = ResultCache(tmp_path / "cache", max_size=cache.size() // 2)
+    lp.proc_parallel("HEADERS", workers=2, progress=False, cache=small, params={"x": "2"})
+    assert small.stats()["evicted"] >= 2
+    assert small.size() <= small.max_size
+
+    with pytest.raises(ValueError):
+        lp.proc_parallel("HEADERS", cache=cache, out_db=str(tmp_path / "run.db"))
+
+
+def _scripted_slice(task):
+    """Pool slice function for tests: each record's label says how it behaves."""
+    import os
+    import signal
+    import time
+
+    from lunapi.parallel import _worker_event
+
+    if any(record["label"] == "early" for record in task["records"]):
+        os.kill(os.getpid(), signal.SIGKILL)
+    results = []
+    for record in task["records"]:
+        _worker_event("record_start", record["ordinal"])
+        if record["label"] == "hang":
+            time.sleep(60)
+        if record["label"] == "crash":
+            os.kill(os.getpid(), signal.SIGKILL)
+        result = {
+            "ordinal": record["ordinal"],
+            "label": record["label"],
+            "id": record["label"],
+            "slice_index": task["slice_index"],
+            "error": None,
+        }
+        if not _worker_event("record_done", result):
+            results.append(result)
+    return {"slice_index": task["slice_index"], "results": results}
+
+
+def _scripted_slices(labels, batch_size):
+    tasks = [
+        {"ordinal": i, "sample_row": [label, "", ""], "label": label}
+        for i, label in enumerate(labels, start=1)
+    ]
+    return project_eval_slices(tasks, workers=1, batch_size=batch_size)
+
+
+def _dispatch_results(pool, labels, batch_size, **limits):
+    results = {}
+    for _, slice_result, failure in pool._dispatch(
+        _scripted_slice, _scripted_slices(labels, batch_size), **limits
+    ):
+        assert failure is None
+        for result in slice_result["results"]:
+            results[result["label"]] = result
+    return results
+
+
+def test_result_store_budget_spills_and_reloads_tables(lp, tmp_path):
+    import numpy as np
+    from lunapi import proj
+
+    lp.reinit()
+    for cmd in ("SPILLA", "SPILLB"):
+        lp.eng.inject_columns(
+            cmd, "CH", ["ID", "CH", "X"],
+            [(np.zeros(100, dtype=np.int32), ["S1"]),
+             (np.arange(100, dtype=np.int32) % 2, ["C3", "C4"]),
+             np.arange(100, dtype=np.float64)],
+        )
+    before = lp.table("SPILLA", "CH")
+    assert lp.result_store_usage()["Bytes"].gt(0).all()
+
+    lp.result_store_budget(1, tmp_path)
+    try:
+        usage = lp.result_store_usage()
+        assert usage["Spilled"].all()
+        assert usage["DiskBytes"].gt(0).all()
+        assert usage["Rows"].tolist() == [100, 100]
+        pd.testing.assert_frame_equal(lp.table("SPILLA", "CH"), before)
+        band = lp.table("SPILLB", "CH", columns=["X"], where={"CH": "C4", "X": slice(0, 6)})
+        assert band["X"].tolist() == [1.0, 3.0, 5.0]
+        assert lp.variables("SPILLA", "CH") == ["ID", "CH", "X"]
+    finally:
+        lp.result_store_budget(None)
+        proj._spill = None
+        lp.reinit()
+
+
+def test_adaptive_slices_grow_with_latency_and_shrink_at_the_tail():
+    from lunapi.parallel import _AdaptiveSlices
+
+    tasks = [{"ordinal": i, "sample_row": [f"S{i}", f"{i}.edf"], "label": f"S{i}"} for i in range(1, 21)]
+    slices = _AdaptiveSlices(tasks, workers=2)
+
+    sizes = [len(slices.popleft()["records"])]
+    slices.observe(0.1)
+    ordinals = list(range(1, 2))
+    while slices:
+        task_slice = slices.popleft()
+        sizes.append(len(task_slice["records"]))
+        ordinals.extend(record["ordinal"] for record in task_slice["records"])
+
+    assert sizes == [1, 2, 4, 7, 3, 2, 1]
+    assert ordinals == list(range(1, 21))
+
+
+def test_worker_pool_reports_records_as_they_finish_with_adaptive_slices(lp):
+    from lunapi.parallel import _AdaptiveSlices
+
+    tasks = [{"ordinal": i, "sample_row": [f"S{i}"], "label": f"S{i}"} for i in range(1, 7)]
+    slices = _AdaptiveSlices(tasks, workers=1)
+    reported = []
+
+    with lp.pool(workers=1) as pool:
+        dispatched = list(pool._dispatch(_scripted_slice, slices, on_record=reported.append))
+
+    assert [result["ordinal"] for result in reported] == list(range(1, 7))
+    assert slices.observed == 6
+    assert len(dispatched) < 6
+    assert sorted(r["ordinal"] for _, res, _ in dispatched for r in res["results"]) == list(range(1, 7))
+
+
+def test_worker_pool_record_timeout_kills_worker_and_requeues_slice(lp):
+    with lp.pool(workers=1) as pool:
+        results = _dispatch_results(pool, ["a", "hang", "b"], batch_size=3, record_timeout=1)
+
+        assert results["a"]["error"] is None
+        assert results["hang"]["error"].startswith("TimeoutError")
+        assert results["b"]["error"] is None
+        assert results["b"]["slice_index"] == 2
+        assert pool.restarts == 1
+
+
+def test_fair_shares_serve_priority_first_then_split_evenly():
+    from lunapi.parallel import _fair_shares
+
+    jobs = [
+        {"id": "a", "priority": 0, "created": 1, "want": 8},
+        {"id": "b", "priority": 0, "created": 2, "want": 8},
+        {"id": "c", "priority": 0, "created": 3, "want": 1},
+        {"id": "urgent", "priority": 5, "created": 4, "want": 2},
+    ]
+
+    assert _fair_shares(jobs, 10) == {"a": 4, "b": 3, "c": 1, "urgent": 2}
+    assert _fair_shares(jobs, 2) == {"a": 0, "b": 0, "c": 0, "urgent": 2}
+    assert _fair_shares(jobs[:2], 3) == {"a": 2, "b": 1}
+
+
+def test_worker_budget_rebalances_leases_across_runs(tmp_path):
+    import threading
+    import time
+
+    from lunapi.parallel import WorkerBudget
+
+    budget = WorkerBudget(4, path=tmp_path / "budget")
+    first = budget.lease(4)
+    assert first.held == 4
+
+    granted = {}
+    waiter = threading.Thread(target=lambda: granted.setdefault("lease", budget.lease(4)), daemon=True)
+    waiter.start()
+    while len(budget.status()) < 2:
+        time.sleep(0.05)
+    # slots in use by busy workers are only given up once those workers are idle
+    assert first.rebalance(busy=3, force=True) == 3
+    assert first.rebalance(busy=0, force=True) == 2
+    waiter.join(10)
+    second = granted["lease"]
+
+    assert second.rebalance(force=True) == 2
+    assert budget.status()["Slots"].tolist() == [2, 2]
+    assert WorkerBudget(16, path=tmp_path / "budget").workers == 4
+
+    first.close()
+    assert second.rebalance(force=True) == 4
+    second.close()
+    assert budget.status().empty
+
+
+def test_proc_parallel_runs_within_worker_budget(lp, tmp_sl_two):
+    from lunapi.parallel import WorkerBudget
+
+    lp.sample_list(str(tmp_sl_two))
+
+    result = lp.proc_parallel("HEADERS", workers=2, progress=False, budget=WorkerBudget(1))
+
+    assert result.ok
+    assert result.records["Worker"].nunique() == 1
+
+
+def test_worker_pool_dispatch_stops_when_cancelled(lp):
+    import threading
+    from concurrent.futures import CancelledError
+
+    cancel = threading.Event()
+    threading.Timer(0.5, cancel.set).start()
+    with lp.pool(workers=1) as pool:
+        with pytest.raises(CancelledError):
+            _dispatch_results(pool, ["a", "hang"], batch_size=2, cancel=cancel)
+
+        assert pool.restarts == 1
+
+
+def test_worker_pool_dispatch_does_not_hold_lock_across_yields(lp):
+    import threading
+
+    with lp.pool(workers=2) as pool:
+        dispatch = pool._dispatch(_scripted_slice, _scripted_slices(["a", "b", "c", "d"], 1))
+        next(dispatch)
+        assert len(pool.check()) == 2
+        checker = threading.Thread(target=pool.check, daemon=True)
+        checker.start()
+        checker.join(30)
+        assert not checker.is_alive()
+
+        with pytest.raises(RuntimeError, match="busy"):
+            _dispatch_results(pool, ["e"], batch_size=1)
+
+        dispatch.close()
+        assert pool.check()["Responsive"].all()
+        assert len(_dispatch_results(pool, ["e", "f"], batch_size=1)) == 2
+
+
+def test_worker_pool_check_reports_dead_busy_worker(lp):
+    import os
+    import signal
+
+    with lp.pool(workers=2) as pool:
+        dispatch = pool._dispatch(_scripted_slice, _scripted_slices(["hang", "a"], 1))
+        next(dispatch)
+        hung = next(w for w in pool._workers if w.task is not None)
+        os.kill(hung.pid, signal.SIGKILL)
+        hung.process.join(10)
+
+        report = pool.check().set_index("Worker")
+
+        assert not report.loc[hung.index, "Responsive"]
+        assert not report.loc[hung.index, "Restarted"]
+        dispatch.close()
+        assert pool.check()["Responsive"].all()
+
+
+def test_worker_pool_isolates_record_that_kills_worker(lp):
+    with lp.pool(workers=1) as pool:
+        results = _dispatch_results(pool, ["a", "crash", "b"], batch_size=3)
+
+        assert results["crash"]["error"].startswith("WorkerDied")
+        assert results["a"]["error"] is None
+        assert results["b"]["error"] is None
+
+
+def test_worker_pool_bisects_slice_when_crash_is_not_attributed(lp):
+    with lp.pool(workers=1) as pool:
+        results = _dispatch_results(pool, ["a", "b", "early", "c"], batch_size=4)
+
+        assert sorted(results) == ["a", "b", "c", "early"]
+        assert [label for label, r in results.items() if r["error"]] == ["early"]
+        assert pool.restarts == 3
+
+
+def test_worker_pool_recycles_after_max_records(lp, tmp_sl_two):
+    lp.sample_list(str(tmp_sl_two))
+
+    with lp.pool(workers=1) as pool:
+        result = lp.proc_parallel("HEADERS", pool=pool, batch_size=1,
+                                  max_records_per_worker=1, progress=False)
+
+        assert result.ok
+        assert pool.recycled == 2
+        assert pool.restarts == 0
+
+
+@pytest.fixture
+def worker_daemons():
+    import subprocess
+    import sys
+
+    procs = []
+    addresses = []
+    try:
+        for _ in range(2):
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "lunapi.worker", "--listen", "127.0.0.1:0",
+                 "--authkey", "test-key"],
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            procs.append(proc)
+            line = proc.stdout.readline()
+            assert line.startswith("lunapi-worker: listening on"), line
+            addresses.append(line.split()[-1])
+        yield addresses
+    finally:
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+
+
+def test_proc_parallel_runs_on_socket_worker_daemons(lp, tmp_sl_two, worker_daemons):
+    from lunapi.parallel import SocketBackend
+
+    lp.sample_list(str(tmp_sl_two))
+    backend = SocketBackend(worker_daemons, authkey="test-key")
+
+    result = lp.proc_parallel("HEADERS", backend=backend, progress=False)
+
+    assert result.ok
+    assert result.workers == 2
+    assert result["HEADERS: CH"]["ID"].tolist() == ["test_subject_1", "test_subject_2"]
+
+    with lp.pool(backend=backend) as pool:
+        status = pool.check()
+
+        assert status["Responsive"].all()
+        assert status["PID"].notna().all()
+
+
+def test_worker_pool_forkserver_backend(lp, tmp_sl_two):
+    lp.sample_list(str(tmp_sl_two))
+
+    with lp.pool(workers=2, backend="forkserver") as pool:
+        result = pool.proc_parallel("HEADERS", progress=False)
+
+        assert result.ok
+        assert pool.backend.start_method == "forkserver"
+        assert pool.check()["Responsive"].all()
+
+    with pytest.raises(ValueError):
+        lp.pool(backend="threads")
+
+
+def test_proc_parallel_thread_backend_runs_in_process(lp, tmp_sl_two, tmp_path):
+    import os
+
+    lp.sample_list(str(tmp_sl_two))
+    lp.var("keep", "1")
+
+    result = lp.proc_parallel("HEADERS", workers=2, backend="thread", params={"sig": "EEG"})
+
+    assert result.ok
+    assert result["HEADERS: CH"]["ID"].tolist() == ["test_subject_1", "test_subject_2"]
+    assert set(result["HEADERS: CH"]["CH"]) == {"EEG"}
+    assert (result.records["Worker"] == os.getpid()).all()
+    assert lp.var("keep") == "1"
+    assert not lp.var("sig")
+
+    with pytest.raises(ValueError):
+        lp.proc_parallel("HEADERS", backend="thread", out_db=str(tmp_path / "run.db"))
+    with lp.pool(workers=2, backend="thread") as pool:
+        assert pool.check()["Responsive"].all()
+        with pytest.raises(ValueError):
+            pool.proc_parallel("HEADERS", record_timeout=10)
+
+
+def _write_multichannel_edf(path, labels, sr=16, n_records=1):
+    """Write an EDF of 1-second records with one flat channel per label."""
+    ns = len(labels)
+
+    def field(value, width):
+        return str(value).ljust(width)[:width].encode("ascii")
+
+    buf = bytearray()
+    for value, width in [("0", 8), ("X X X X", 80), ("Startdate 01-JAN-2020 X X X", 80),
+                         ("01.01.20", 8), ("00.00.00", 8), (256 + ns * 256, 8), ("", 44),
+                         (n_records, 8), (1, 8), (ns, 4)]:
+        buf += field(value, width)
+    for values, width in [(labels, 16), ([""] * ns, 80), (["uV"] * ns, 8), (["-400"] * ns, 8),
+                          (["400"] * ns, 8), (["-32768"] * ns, 8), (["32767"] * ns, 8),
+                          ([""] * ns, 80), ([sr] * ns, 8), ([""] * ns, 32)]:
+        for value in values:
+            buf += field(value, width)
+    buf += bytes(2 * sr * ns * n_records)
+    path.write_bytes(buf)
+
+
+def test_inst_proc_async_keeps_the_event_loop_running(lp, tmp_sl_two, monkeypatch):
+    import asyncio
+    import threading
+
+    from lunapi.instance import inst
+
+    ticked = threading.Event()
+    seen = []
+    evaluate = inst.eval_lunascope
+
+    def eval_after_tick(self, cmdstr):
+        # the loop must run its other task while this evaluation is in progress
+        seen.append(ticked.wait(10))
+        return evaluate(self, cmdstr)
+
+    monkeypatch.setattr(inst, "eval_lunascope", eval_after_tick)
+    lp.sample_list(str(tmp_sl_two))
+    instance = lp.inst(1)
+
+    async def tick():
+        await asyncio.sleep(0.05)
+        ticked.set()
+
+    async def run():
+        ticker = asyncio.create_task(tick())
+        result = await instance.proc_async("HEADERS")
+        await ticker
+        return result
+
+    result = asyncio.run(run())
+
+    assert seen == [True]
+    assert result["HEADERS: CH"]["ID"].unique().tolist() == ["test_subject_1"]
+
+
+def test_proc_async_streams_progress_and_detaches_results(lp, tmp_sl_two):
+    import asyncio
+
+    lp.sample_list(str(tmp_sl_two))
+
+    async def run():
+        queue = asyncio.Queue()
+        task = asyncio.create_task(lp.proc_async("HEADERS", workers=2, progress=queue))
+        events = []
+        while (event := await queue.get()) is not None:
+            events.append(event)
+        instance = lp.inst(1)
+        return await task, events, await instance.proc_async("HEADERS")
+
+    result, events, single = asyncio.run(run())
+
+    assert result.ok
+    assert result["HEADERS: CH"]["ID"].unique().tolist() == ["test_subject_1", "test_subject_2"]
+    assert sorted(e["ordinal"] for e in events if e["event"] == "record") == [1, 2]
+    assert single["HEADERS: CH"]["ID"].unique().tolist() == ["test_subject_1"]
+    assert result["HEADERS: CH"]["ID"].nunique() == 2
+
+
+def test_inst_proc_parallel_splits_channels_across_workers(lp, tmp_path):
+    labels = ["C3", "C4", "F3", "F4", "O1"]
+    edf = tmp_path / "hd.edf"
+    _write_multichannel_edf(edf, labels)
+    sample_list = tmp_path / "hd.lst"
+    sample_list.write_text(f"hd\t{edf}\t.\n")
+    lp.sample_list(str(sample_list))
+    p = lp.inst(1)
+
+    result = p.proc_parallel("HEADERS", workers=2, chunks=3)
+
+    assert result.ok
+    assert result.records["Label"].tolist() == ["C3..C4", "F3..F4", "O1"]
+    assert p.table("HEADERS", "CH")["CH"].tolist() == labels
+    assert result["HEADERS: CH"]["ID"].unique().tolist() == ["hd"]
+    assert len(p.table("HEADERS", "BL")) == 1
+
+    subset = p.proc_parallel("HEADERS", sig="F4,C3", workers=2, backend="thread")
+
+    assert subset.ok
+    assert p.table("HEADERS", "CH")["CH"].tolist() == ["F4", "C3"]
+    with pytest.raises(ValueError):
+        p.proc_parallel("HEADERS", split="annot")
+    with pytest.raises(ValueError):
+        p.proc_parallel("HEADERS", split="epoch")
+
+
+def test_inst_proc_parallel_rejects_cross_channel_commands(lp, tmp_path):
+    edf = tmp_path / "hd.edf"
+    _write_multichannel_edf(edf, ["C3", "C4"])
+    sample_list = tmp_path / "hd.lst"
+    sample_list.write_text(f"hd\t{edf}\t.\n")
+    lp.sample_list(str(sample_list))
+    p = lp.inst(1)
+
+    with pytest.raises(ValueError, match="cannot be split by channel"):
+        p.proc_parallel("SIGSTATS & COH", workers=2)
+
+
+def test_channel_split_keeps_only_columns_all_groups_agree_on():
+    from lunapi.parallel import _channel_invariant_part
+
+    first = encode_result_table(["NS", "REC_DUR"], [[2], [30.0]], "hd")
+    second = encode_result_table(["NS", "REC_DUR"], [[3], [30.0]], "hd")
+
+    part, dropped = _channel_invariant_part([first, second])
+
+    assert dropped == ["NS"]
+    assert decode_result_tables([part]).to_dict("list") == {"ID": ["hd"], "REC_DUR": [30.0]}
+
+    pairs = [encode_result_table(["CH1", "CH2", "COH"], [["C3"], [ch], [0.5]], "hd")
+             for ch in ("C4", "F3")]
+    assert _channel_invariant_part(pairs, ["CH1", "CH2"]) == (None, ["CH1", "CH2", "COH"])
+    single = _channel_invariant_part([first])
+    assert single[1] == [] and single[0]["columns"] == ["ID", "NS", "REC_DUR"]
+
+
+def test_inst_proc_parallel_splits_epochs_with_global_numbering(lp, tmp_path):
+    edf = tmp_path / "long.edf"
+    _write_multichannel_edf(edf, ["C3", "C4"], n_records=10)
+    sample_list = tmp_path / "long.lst"
+    sample_list.write_text(f"long\t{edf}\t.\n")
+    lp.sample_list(str(sample_list))
+    p = lp.inst(1)
+
+    result = p.proc_parallel("EPOCH len=1\nSIGSTATS epoch", split="epoch", workers=2, chunks=3)
+
+    assert result.ok
+    assert result.records["Label"].tolist() == ["E1-4", "E5-7", "E8-10"]
+    table = p.table("SIGSTATS", "CH_E")
+    assert table.loc[table["CH"] == "C3", "E"].tolist() == list(range(1, 11))
+    assert "SIGSTATS: CH" not in result
+
+    with pytest.raises(ValueError, match="not epoch-local"):
+        p.proc_parallel("SPINDLES fc=11", split="epoch")
+    with pytest.raises(ValueError, match="epoch"):
+        p.proc_parallel("PSD sig=C3", split="epoch")
+
+
+def test_worker_pool_stays_warm_across_proc_parallel_calls(lp, tmp_sl_two):
+    lp.sample_list(str(tmp_sl_two))
+
+    with lp.pool(workers=2) as pool:
+        first = pool.proc_parallel("HEADERS", progress=False)
+        pids = pool.check()["PID"].tolist()
+        second = lp.proc_parallel("HEADERS", pool=pool, progress=False)
+
+        assert first.ok and second.ok
+        assert set(second["HEADERS: CH"]["ID"]) == {"test_subject_1", "test_subject_2"}
+        assert pool.check()["PID"].tolist() == pids
+        assert pool.restarts == 0
+
+    assert pool.closed
+
+
+def test_worker_pool_check_restarts_dead_worker(lp):
+    import os
+    import signal
+
+    with lp.pool(workers=1) as pool:
+        pid = pool.check()["PID"].iloc[0]
+        os.kill(int(pid), signal.SIGKILL)
+        pool._workers[0].process.join(5)
+
+        status = pool.check()
+
+        assert not status["Alive"].iloc[0]
+        assert status["Restarted"].iloc[0]
+        assert status["PID"].iloc[0] != pid
+        assert pool.check()["Responsive"].iloc[0]
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from lunapi.parallel import decode_result_tables, encode_result_table, read_text_table
+from lunapi.schema import TableSchema
+
+
+def _dictionary(cmd):
+    if cmd != "PSD":
+        return {}
+    return {
+        frozenset(): frozenset({"NE"}),
+        frozenset({"CH", "F"}): frozenset({"PSD"}),
+    }
+
+
+def test_schema_records_dictionary_columns_only():
+    schema = TableSchema(_dictionary)
+    frame = pd.DataFrame({
+        "ID": ["001"], "CH": ["C3"], "F": ["0.5"], "PSD": ["1.5"], "X": ["2"],
+    })
+
+    cast = schema.cast(frame, "PSD", "CH_F")
+
+    assert cast["ID"].tolist() == ["001"]
+    assert cast["CH"].tolist() == ["C3"]
+    assert cast["F"].tolist() == [0.5]
+    assert cast["X"].tolist() == [2]
+    assert frame["F"].tolist() == ["0.5"]
+    assert schema.recorded("PSD", ["F", "CH"]) == {"F": "f", "PSD": "f"}
+    assert schema.kind("PSD", "F_CH", "X") is None
+    assert schema.kind("PSD", "BL", "ID") == "s"
+
+
+def test_schema_widens_numbers_and_decides_text_per_table():
+    schema = TableSchema(_dictionary)
+    schema.cast(pd.DataFrame({"CH": ["C3"], "F": ["1"]}), "PSD", "CH_F")
+
+    cast = schema.cast(pd.DataFrame({"CH": ["1"], "F": ["0.5"]}), "PSD", "CH_F")
+
+    assert cast["CH"].tolist() == [1]
+    assert cast["F"].tolist() == [0.5]
+    assert schema.recorded("PSD", "CH_F") == {"CH": "i", "F": "f"}
+
+    assert schema.cast(pd.DataFrame({"F": ["2"]}), "PSD", "CH_F")["F"].dtype == "float64"
+
+    schema.clear()
+    assert schema.recorded("PSD", "CH_F") == {}
+
+
+def test_schema_converts_numeric_output_after_text_output():
+    schema = TableSchema(_dictionary)
+
+    text = schema.cast(pd.DataFrame({"CH": ["C3"], "F": ["beta"]}), "PSD", "CH_F")
+    numeric = schema.cast(pd.DataFrame({"CH": ["1"], "F": ["0.5"]}), "PSD", "CH_F")
+
+    assert text["F"].tolist() == ["beta"]
+    assert numeric["CH"].tolist() == [1]
+    assert numeric["F"].tolist() == [0.5]
+
+    again = schema.cast(pd.DataFrame({"F": ["gamma"]}), "PSD", "CH_F")
+    assert again["F"].tolist() == ["gamma"]
+    assert schema.kind("PSD", "CH_F", "F") == "f"
+
+
+def test_decode_result_tables_widens_recorded_float_columns(monkeypatch):
+    from lunapi import parallel
+
+    schema = TableSchema(_dictionary)
+    monkeypatch.setattr(parallel, "table_schema", lambda: schema)
+    schema.learn("PSD", "CH_F", "F", "f")
+    schema.learn("PSD", "CH_F", "CH", "s")
+    part = encode_result_table(
+        ["ID", "CH", "F", "PSD"],
+        [["S1", "S1"], ["1", "2"], ["1", "2"], [1.0, 2.0]],
+        "S1",
+    )
+
+    df = decode_result_tables([part], "PSD", "CH_F")
+
+    assert df["CH"].tolist() == [1, 2]
+    assert df["F"].dtype == "float64"
+    assert df["F"].tolist() == [1.0, 2.0]
+    assert schema.recorded("PSD", "CH_F") == {"CH": "i", "F": "f", "PSD": "f"}
+    assert decode_result_tables([part])["F"].dtype == "int64"
+
+
+def test_read_text_table_keeps_ids_and_text_labels_as_text(monkeypatch, tmp_path):
+    from lunapi import parallel
+
+    schema = TableSchema(_dictionary)
+    monkeypatch.setattr(parallel, "table_schema", lambda: schema)
+    for indiv, ch in (("001", "C3"), ("002", "1")):
+        (tmp_path / indiv).mkdir()
+        (tmp_path / indiv / "PSD_CH_F.txt").write_text(
+            f"ID\tCH\tF\tPSD\n{indiv}\t{ch}\t0.5\tNA\n"
+        )
+
+    df = read_text_table(tmp_path, "PSD", ["CH", "F"])
+
+    assert df["ID"].tolist() == ["001", "002"]
+    assert df["CH"].tolist() == ["C3", "1"]
+    assert is_numeric_dtype(df["F"].dtype)
+    assert np.isnan(df["PSD"]).all()
+
+    numeric = tmp_path / "numeric"
+    for indiv, ch in (("003", "1"), ("004", "2")):
+        (numeric / indiv).mkdir(parents=True)
+        (numeric / indiv / "PSD_CH_F.txt").write_text(
+            f"ID\tCH\tF\tPSD\n{indiv}\t{ch}\t0.5\t1.5\n"
+        )
+
+    df = read_text_table(numeric, "PSD", ["CH", "F"])
+
+    assert df["ID"].tolist() == ["003", "004"]
+    assert df["CH"].tolist() == [1, 2]
+    assert df["PSD"].tolist() == [1.5, 1.5]